@@ -1,73 +1,924 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
-import pandas as pd
 import numpy as np
 from joblib import load
 import os
+import time
+
+from artifact import file_sha256, load_artifact, read_header, source_model_loader
+from batching import MicroBatcher
+from executor import ProcessPoolPredictor
+from metrics import Counter, HistogramFamily, PrometheusText, SlowRequestProfiler
+from model_registry import ModelRegistry
+from model_store import ModelStore
+from prediction_cache import LocalCacheBackend, PredictionCache, RedisCacheBackend
+from inference import FEATURE_ORDER, FastPredictor, FusedPreprocessor
+from schema import (N_FEATURES, ValidationError, binary_dtype, check_ranges, decode_msgpack, decode_rows,
+                    encode_msgpack, encode_predictions, infinite_values, is_msgpack, parse_quantiles,
+                    quantile_label, record_to_row, unknown_fields)
 
 app = Flask(__name__)
-CORS(app)
+# Let browser clients read the counts sent with packed-row batch responses
+CORS(app, expose_headers=['X-Model-Version', 'X-Row-Count', 'X-Error-Count', 'X-Warning-Count', 'X-Columns'])
 
 # Load the combined pipeline (preprocessing + model)
 MODEL_DIR = os.path.join(os.path.dirname(__file__), '..', 'Model')
 PIPELINE_PATH = os.path.join(MODEL_DIR, 'pipeline_combined.joblib')
+PREPROCESSING_PATH = os.path.join(MODEL_DIR, 'preprocessing_fused.npz')
+ARTIFACT_PATH = os.path.join(MODEL_DIR, 'pipeline_combined.bin')
+
+# 'auto' serves the memory-mapped artifact when it was exported from the
+# current pipeline, 'artifact' always serves it, 'joblib' always unpickles
+MODEL_FORMAT = os.environ.get('MODEL_FORMAT', 'auto')
+
+# 'eager' loads the model at import time, 'lazy' on the first request or
+# readiness probe so that startup and health checks do not wait for it
+MODEL_LOAD_MODE = os.environ.get('MODEL_LOAD_MODE', 'eager')
+
+# Serve the active version of a versioned model store (see model_store.py)
+# instead of the files in Model/
+MODEL_STORE_DIR = os.environ.get('MODEL_STORE_DIR')
+
+# Check for a new model every MODEL_WATCH_INTERVAL seconds and hot-swap it
+# once it is loaded and warmed up (0 disables watching)
+MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 10))
+
+# What to do with values outside the typical range of their feature (see
+# schema.py): 'reject' with a 400 / row error, 'warn' in the response, or 'off'
+SCHEMA_RANGE_POLICY = os.environ.get('SCHEMA_RANGE_POLICY', 'warn')
+
+# Upper bound on the number of rows accepted by /predict/batch
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 10000))
+
+# Request bodies larger than this are rejected with 413 (by Flask and asgi.py)
+MAX_REQUEST_BYTES = int(os.environ.get('MAX_REQUEST_BYTES', 16 * 1024 * 1024))
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_BYTES
+
+# Batches up to this size use the flat-array forest engine (0 disables it)
+FLAT_FOREST_MAX_ROWS = int(os.environ.get('FLAT_FOREST_MAX_ROWS', 1024))
+
+# Score batches of PROCESS_POOL_MIN_ROWS+ rows in a pool of worker processes
+# (0 workers disables the pool)
+PROCESS_POOL_WORKERS = int(os.environ.get('PROCESS_POOL_WORKERS', 0))
+PROCESS_POOL_MIN_ROWS = int(os.environ.get('PROCESS_POOL_MIN_ROWS', 20000))
+
+# Cache predictions keyed on the rounded feature vector and model version.
+# PREDICTION_CACHE_BACKEND adds a shared tier: 'redis' (REDIS_URL) or 'local'.
+# Batches of more than PREDICTION_CACHE_MAX_ROWS rows skip the cache, since
+# hashing every row costs more than the rare repeats in them save
+PREDICTION_CACHE = os.environ.get('PREDICTION_CACHE', '1') == '1'
+PREDICTION_CACHE_MAX_ROWS = int(os.environ.get('PREDICTION_CACHE_MAX_ROWS', 100))
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 10000))
+PREDICTION_CACHE_TTL = float(os.environ.get('PREDICTION_CACHE_TTL', 3600))
+PREDICTION_CACHE_PRECISION = int(os.environ.get('PREDICTION_CACHE_PRECISION', 6))
+PREDICTION_CACHE_BACKEND = os.environ.get('PREDICTION_CACHE_BACKEND', 'none')
+
+# Coalesce concurrent /predict calls into batched predictions (off by default);
+# callers give up on a batch after PREDICT_BATCH_TIMEOUT seconds
+PREDICT_COALESCE = os.environ.get('PREDICT_COALESCE', '0') == '1'
+PREDICT_BATCH_MAX_ROWS = int(os.environ.get('PREDICT_BATCH_MAX_ROWS', 64))
+PREDICT_BATCH_MAX_WAIT_MS = float(os.environ.get('PREDICT_BATCH_MAX_WAIT_MS', 2))
+PREDICT_BATCH_TIMEOUT = float(os.environ.get('PREDICT_BATCH_TIMEOUT', 10))
+
+# Run cProfile on this fraction of requests and keep the profiles of those
+# slower than PROFILE_SLOW_MS (served at /debug/profiles); 0 disables it
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_SLOW_MS = float(os.environ.get('PROFILE_SLOW_MS', 100))
+
+# Request and per-stage latency metrics, exposed at /metrics
+LATENCY_BUCKETS = [0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5]
+request_count = Counter(("endpoint", "method", "status"))
+request_latency = HistogramFamily(("endpoint",), LATENCY_BUCKETS)
+stage_latency = HistogramFamily(("stage",), LATENCY_BUCKETS)
+profiler = SlowRequestProfiler(PROFILE_SAMPLE_RATE, PROFILE_SLOW_MS)
+
+
+model_store = ModelStore(MODEL_STORE_DIR) if MODEL_STORE_DIR else None
+
+
+def model_files():
+    """Paths of the pipeline, artifact and fused preprocessing to serve."""
+    if model_store is not None:
+        return model_store.files()
+    return {"pipeline": PIPELINE_PATH, "artifact": ARTIFACT_PATH, "preprocessing": PREPROCESSING_PATH}
+
+
+def model_signature():
+    """Cheap fingerprint of the model to serve; changes when a new one lands."""
+    if model_store is not None:
+        return model_store.current()
+    signature = []
+    for path in (PIPELINE_PATH, ARTIFACT_PATH):
+        try:
+            st = os.stat(path)
+            signature.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def _artifact_is_current(files):
+    if not os.path.exists(files["artifact"]):
+        return False
+    source = read_header(files["artifact"])["metadata"].get("source_sha256")
+    return source == file_sha256(files["pipeline"])
+
+
+def load_from_artifact(files):
+    """Memory-map the exported artifact; workers share its pages.
+
+    The sklearn model is only unpickled, per worker, once a batch larger
+    than FLAT_FOREST_MAX_ROWS arrives.
+    """
+    preprocessor, forest, header = load_artifact(files["artifact"])
+    print(f"Model artifact mapped: {header['n_trees']} trees, {header['n_nodes']} nodes")
+    version = header["metadata"].get("source_sha256") or file_sha256(files["artifact"])
+    return FastPredictor(preprocessor, forest=forest, flat_max_rows=FLAT_FOREST_MAX_ROWS, version=version[:12],
+                         source=('artifact', files["artifact"]),
+                         model_loader=source_model_loader(files["artifact"], header))
+
+
+def load_from_joblib(files):
+    """Unpickle the combined pipeline and unpack it for the fast path."""
+    print(f"Pipeline exists: {os.path.exists(files['pipeline'])}")
+    try:
+        pipeline = load(files["pipeline"])
+        print("Combined pipeline loaded successfully")
+        print(f"Pipeline type: {type(pipeline)}")
+    except Exception as e:
+        print(f"Error loading pipeline: {e}")
+        raise
+
+    # Use the fused preprocessing saved next to the pipeline, as long as it
+    # still matches the pipeline it was compiled from
+    preprocessor = FusedPreprocessor.from_pipeline(pipeline.named_steps['preprocessing'])
+    if os.path.exists(files["preprocessing"]):
+        saved = FusedPreprocessor.load(files["preprocessing"])
+        if saved.equals(preprocessor):
+            preprocessor = saved
+            print("Fused preprocessing loaded successfully")
+        else:
+            print("Warning: fused preprocessing is out of date, compiling it from the pipeline")
+
+    # Unpack the pipeline once so requests can skip pandas entirely
+    return FastPredictor.from_pipeline(
+        pipeline, preprocessor,
+        flat_max_rows=FLAT_FOREST_MAX_ROWS,
+        version=file_sha256(files["pipeline"])[:12],
+        source=('joblib', files["pipeline"]),
+    )
+
+
+def resolve_model_format(files):
+    """Return 'artifact' or 'joblib' according to MODEL_FORMAT."""
+    if MODEL_FORMAT == 'artifact':
+        return 'artifact'
+    if MODEL_FORMAT == 'auto' and _artifact_is_current(files):
+        return 'artifact'
+    if MODEL_FORMAT == 'auto' and os.path.exists(files["artifact"]):
+        print("Warning: model artifact is out of date, loading the joblib pipeline")
+    return 'joblib'
+
+
+def load_predictor():
+    """Load the predictor in the format selected by MODEL_FORMAT."""
+    files = model_files()
+    if resolve_model_format(files) == 'artifact':
+        return load_from_artifact(files)
+    return load_from_joblib(files)
+
+
+def warm_up(predictor):
+    """Run a few predictions so the first real request pays no one-off costs.
+
+    Faults in the model's pages, allocates the per-thread row buffer and
+    exercises both the single-row and the batched path.
+    """
+    fill = predictor.preprocessor.fill
+    for n_rows in (1, 16, 256):
+        predictor.predict(np.tile(fill, (n_rows, 1)))
+    predictor.predict(np.full((1, len(FEATURE_ORDER)), np.nan))
+
+
+registry = ModelRegistry(load_predictor, warmup=warm_up)
+registry.watch(model_signature, MODEL_WATCH_INTERVAL)
+
+if MODEL_LOAD_MODE == 'eager':
+    # With gunicorn --preload (see gunicorn.conf.py) this runs once in the
+    # master and the forked workers share the loaded model copy-on-write
+    registry.load()
+
+
+prediction_cache = None
+if PREDICTION_CACHE:
+    shared_backend = None
+    if PREDICTION_CACHE_BACKEND == 'redis':
+        shared_backend = RedisCacheBackend(os.environ.get('REDIS_URL', 'redis://localhost:6379/0'))
+    elif PREDICTION_CACHE_BACKEND == 'local':
+        shared_backend = LocalCacheBackend()
+    prediction_cache = PredictionCache(
+        max_entries=PREDICTION_CACHE_SIZE,
+        ttl_seconds=PREDICTION_CACHE_TTL,
+        precision=PREDICTION_CACHE_PRECISION,
+        shared=shared_backend,
+        max_rows=PREDICTION_CACHE_MAX_ROWS,
+    )
+
+
+process_pool = None
+if PROCESS_POOL_WORKERS > 0:
+    files = model_files()
+    model_format = resolve_model_format(files)
+    process_pool = ProcessPoolPredictor(
+        model_format,
+        files['artifact' if model_format == 'artifact' else 'pipeline'],
+        processes=PROCESS_POOL_WORKERS,
+        min_rows=PROCESS_POOL_MIN_ROWS,
+        flat_max_rows=FLAT_FOREST_MAX_ROWS,
+    )
+    # Restart the pool's workers on the new model whenever it is swapped
+    registry.on_swap(lambda predictor: process_pool.reconfigure(*predictor.source))
+    print(f"Process pool enabled: {PROCESS_POOL_WORKERS} processes for batches of {PROCESS_POOL_MIN_ROWS}+ rows")
+
+
+def predict_matrix(X, predictor=None):
+    """Score a float64 feature matrix laid out in FEATURE_ORDER.
+
+    predictor defaults to the one currently registered; callers that report
+    the model version pass the predictor they read the version from.
+    """
+    predictor = predictor or registry.get()
+
+    def predict_fn(rows):
+        # Large batches are spread over the process pool, the rest run inline
+        if process_pool is not None and process_pool.should_use(len(rows)):
+            with stage_latency.time('process_pool'):
+                return process_pool.predict(rows, fallback=predictor.predict)
+        with stage_latency.time('preprocess'):
+            rows = predictor.transform(rows)
+        with stage_latency.time('model'):
+            return predictor.predict_transformed(rows)
+
+    if prediction_cache is None:
+        return predict_fn(X)
+    return prediction_cache.predict(predict_fn, X, predictor.version)
+
+
+batcher = None
+if PREDICT_COALESCE:
+    def predict_with_version(X):
+        # Each row's result carries the version of the model that scored it
+        predictor = registry.get()
+        return [(prediction, predictor.version) for prediction in predict_matrix(X, predictor)]
+
+    batcher = MicroBatcher(
+        predict_with_version,
+        max_batch=PREDICT_BATCH_MAX_ROWS,
+        max_wait_ms=PREDICT_BATCH_MAX_WAIT_MS,
+        timeout=PREDICT_BATCH_TIMEOUT,
+    )
+    print(f"Micro-batching enabled: max {PREDICT_BATCH_MAX_ROWS} rows / {PREDICT_BATCH_MAX_WAIT_MS}ms")
+
+
+def screen_ranges(X, skip=()):
+    """Apply SCHEMA_RANGE_POLICY to the rows of X.
+
+    Args:
+        X: Float64 feature matrix.
+        skip: Row indices that already failed validation.
+
+    Returns:
+        (errors, warnings): dictionaries mapping a row index to the list of
+        range details that reject it or are reported with its prediction.
+    """
+    if SCHEMA_RANGE_POLICY == 'off':
+        return {}, {}
+    flagged = {}
+    for i, detail in check_ranges(X):
+        if i not in skip:
+            flagged.setdefault(i, []).append(detail)
+    return (flagged, {}) if SCHEMA_RANGE_POLICY == 'reject' else ({}, flagged)
+
+
+def validation_error(e):
+    """JSON body of a 400 response for a ValidationError."""
+    return {"error": str(e), "details": e.details, "status": "error"}
+
+
+def predict_spread(X, predictor, quantiles):
+    """Score X with the spread of the forest's tree predictions, in dollars.
+
+    Uncertainty requests skip the prediction cache, the micro-batcher and
+    the process pool: every tree's output is needed, not just the mean.
+
+    Returns:
+        (mean, std, quantile_values) rounded like the point predictions.
+
+    Raises:
+        ValidationError: If the served model is not a random forest.
+    """
+    try:
+        with stage_latency.time('uncertainty'):
+            distribution = predictor.predict_distribution(X, quantiles)
+    except ValueError as e:
+        raise ValidationError([{"field": "quantiles", "code": "unsupported", "error": str(e)}]) from None
+    return tuple(np.round(values * 1000, 3) for values in distribution)
+
+
+def score_single(data, quantiles=None):
+    """Score one /predict payload and return the JSON body as a dictionary.
+
+    Args:
+        data: The decoded JSON object of feature values.
+        quantiles: Optional probabilities; adds the standard deviation and
+            these quantiles of the per-tree predictions to the response.
+
+    Raises:
+        ValidationError: If the payload does not match the feature schema.
+    """
+    row, warnings = validate_single(data)
+
+    if quantiles is not None:
+        predictor = registry.get()
+        mean, std, quantile_values = predict_spread(row, predictor, quantiles)
+        result = {
+            "prediction": float(mean[0]),
+            "std": float(std[0]),
+            "quantiles": {quantile_label(q): float(v[0]) for q, v in zip(quantiles, quantile_values)},
+            "model_version": predictor.version,
+            "status": "success"
+        }
+        if warnings:
+            result["warnings"] = warnings[0]
+        return result
+
+    with stage_latency.time('predict'):
+        if batcher is not None:
+            # Hand the row to the micro-batcher and wait for its batch
+            prediction, version = batcher.predict(row[0])
+        else:
+            # Preprocessing + prediction without building a DataFrame.
+            # Holding the predictor keeps a hot-swap from changing it mid-request
+            predictor = registry.get()
+            prediction = predict_matrix(row, predictor)[0]
+            version = predictor.version
+
+    return single_result(prediction, version, warnings)
+
+
+def validate_single(data):
+    """Turn one /predict payload into a (1, n_features) row and its range warnings.
+
+    Raises:
+        ValidationError: If the payload does not match the feature schema.
+    """
+    # Convert input to a float64 row in the correct column order
+    with stage_latency.time('validate'):
+        row = record_to_row(data)
+        errors, warnings = screen_ranges(row)
+        if errors:
+            raise ValidationError(errors[0])
+    return row, warnings
+
+
+def single_result(prediction, version, warnings):
+    """JSON body of a /predict response for one model output."""
+    # Convert prediction to thousands (model predicts in $1000s)
+    prediction_value = float(prediction) * 1000
+
+    result = {
+        "prediction": round(prediction_value, 3),
+        "model_version": version,
+        "status": "success"
+    }
+    if warnings:
+        result["warnings"] = warnings[0]
+    return result
+
+
+def record_request(endpoint, method, status, seconds):
+    """Count a finished request and observe its latency."""
+    request_count.inc(endpoint, method, str(status))
+    request_latency.labels(endpoint).observe(seconds)
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    g.profile = profiler.start()
+
+
+@app.before_request
+def reject_large_body():
+    # Answer before any view reads the body, so the 413 is not turned into a 500
+    if request.content_length is not None and request.content_length > MAX_REQUEST_BYTES:
+        return jsonify({"error": f"request body exceeds the maximum of {MAX_REQUEST_BYTES} bytes",
+                        "status": "error"}), 413
+
+
+@app.after_request
+def finish_request_timer(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        elapsed = time.perf_counter() - start
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        record_request(endpoint, request.method, response.status_code, elapsed)
+        profile = g.pop('profile', None)
+        if profile is not None:
+            profiler.finish(profile, elapsed, f"{request.method} {request.path}")
+    return response
+
+
+def _model_size(predictor):
+    """Return (trees, nodes) of the served model, None where unknown."""
+    if predictor.forest is not None:
+        return predictor.forest.n_trees, predictor.forest.n_nodes
+    model = predictor.model
+    trees = getattr(model, 'estimators_', None)
+    if trees is not None:
+        return len(trees), sum(tree.tree_.node_count for tree in trees)
+    return getattr(model, 'n_iter_', None), None
+
+
+def render_metrics():
+    """Return the Prometheus text exposition of this process's metrics."""
+    out = PrometheusText(prefix='realestate_')
+    out.counter('requests_total', 'HTTP requests by endpoint, method and status.', request_count)
+    out.histogram('request_duration_seconds', 'Request latency by endpoint.', request_latency)
+    out.histogram('stage_duration_seconds', 'Latency of each prediction stage.', stage_latency)
+
+    status = registry.status()
+    out.value('model_loaded', 'gauge', '1 once the model is loaded.', int(status["ready"]))
+    out.value('model_load_seconds', 'gauge', 'Time taken to load the model.', status["load_seconds"])
+    out.value('model_loaded_timestamp_seconds', 'gauge', 'Unix time the model was loaded.', status["loaded_at"])
+    out.value('model_swaps_total', 'counter', 'Models hot-swapped in since startup.', status["swaps"])
+    if status["ready"]:
+        predictor = registry.get()
+        model_type = type(predictor.model).__name__ if predictor.model is not None else 'FlatForest'
+        trees, nodes = _model_size(predictor)
+        out.value('model_info', 'gauge', 'Version and type of the served model.',
+                  [((predictor.version, model_type), 1)], ('version', 'type'))
+        out.value('model_trees', 'gauge', 'Trees (or boosting iterations) in the model.', trees)
+        out.value('model_nodes', 'gauge', 'Tree nodes in the model.', nodes)
 
-print(f"Pipeline exists: {os.path.exists(PIPELINE_PATH)}")
+    if prediction_cache is not None:
+        stats = prediction_cache.stats()
+        out.value('prediction_cache_entries', 'gauge', 'Entries in the local prediction cache.', stats["entries"])
+        for name in ('local_hits', 'shared_hits', 'misses', 'evictions', 'bypassed', 'shared_errors'):
+            out.value(f'prediction_cache_{name}_total', 'counter', f'Prediction cache {name.replace("_", " ")}.',
+                      stats[name])
+
+    if batcher is not None:
+        out.histogram('batch_queue_depth', 'Micro-batcher queue depth seen by each batch.', batcher.queue_depth)
+        out.histogram('batch_size_rows', 'Rows per coalesced batch.', batcher.batch_size)
+        out.histogram('batch_wait_milliseconds', 'Time rows waited for their batch.', batcher.wait_ms)
+
+    if profiler.enabled:
+        out.value('profiled_requests_total', 'counter', 'Requests run under the sampling profiler.',
+                  profiler.sampled)
+    return out.render()
 
-try:
-    pipeline = load(PIPELINE_PATH)
-    print("Combined pipeline loaded successfully")
-    print(f"Pipeline type: {type(pipeline)}")
-except Exception as e:
-    print(f"Error loading pipeline: {e}")
-    raise
 
 @app.route('/')
 def home():
     return "Real Estate Prediction API - Use /predict endpoint"
 
+@app.route('/ready')
+def ready():
+    # Kick off a lazy load so the probe eventually succeeds on its own
+    registry.load_in_background()
+    status = registry.status()
+    return jsonify(status), 200 if status["ready"] else 503
+
 @app.route('/predict', methods=['POST'])
 def predict():
     try:
-        data = request.json
-        
+        with stage_latency.time('parse'):
+            data = request.get_json(silent=True)
+
+        if data is None and request.get_data():
+            return jsonify({"error": "Request body must be a JSON object", "status": "error"}), 400
         if not data:
             return jsonify({"error": "No input data provided"}), 400
-            
-        # Define the correct feature order (as used during training)
-        feature_order = ['CRIM', 'ZN', 'INDUS', 'CHAS', 'NOX', 'RM', 'AGE', 'DIS', 'RAD', 'TAX', 'PTRATIO', 'B', 'LSTAT']
-        
-        # Convert input to DataFrame with correct column order
-        input_data = pd.DataFrame([data], columns=feature_order)
-        
-        # Use the combined pipeline (preprocessing + prediction)
-        prediction = pipeline.predict(input_data)[0]
-        
-        # Convert prediction to thousands (model predicts in $1000s)
-        prediction_value = float(prediction) * 1000
-        
+
+        try:
+            quantiles = request.args.get('quantiles')
+            result = score_single(data, None if quantiles is None else parse_quantiles(quantiles))
+        except ValidationError as e:
+            return jsonify(validation_error(e)), 400
+        with stage_latency.time('serialize'):
+            return jsonify(result)
+
+    except Exception as e:
         return jsonify({
-            "prediction": round(prediction_value, 3),
+            "error": str(e),
+            "status": "error"
+        }), 500
+
+def _records_from_columns(columns):
+    """Turn a columnar payload ({feature: [values]}) into a list of records."""
+    unknown = unknown_fields(columns)
+    if unknown:
+        raise ValidationError(unknown)
+    if not all(isinstance(values, list) for values in columns.values()):
+        raise ValueError("columns must be lists of equal length")
+    lengths = {len(values) for values in columns.values()}
+    if len(lengths) != 1:
+        raise ValueError("columns must be lists of equal length")
+    n_rows = lengths.pop()
+    return [
+        {name: values[i] for name, values in columns.items()}
+        for i in range(n_rows)
+    ]
+
+
+def _split_rows(X, invalid):
+    """Screen X and split it into the rows to score and per-row errors / warnings.
+
+    Args:
+        X: Float64 matrix holding every input row.
+        invalid: Dictionary mapping the index of each row that failed
+            validation to its list of details.
+
+    Returns:
+        (X, valid_index, errors, warnings) as described in parse_batch.
+    """
+    range_errors, range_warnings = screen_ranges(X, skip=invalid)
+    invalid.update(range_errors)
+    errors = [{"index": i, "error": str(ValidationError(details)), "details": details}
+              for i, details in sorted(invalid.items())]
+    warnings = [{"index": i, **detail} for i, details in sorted(range_warnings.items()) for detail in details]
+    if invalid:
+        valid = np.ones(len(X), dtype=bool)
+        valid[list(invalid)] = False
+        valid_index = np.flatnonzero(valid).tolist()
+        X = X[valid]
+    else:
+        valid_index = list(range(len(X)))
+    return X, valid_index, errors, warnings
+
+
+def parse_batch(data):
+    """Turn a /predict/batch payload into a feature matrix.
+
+    Args:
+        data: Either a list of feature dictionaries, {"records": [...]} or
+            a columnar payload {"columns": {"CRIM": [...], ...}}.
+
+    Returns:
+        (X, valid_index, errors, warnings, n_rows) where X is a float64
+        array holding only the valid rows, valid_index maps those rows back
+        to their input position, errors is a list of {"index", "error",
+        "details"} dictionaries and warnings a list of range details, each
+        with the "index" of its row.
+    """
+    if isinstance(data, dict) and 'columns' in data:
+        if not isinstance(data['columns'], dict) or not data['columns']:
+            raise ValueError("'columns' must be a non-empty object")
+        records = _records_from_columns(data['columns'])
+    else:
+        records = data.get('records') if isinstance(data, dict) else data
+        if not isinstance(records, list):
+            raise ValueError("payload must be a list of records, {'records': [...]} or {'columns': {...}}")
+
+    if len(records) > MAX_BATCH_SIZE:
+        raise OverflowError(f"batch of {len(records)} rows exceeds the maximum of {MAX_BATCH_SIZE}")
+
+    # Validate straight into the rows of one preallocated matrix
+    X = np.empty((len(records), N_FEATURES), dtype=np.float64)
+    invalid = {}
+    for i, record in enumerate(records):
+        try:
+            record_to_row(record, out=X[i])
+        except ValidationError as e:
+            invalid[i] = e.details
+    X, valid_index, errors, warnings = _split_rows(X, invalid)
+    return X, valid_index, errors, warnings, len(records)
+
+
+def parse_packed(body, dtype):
+    """Like parse_batch, for a packed-row body (see schema.py)."""
+    X = decode_rows(body, dtype)
+    if len(X) > MAX_BATCH_SIZE:
+        raise OverflowError(f"batch of {len(X)} rows exceeds the maximum of {MAX_BATCH_SIZE}")
+    invalid = {}
+    for i, detail in infinite_values(X):
+        invalid.setdefault(i, []).append(detail)
+    n_rows = len(X)
+    X, valid_index, errors, warnings = _split_rows(X, invalid)
+    return X, valid_index, errors, warnings, n_rows
+
+
+def predict_rows(X, valid_index, n_rows, quantiles=None):
+    """Score the valid rows of a batch.
+
+    Returns:
+        (columns, version) where columns is a float64 array of shape
+        (n_rows, k) in dollars, NaN for the rows that failed validation.
+        The first column is the prediction; with quantiles it is followed
+        by the standard deviation and one column per quantile.
+
+    Raises:
+        ValidationError: If quantiles are requested from a model that is
+            not a random forest.
+    """
+    columns = np.full((n_rows, 1 if quantiles is None else 2 + len(quantiles)), np.nan)
+    predictor = registry.get()
+    if quantiles is not None:
+        mean, std, quantile_values = predict_spread(X, predictor, quantiles)
+        columns[valid_index] = np.column_stack([mean, std, *quantile_values])
+    elif len(valid_index):
+        # Score every valid row with a single vectorized pipeline call
+        with stage_latency.time('predict'):
+            columns[valid_index, 0] = np.round(predict_matrix(X, predictor) * 1000, 3)
+    return columns, predictor.version
+
+
+def column_names(quantiles=None):
+    """Names of the columns returned by predict_rows."""
+    if quantiles is None:
+        return ['prediction']
+    return ['prediction', 'std'] + [f"q{quantile_label(q)}" for q in quantiles]
+
+
+def _column_to_list(values, valid_index, n_rows):
+    column = [None] * n_rows
+    for i, value in zip(valid_index, values[valid_index].tolist()):
+        column[i] = value
+    return column
+
+
+def score_batch(data, quantiles=None):
+    """Score a /predict/batch payload.
+
+    Args:
+        data: The decoded request body (see parse_batch).
+        quantiles: Optional probabilities; adds "std" and "quantiles"
+            lists aligned with "predictions".
+
+    Returns:
+        (response, status) where response is the JSON body as a dictionary.
+    """
+    if not data:
+        return {"error": "No input data provided", "status": "error"}, 400
+
+    try:
+        with stage_latency.time('validate'):
+            X, valid_index, errors, warnings, n_rows = parse_batch(data)
+    except OverflowError as e:
+        return {"error": str(e), "status": "error"}, 413
+    except ValidationError as e:
+        return validation_error(e), 400
+    except ValueError as e:
+        return {"error": str(e), "status": "error"}, 400
+
+    try:
+        columns, version = predict_rows(X, valid_index, n_rows, quantiles)
+    except ValidationError as e:
+        return validation_error(e), 400
+
+    response = {
+        "predictions": _column_to_list(columns[:, 0], valid_index, n_rows),
+        "errors": errors,
+        "count": n_rows,
+        "model_version": version,
+        "status": "success"
+    }
+    if quantiles is not None:
+        response["std"] = _column_to_list(columns[:, 1], valid_index, n_rows)
+        response["quantiles"] = {quantile_label(q): _column_to_list(columns[:, 2 + j], valid_index, n_rows)
+                                 for j, q in enumerate(quantiles)}
+    if warnings:
+        response["warnings"] = warnings
+    return response, 200
+
+
+def score_encoded_batch(body, content_type, quantiles=None):
+    """Score a /predict/batch body sent as packed rows or MessagePack.
+
+    Packed rows are answered with the predictions packed in the same dtype
+    (NaN for rows that failed validation) and the counts in headers; with
+    quantiles every row holds the columns named in the X-Columns header.
+    MessagePack is answered with the JSON response encoded as MessagePack.
+    Request-level errors are always answered with JSON.
+
+    Returns:
+        (body, status, content_type, headers) where body is bytes, or a
+        dictionary to be sent as JSON.
+    """
+    dtype = binary_dtype(content_type)
+    if dtype is not None:
+        try:
+            with stage_latency.time('validate'):
+                X, valid_index, errors, warnings, n_rows = parse_packed(body, dtype)
+            columns, version = predict_rows(X, valid_index, n_rows, quantiles)
+        except OverflowError as e:
+            return {"error": str(e), "status": "error"}, 413, 'application/json', {}
+        except ValidationError as e:
+            return validation_error(e), 400, 'application/json', {}
+        with stage_latency.time('serialize'):
+            packed = encode_predictions(columns, dtype)
+        headers = {
+            "X-Model-Version": version or '',
+            "X-Columns": ','.join(column_names(quantiles)),
+            "X-Row-Count": str(n_rows),
+            "X-Error-Count": str(len(errors)),
+            "X-Warning-Count": str(len(warnings)),
+        }
+        return packed, 200, content_type, headers
+
+    try:
+        with stage_latency.time('parse'):
+            data = decode_msgpack(body)
+    except ImportError:
+        return {"error": "MessagePack support needs the msgpack package", "status": "error"}, 415, \
+            'application/json', {}
+    except Exception as e:
+        return {"error": f"Invalid MessagePack body: {e}", "status": "error"}, 400, 'application/json', {}
+    response, status = score_batch(data, quantiles)
+    with stage_latency.time('serialize'):
+        return encode_msgpack(response), status, content_type, {}
+
+
+def explain_rows(X, predictor):
+    """Path-attribution explanation of the rows of X, in dollars.
+
+    Returns:
+        (predictions, base_value, contributions) where contributions is an
+        (n, 13) array in FEATURE_ORDER.
+
+    Raises:
+        ValidationError: If the served model is not a random forest.
+    """
+    try:
+        with stage_latency.time('explain'):
+            predictions, base_value, contributions = predictor.explain(X)
+    except ValueError as e:
+        raise ValidationError([{"field": None, "code": "unsupported", "error": str(e)}]) from None
+    return np.round(predictions * 1000, 3), round(base_value * 1000, 3), np.round(contributions * 1000, 3)
+
+
+def score_explain(data):
+    """Explain a /explain payload.
+
+    Args:
+        data: One feature object, answered like /predict, or any
+            /predict/batch payload, answered row by row.
+
+    Returns:
+        (response, status) where response is the JSON body as a dictionary.
+        Each prediction equals base_value plus the sum of its
+        contributions (up to rounding).
+    """
+    if not data:
+        return {"error": "No input data provided", "status": "error"}, 400
+    single = isinstance(data, dict) and 'records' not in data and 'columns' not in data
+
+    try:
+        with stage_latency.time('validate'):
+            if single:
+                X = record_to_row(data)
+                errors, warnings = screen_ranges(X)
+                if errors:
+                    raise ValidationError(errors[0])
+                warnings = warnings.get(0)
+            else:
+                X, valid_index, errors, warnings, n_rows = parse_batch(data)
+        predictor = registry.get()
+        predictions, base_value, contributions = explain_rows(X, predictor)
+    except OverflowError as e:
+        return {"error": str(e), "status": "error"}, 413
+    except ValidationError as e:
+        return validation_error(e), 400
+    except ValueError as e:
+        return {"error": str(e), "status": "error"}, 400
+
+    if single:
+        response = {
+            "prediction": float(predictions[0]),
+            "base_value": base_value,
+            "contributions": dict(zip(FEATURE_ORDER, contributions[0].tolist())),
+            "model_version": predictor.version,
+            "status": "success"
+        }
+    else:
+        predicted = [None] * n_rows
+        explained = [None] * n_rows
+        for i, prediction, row in zip(valid_index, predictions.tolist(), contributions.tolist()):
+            predicted[i] = prediction
+            explained[i] = dict(zip(FEATURE_ORDER, row))
+        response = {
+            "predictions": predicted,
+            "base_value": base_value,
+            "contributions": explained,
+            "errors": errors,
+            "count": n_rows,
+            "model_version": predictor.version,
             "status": "success"
-        })
-        
+        }
+    if warnings:
+        response["warnings"] = warnings
+    return response, 200
+
+
+def is_encoded_batch(content_type):
+    """True for the non-JSON /predict/batch content types."""
+    return binary_dtype(content_type) is not None or is_msgpack(content_type)
+
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    try:
+        quantiles = request.args.get('quantiles')
+        try:
+            quantiles = None if quantiles is None else parse_quantiles(quantiles)
+        except ValidationError as e:
+            return jsonify(validation_error(e)), 400
+
+        if is_encoded_batch(request.content_type):
+            body, status, content_type, headers = score_encoded_batch(
+                request.get_data(), request.content_type, quantiles)
+            if isinstance(body, dict):
+                return jsonify(body), status
+            return Response(body, status=status, content_type=content_type, headers=headers)
+
+        with stage_latency.time('parse'):
+            data = request.get_json(silent=True)
+        response, status = score_batch(data, quantiles)
+        with stage_latency.time('serialize'):
+            return jsonify(response), status
+
+    except Exception as e:
+        return jsonify({
+            "error": str(e),
+            "status": "error"
+        }), 500
+
+@app.route('/explain', methods=['POST'])
+def explain():
+    try:
+        with stage_latency.time('parse'):
+            data = request.get_json(silent=True)
+        response, status = score_explain(data)
+        with stage_latency.time('serialize'):
+            return jsonify(response), status
+
     except Exception as e:
         return jsonify({
             "error": str(e),
             "status": "error"
         }), 500
 
+def batching_status():
+    if batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **batcher.stats()}
+
+
+def cache_status():
+    if prediction_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **prediction_cache.stats()}
+
+
+def profiles_status():
+    if not profiler.enabled:
+        return {"enabled": False}
+    return {"enabled": True, "sample_rate": profiler.sample_rate,
+            "slow_ms": profiler.slow_ms, "profiles": list(profiler.profiles)}
+
+
+PREDICT_GET_EXAMPLE = {
+    "message": "Please use POST method with housing data",
+    "example_request": {
+        "CRIM": 0.00632,
+        "ZN": 18,
+        "INDUS": 2.31,
+        # ... other features
+    }
+}
+
+
+@app.route('/stats/batching', methods=['GET'])
+def batching_stats():
+    return jsonify(batching_status())
+
+@app.route('/stats/cache', methods=['GET'])
+def cache_stats():
+    return jsonify(cache_status())
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(render_metrics(), content_type=PrometheusText.CONTENT_TYPE)
+
+@app.route('/debug/profiles', methods=['GET'])
+def slow_profiles():
+    return jsonify(profiles_status())
+
 @app.route('/predict', methods=['GET'])
 def predict_get():
-    return jsonify({
-        "message": "Please use POST method with housing data",
-        "example_request": {
-            "CRIM": 0.00632,
-            "ZN": 18,
-            "INDUS": 2.31,
-            # ... other features
-        }
-    })
+    return jsonify(PREDICT_GET_EXAMPLE)
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
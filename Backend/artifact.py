@@ -0,0 +1,179 @@
+"""
+Compact, memory-mappable model artifact.
+
+Layout of the file:
+
+    8 bytes   magic (b"REMODEL\\0")
+    8 bytes   little-endian uint64 length of the JSON header
+    N bytes   UTF-8 JSON header (format version, feature names, array table,
+              metadata)
+    ...       raw little-endian arrays, each aligned to 64 bytes
+
+The arrays (fused preprocessing parameters and FlatForest node arrays) are
+opened with np.memmap, so every gunicorn worker maps the same file and the
+OS page cache keeps a single physical copy instead of one unpickled model
+per worker.
+
+The artifact only holds the FlatForest arrays, which are fastest for small
+batches. For large batches sklearn's compiled traversal wins, so
+source_model_loader returns a loader for the joblib pipeline the artifact
+was exported from, which FastPredictor calls the first time a batch is
+larger than flat_max_rows.
+"""
+import hashlib
+import json
+import os
+import struct
+import time
+
+import numpy as np
+
+from forest_engine import FlatForest
+from inference import FEATURE_ORDER, FusedPreprocessor
+
+MAGIC = b"REMODEL\0"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+_PREFIX = struct.Struct("<8sQ")
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def file_sha256(path):
+    """Return the hex SHA-256 digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def atomic_dump(obj, path):
+    """joblib.dump to a temporary file next to path, then rename over it."""
+    from joblib import dump  # not needed to map an artifact
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    try:
+        dump(obj, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def write_artifact(path, preprocessor, forest, metadata=None):
+    """Write preprocessing parameters and forest arrays to path atomically.
+
+    Args:
+        path: Destination file.
+        preprocessor: Fitted FusedPreprocessor.
+        forest: FlatForest compiled from the model.
+        metadata: Optional JSON-serialisable dictionary stored in the header.
+    """
+    arrays = {
+        'fill': preprocessor.fill.astype('<f8'),
+        'mean': preprocessor.mean.astype('<f8'),
+        'scale': preprocessor.scale.astype('<f8'),
+        'feature': forest.feature.astype('<i4'),
+        'threshold': forest.threshold.astype('<f8'),
+        'children': forest.children.astype('<i8'),
+        'value': forest.value.astype('<f8'),
+        'roots': forest.roots.astype('<i8'),
+        'is_leaf': forest.is_leaf.astype('|b1'),
+    }
+
+    table = {}
+    offset = 0
+    for name, array in arrays.items():
+        table[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset = _align(offset + array.nbytes)
+
+    header = json.dumps({
+        "format_version": FORMAT_VERSION,
+        "feature_names": FEATURE_ORDER,
+        "n_features": forest.n_features,
+        "n_trees": forest.n_trees,
+        "n_nodes": forest.n_nodes,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "arrays": table,
+        "metadata": metadata or {},
+    }).encode('utf-8')
+    data_start = _align(_PREFIX.size + len(header))
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREFIX.pack(MAGIC, len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + table[name]["offset"])
+            f.write(array.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_header(path):
+    """Return the JSON header of an artifact without mapping its arrays."""
+    with open(path, 'rb') as f:
+        magic, header_len = _PREFIX.unpack(f.read(_PREFIX.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a model artifact")
+        header = json.loads(f.read(header_len))
+    if header["format_version"] != FORMAT_VERSION:
+        raise ValueError(f"unsupported artifact format version {header['format_version']}")
+    header["data_start"] = _align(_PREFIX.size + header_len)
+    return header
+
+
+def load_artifact(path):
+    """Memory-map an artifact written by write_artifact.
+
+    Returns:
+        (preprocessor, forest, header). The arrays are read-only views of
+        one shared mapping of the file.
+    """
+    header = read_header(path)
+    if header["feature_names"] != FEATURE_ORDER:
+        raise ValueError("artifact feature order does not match FEATURE_ORDER")
+
+    # Plain ndarray views of the mapping: memmap subclass overhead adds up per tree level
+    buffer = np.memmap(path, dtype=np.uint8, mode='r').view(np.ndarray)
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        start = header["data_start"] + spec["offset"]
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        arrays[name] = buffer[start:start + count * dtype.itemsize].view(dtype).reshape(spec["shape"])
+
+    preprocessor = FusedPreprocessor(arrays['fill'], arrays['mean'], arrays['scale'])
+    forest = FlatForest(
+        arrays['feature'], arrays['threshold'], arrays['children'], arrays['value'],
+        arrays['roots'], header["n_features"], is_leaf=arrays['is_leaf'],
+    )
+    return preprocessor, forest, header
+
+
+def source_model_loader(path, header):
+    """Return a loader for the sklearn model the artifact at path was exported from.
+
+    The pipeline is expected next to the artifact under the name recorded
+    by export_model.py. The loader returns None (and FastPredictor keeps
+    using the FlatForest engine) when that file is missing or no longer
+    matches the artifact.
+    """
+    metadata = header["metadata"]
+    pipeline_path = os.path.join(os.path.dirname(path), metadata.get("source", ''))
+
+    def load_model():
+        try:
+            if not os.path.isfile(pipeline_path) or file_sha256(pipeline_path) != metadata.get("source_sha256"):
+                print(f"Warning: no pipeline matching {path}, large batches stay on the FlatForest engine")
+                return None
+            from joblib import load  # only needed once a large batch arrives
+            return load(pipeline_path).named_steps['model']
+        except Exception as e:
+            print(f"Warning: could not load the sklearn model for large batches: {e}")
+            return None
+
+    return load_model
@@ -0,0 +1,313 @@
+"""
+ASGI entry point serving the same API contract as the Flask app.
+
+Requests are read and parsed on the event loop while model execution runs
+in a bounded thread pool, so slow clients and busy models do not tie up
+workers. When more than ASGI_MAX_PENDING predictions are queued the server
+answers 429 instead of queueing without bound. Large JSON bodies are decoded
+in the same pool task as their prediction, so they count against that
+limit too. Bodies over the Flask app's MAX_REQUEST_BYTES get a 413.
+
+With PREDICT_COALESCE=1, /predict rows are validated on the event loop and
+handed to the micro-batcher, whose future is awaited there. No pool thread
+waits on a batch, so a batch can fill up to PREDICT_BATCH_MAX_ROWS rows
+rather than ASGI_THREADS.
+
+Run with:
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT
+"""
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+import app as flask_app
+
+# Threads running predictions, and how many predictions may wait for them
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 4))
+ASGI_MAX_PENDING = int(os.environ.get('ASGI_MAX_PENDING', 64))
+
+# Bodies larger than this are decoded in the pool instead of on the loop
+ASGI_INLINE_JSON_BYTES = 64 * 1024
+
+executor = ThreadPoolExecutor(max_workers=ASGI_THREADS, thread_name_prefix="predict")
+pending = 0
+
+CORS_HEADERS = [
+    (b"access-control-allow-origin", b"*"),
+    (b"access-control-allow-methods", b"GET, POST, OPTIONS"),
+    (b"access-control-allow-headers", b"Content-Type"),
+    (b"access-control-expose-headers", b"X-Model-Version, X-Row-Count, X-Error-Count, X-Warning-Count, X-Columns"),
+]
+
+
+async def send_response(send, status, body, content_type=b"application/json", headers=()):
+    if not isinstance(body, bytes):
+        body = json.dumps(body).encode('utf-8')
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type), (b"content-length", str(len(body)).encode())]
+                   + CORS_HEADERS + list(headers),
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def read_body(receive, limit=None):
+    """Read the whole request body, raising OverflowError past limit bytes."""
+    chunks = []
+    size = 0
+    more = True
+    while more:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            raise ConnectionError("client disconnected")
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if limit is not None and size > limit:
+            raise OverflowError(f"request body exceeds the maximum of {limit} bytes")
+        chunks.append(chunk)
+        more = message.get("more_body", False)
+    return b"".join(chunks)
+
+
+async def read_request_body(scope, receive, send):
+    """Read the body within MAX_REQUEST_BYTES, or answer 413 and return None."""
+    limit = flask_app.MAX_REQUEST_BYTES
+    try:
+        declared = int(dict(scope["headers"]).get(b"content-length", 0))
+        if declared > limit:
+            raise OverflowError(f"request body exceeds the maximum of {limit} bytes")
+        return await read_body(receive, limit)
+    except OverflowError as e:
+        await send_response(send, 413, {"error": str(e), "status": "error"})
+    except ConnectionError:
+        pass
+    return None
+
+
+async def run_in_pool(fn, *args):
+    """Run fn in the prediction pool, or return None if the queue is full."""
+    global pending
+    if pending >= ASGI_MAX_PENDING:
+        return None
+    pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+    finally:
+        pending -= 1
+
+
+def decode_json(body):
+    start = time.perf_counter()
+    data = json.loads(body) if body else None
+    flask_app.stage_latency.labels('parse').observe(time.perf_counter() - start)
+    return data
+
+
+def _decode_and_handle(handler, body, quantiles=None):
+    """Decode a large JSON body and run handler on it, as one pool task."""
+    try:
+        data = decode_json(body)
+    except ValueError as e:
+        return {"error": f"Invalid JSON: {e}", "status": "error"}, 400
+    return handler(data, quantiles)
+
+
+def _predict(data, quantiles=None):
+    try:
+        if not data:
+            return {"error": "No input data provided"}, 400
+        return flask_app.score_single(data, quantiles), 200
+    except flask_app.ValidationError as e:
+        return flask_app.validation_error(e), 400
+    except Exception as e:
+        return {"error": str(e), "status": "error"}, 500
+
+
+async def predict_coalesced(data):
+    """Score one /predict payload through the micro-batcher, or return None if the queue is full."""
+    global pending
+    if pending >= ASGI_MAX_PENDING:
+        return None
+    pending += 1
+    try:
+        if not data:
+            return {"error": "No input data provided"}, 400
+        try:
+            row, warnings = flask_app.validate_single(data)
+        except flask_app.ValidationError as e:
+            return flask_app.validation_error(e), 400
+        start = time.perf_counter()
+        try:
+            prediction, version = await asyncio.wait_for(
+                asyncio.wrap_future(flask_app.batcher.submit(row[0])), flask_app.batcher.timeout)
+        except Exception as e:
+            return {"error": str(e), "status": "error"}, 500
+        flask_app.stage_latency.labels('predict').observe(time.perf_counter() - start)
+        return flask_app.single_result(prediction, version, warnings), 200
+    finally:
+        pending -= 1
+
+
+def _predict_batch(data, quantiles=None):
+    try:
+        return flask_app.score_batch(data, quantiles)
+    except Exception as e:
+        return {"error": str(e), "status": "error"}, 500
+
+
+def _explain(data, quantiles=None):
+    # ?quantiles= does not apply to explanations
+    try:
+        return flask_app.score_explain(data)
+    except Exception as e:
+        return {"error": str(e), "status": "error"}, 500
+
+
+# GET endpoints answered from the Flask app's status helpers
+STATUS_ROUTES = {
+    '/stats/batching': flask_app.batching_status,
+    '/stats/cache': flask_app.cache_status,
+    '/debug/profiles': flask_app.profiles_status,
+    '/predict': lambda: flask_app.PREDICT_GET_EXAMPLE,
+}
+
+KNOWN_PATHS = {'/', '/ready', '/metrics', '/predict', '/predict/batch', '/explain', *STATUS_ROUTES}
+
+
+async def handle_http(scope, receive, send):
+    method = scope["method"]
+    path = scope["path"].rstrip('/') or '/'
+
+    if method == "OPTIONS":
+        await send_response(send, 204, b"")
+        return
+
+    if method == "GET" and path == '/':
+        await send_response(send, 200, b"Real Estate Prediction API - Use /predict endpoint", b"text/plain")
+        return
+
+    if method == "GET" and path == '/metrics':
+        await send_response(send, 200, flask_app.render_metrics().encode('utf-8'),
+                            flask_app.PrometheusText.CONTENT_TYPE.encode())
+        return
+
+    if method == "GET" and path == '/ready':
+        flask_app.registry.load_in_background()
+        status = flask_app.registry.status()
+        await send_response(send, 200 if status["ready"] else 503, status)
+        return
+
+    if method == "GET" and path in STATUS_ROUTES:
+        await send_response(send, 200, STATUS_ROUTES[path]())
+        return
+
+    handlers = {'/predict': _predict, '/predict/batch': _predict_batch, '/explain': _explain}
+    if path not in handlers:
+        if path in STATUS_ROUTES:
+            await send_response(send, 405, {"error": "Use GET", "status": "error"})
+        else:
+            await send_response(send, 404, {"error": "Not found", "status": "error"})
+        return
+    if method != "POST":
+        await send_response(send, 405, {"error": "Use POST", "status": "error"})
+        return
+
+    quantiles = parse_qs(scope.get("query_string", b"").decode('latin-1')).get('quantiles')
+    try:
+        quantiles = None if quantiles is None else flask_app.parse_quantiles(quantiles[-1])
+    except flask_app.ValidationError as e:
+        await send_response(send, 400, flask_app.validation_error(e))
+        return
+
+    content_type = dict(scope["headers"]).get(b"content-type", b"").decode('latin-1')
+    if path == '/predict/batch' and flask_app.is_encoded_batch(content_type):
+        await handle_encoded_batch(scope, receive, send, content_type, quantiles)
+        return
+
+    body = await read_request_body(scope, receive, send)
+    if body is None:
+        return
+    if len(body) <= ASGI_INLINE_JSON_BYTES:
+        try:
+            data = decode_json(body)
+        except ValueError as e:
+            await send_response(send, 400, {"error": f"Invalid JSON: {e}", "status": "error"})
+            return
+        if path == '/predict' and quantiles is None and flask_app.batcher is not None:
+            result = await predict_coalesced(data)
+        else:
+            result = await run_in_pool(handlers[path], data, quantiles)
+    else:
+        result = await run_in_pool(_decode_and_handle, handlers[path], body, quantiles)
+    if result is None:
+        await send_response(send, 429, {"error": "Server busy, retry later", "status": "error"},
+                            headers=[(b"retry-after", b"1")])
+        return
+    response, status = result
+    await send_response(send, status, response)
+
+
+def _predict_encoded_batch(body, content_type, quantiles=None):
+    try:
+        return flask_app.score_encoded_batch(body, content_type, quantiles)
+    except Exception as e:
+        return {"error": str(e), "status": "error"}, 500, 'application/json', {}
+
+
+async def handle_encoded_batch(scope, receive, send, content_type, quantiles=None):
+    """/predict/batch with a packed-row or MessagePack body (see schema.py)."""
+    body = await read_request_body(scope, receive, send)
+    if body is None:
+        return
+    result = await run_in_pool(_predict_encoded_batch, body, content_type, quantiles)
+    if result is None:
+        await send_response(send, 429, {"error": "Server busy, retry later", "status": "error"},
+                            headers=[(b"retry-after", b"1")])
+        return
+    response, status, response_type, headers = result
+    await send_response(send, status, response, response_type.encode('latin-1'),
+                        [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                         for name, value in headers.items()])
+
+
+async def handle_lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            # Load the model off the event loop so startup never blocks it
+            await asyncio.get_running_loop().run_in_executor(executor, flask_app.registry.load)
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            executor.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def handle_http_timed(scope, receive, send):
+    """handle_http, counted and timed in the shared request metrics."""
+    start = time.perf_counter()
+    status = 500
+
+    async def send_and_record_status(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        await send(message)
+
+    try:
+        await handle_http(scope, receive, send_and_record_status)
+    finally:
+        path = scope["path"].rstrip('/') or '/'
+        flask_app.record_request(path if path in KNOWN_PATHS else 'unmatched', scope["method"],
+                                 status, time.perf_counter() - start)
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "http":
+        await handle_http_timed(scope, receive, send)
+    elif scope["type"] == "lifespan":
+        await handle_lifespan(receive, send)
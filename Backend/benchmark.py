@@ -0,0 +1,467 @@
+"""
+Benchmark suite for the prediction hot paths.
+
+Each section measures one component on its own:
+
+    single_row    DataFrame vs NumPy row construction, sklearn vs fused
+                  preprocessing, pipeline.predict vs FastPredictor
+    batch         the same stages plus sklearn vs FlatForest predict at
+                  several batch sizes
+    flask         JSON parsing / serialization, schema validation and the
+                  in-process Flask /predict and /predict/batch round trips,
+                  JSON vs packed float64 rows
+    cold_start    model load time and memory added per worker, joblib
+                  pipeline vs memory-mapped artifact
+    formats       FastPredictor served from the memory-mapped artifact vs
+                  from the joblib pipeline, by batch size
+    process_pool  process-pool scaling for a large batch
+    uncertainty   mean/std/quantiles of the tree predictions in one pass vs
+                  a plain predict and vs calling every estimator separately
+    explain       per-feature path attribution vs a plain predict
+
+Results can be written as JSON together with environment information and
+compared against a saved baseline; the exit status is 1 when any metric
+got slower (or bigger) than the baseline by more than --threshold.
+
+Usage (from the Backend directory):
+    python benchmark.py
+    python benchmark.py --sections single_row batch --output baseline.json
+    python benchmark.py --output current.json --baseline baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import load
+
+from artifact import file_sha256, load_artifact, source_model_loader
+from executor import ProcessPoolPredictor
+from forest_engine import FlatForest
+from inference import FEATURE_ORDER, FastPredictor
+from schema import BINARY_CONTENT_TYPES, check_ranges, record_to_row
+
+MODEL_DIR = os.path.join(os.path.dirname(__file__), '..', 'Model')
+PIPELINE_PATH = os.path.join(MODEL_DIR, 'pipeline_combined.joblib')
+ARTIFACT_PATH = os.path.join(MODEL_DIR, 'pipeline_combined.bin')
+DATA_PATH = os.path.join(MODEL_DIR, 'REdata.csv')
+
+BATCH_SIZES = [1, 10, 100, 1000, 10000, 100000]
+SECTIONS = ['single_row', 'batch', 'flask', 'cold_start', 'formats', 'process_pool', 'uncertainty', 'explain']
+
+# Tail latencies are too noisy to gate on
+UNCOMPARED_SUFFIXES = ('p99_ms',)
+
+TEST_INPUT = {
+    'CRIM': 0.00632, 'ZN': 18.0, 'INDUS': 2.31, 'CHAS': 0,
+    'NOX': 0.538, 'RM': 6.575, 'AGE': 65.2, 'DIS': 4.09,
+    'RAD': 1, 'TAX': 296, 'PTRATIO': 15.3, 'B': 396.9, 'LSTAT': 4.98
+}
+
+
+def time_call(fn, repeat=200, warmup=10):
+    """Return per-call latencies of fn() in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    timings = np.empty(repeat)
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings[i] = (time.perf_counter() - start) * 1000
+    return timings
+
+
+def report(name, timings, metrics=None, key=None):
+    """Print p50/p99 of timings and record them in metrics under key."""
+    p50, p99 = np.percentile(timings, 50), np.percentile(timings, 99)
+    print(f"{name:<28} p50 {p50:8.3f} ms   p99 {p99:8.3f} ms")
+    if metrics is not None:
+        metrics[f"{key}.p50_ms"] = float(p50)
+        metrics[f"{key}.p99_ms"] = float(p99)
+
+
+def bench_single_row(pipeline, metrics):
+    fast = FastPredictor.from_pipeline(pipeline)
+
+    def dataframe_path():
+        return pipeline.predict(pd.DataFrame([TEST_INPUT], columns=FEATURE_ORDER))[0]
+
+    def fast_path():
+        return fast.predict_one(TEST_INPUT)
+
+    assert dataframe_path() == fast_path(), "fast path must match the pipeline exactly"
+
+    print("\n=== Single-row latency ===")
+    report("DataFrame construction", time_call(lambda: pd.DataFrame([TEST_INPUT], columns=FEATURE_ORDER)),
+           metrics, "single_row.dataframe")
+    report("NumPy row construction", time_call(lambda: record_to_row(TEST_INPUT)),
+           metrics, "single_row.numpy_row")
+    report("Schema validation + ranges",
+           time_call(lambda: check_ranges(record_to_row(TEST_INPUT))), metrics, "single_row.schema_validation")
+    preprocessing = pipeline.named_steps['preprocessing']
+    row = record_to_row(TEST_INPUT)
+    frame = pd.DataFrame(row, columns=FEATURE_ORDER)
+    out = np.empty_like(row)
+    report("Imputer + scaler (sklearn)", time_call(lambda: preprocessing.transform(frame)),
+           metrics, "single_row.sklearn_preprocessing")
+    report("FusedPreprocessor", time_call(lambda: fast.preprocessor.transform(row, out=out)),
+           metrics, "single_row.fused_preprocessing")
+    slow = time_call(dataframe_path)
+    quick = time_call(fast_path)
+    report("pipeline.predict(DataFrame)", slow, metrics, "single_row.pipeline_predict")
+    report("FastPredictor.predict_one", quick, metrics, "single_row.fast_predict")
+    print(f"Speed-up (p50): {np.percentile(slow, 50) / np.percentile(quick, 50):.2f}x")
+
+
+def sample_features(n, seed=0):
+    """Draw n raw feature rows (with replacement) from REdata.csv."""
+    housing = pd.read_csv(DATA_PATH)[FEATURE_ORDER].to_numpy(dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    return housing[rng.integers(0, len(housing), n)]
+
+
+def bench_batch_sizes(pipeline, metrics):
+    model = pipeline.named_steps['model']
+    preprocessing = pipeline.named_steps['preprocessing']
+    forest = FlatForest.from_sklearn(model)
+    fast = FastPredictor.from_pipeline(pipeline)
+    raw = sample_features(max(BATCH_SIZES))
+    rows = fast.transform(raw)
+
+    stages = [
+        ('dataframe', lambda X, F, R: pd.DataFrame(R, columns=FEATURE_ORDER)),
+        ('sklearn_preprocessing', lambda X, F, R: preprocessing.transform(F)),
+        ('fused_preprocessing', lambda X, F, R: fast.preprocessor.transform(R)),
+        ('sklearn_predict', lambda X, F, R: model.predict(X)),
+        ('flat_forest_predict', lambda X, F, R: forest.predict(X)),
+        ('pipeline_predict', lambda X, F, R: pipeline.predict(F)),
+        ('fast_predict', lambda X, F, R: fast.predict(R)),
+    ]
+
+    print("\n=== Stages by batch size (median ms per batch) ===")
+    print(f"{'rows':>8}" + ''.join(f" {name[:12]:>12}" for name, _ in stages))
+    for n in BATCH_SIZES:
+        X, R = rows[:n], raw[:n]
+        F = pd.DataFrame(R, columns=FEATURE_ORDER)
+        assert np.array_equal(model.predict(X), forest.predict(X))
+        repeat = 3 if n >= 10000 else 30
+        line = f"{n:>8}"
+        for name, stage in stages:
+            ms = float(np.median(time_call(lambda: stage(X, F, R), repeat=repeat, warmup=1)))
+            metrics[f"batch.{n}.{name}_ms"] = ms
+            line += f" {ms:>12.3f}"
+        print(line)
+
+
+def bench_flask(metrics, batch_rows=1000):
+    """Time JSON handling and the in-process Flask round trips."""
+    # Measure the model path, not prediction-cache hits on a repeated input
+    os.environ.setdefault('PREDICTION_CACHE', '0')
+    import app as flask_app
+    from flask import jsonify
+
+    client = flask_app.app.test_client()
+    body = json.dumps(TEST_INPUT)
+    features = sample_features(batch_rows)
+    # JSON marks missing values with null, packed rows with NaN
+    records = [{name: None if value != value else value for name, value in zip(FEATURE_ORDER, row)}
+               for row in features.tolist()]
+    batch_body = json.dumps(records)
+    packed_body = features.tobytes()
+    packed_type = next(t for t, dtype in BINARY_CONTENT_TYPES.items() if dtype == '<f8')
+    response = flask_app.score_single(TEST_INPUT)
+    batch_response, _ = flask_app.score_batch(records)
+
+    def serialize(payload):
+        with flask_app.app.app_context():
+            return jsonify(payload).get_data()
+
+    print(f"\n=== Flask /predict path ({batch_rows}-row batch payload) ===")
+    report("json.loads request", time_call(lambda: json.loads(body)), metrics, "flask.parse_request")
+    report("jsonify response", time_call(lambda: serialize(response)), metrics, "flask.serialize_response")
+    report("POST /predict", time_call(
+        lambda: client.post('/predict', data=body, content_type='application/json')),
+        metrics, "flask.predict_round_trip")
+    report("json.loads batch", time_call(lambda: json.loads(batch_body), repeat=30),
+           metrics, "flask.parse_batch_request")
+    report("jsonify batch response", time_call(lambda: serialize(batch_response), repeat=30),
+           metrics, "flask.serialize_batch_response")
+    report("POST /predict/batch", time_call(
+        lambda: client.post('/predict/batch', data=batch_body, content_type='application/json'),
+        repeat=30, warmup=2), metrics, "flask.batch_round_trip")
+    report("POST /predict/batch packed", time_call(
+        lambda: client.post('/predict/batch', data=packed_body, content_type=packed_type),
+        repeat=30, warmup=2), metrics, "flask.batch_packed_round_trip")
+    json_response = client.post('/predict/batch', data=batch_body, content_type='application/json').get_data()
+    packed_response = client.post('/predict/batch', data=packed_body, content_type=packed_type).get_data()
+    metrics["flask.batch_json_kb"] = (len(batch_body) + len(json_response)) / 1024
+    metrics["flask.batch_packed_kb"] = (len(packed_body) + len(packed_response)) / 1024
+    print(f"Bytes on the wire (request + response): {metrics['flask.batch_json_kb']:.1f} KiB JSON, "
+          f"{metrics['flask.batch_packed_kb']:.1f} KiB packed")
+
+
+# Runs in a fresh interpreter: import everything, then time the model load
+# and one prediction, and report how much memory the load added
+COLD_START_SCRIPT = """
+import json, sys, time, warnings
+warnings.filterwarnings('ignore')
+import numpy as np
+from joblib import load
+from artifact import load_artifact
+from inference import FastPredictor
+
+def memory_kb():
+    fields = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return fields
+
+before = memory_kb()
+start = time.perf_counter()
+if sys.argv[1] == 'joblib':
+    predictor = FastPredictor.from_pipeline(load(sys.argv[2]))
+else:
+    preprocessor, forest, _ = load_artifact(sys.argv[2])
+    predictor = FastPredictor(preprocessor, forest=forest)
+loaded = time.perf_counter()
+predictor.predict(np.zeros((1, 13)))
+ready = time.perf_counter()
+after = memory_kb()
+print(json.dumps({
+    'load_ms': (loaded - start) * 1000,
+    'first_predict_ms': (ready - loaded) * 1000,
+    'rss_mb': (after['Rss'] - before['Rss']) / 1024,
+    'private_mb': (after['Private_Clean'] + after['Private_Dirty']
+                   - before['Private_Clean'] - before['Private_Dirty']) / 1024,
+}))
+"""
+
+
+def measure_cold_start(kind, path):
+    """Load the model in a fresh interpreter and return its timings and memory."""
+    output = subprocess.run(
+        [sys.executable, '-c', COLD_START_SCRIPT, kind, path],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def bench_cold_start(metrics):
+    if not os.path.exists(ARTIFACT_PATH):
+        print("\nNo model artifact found, run export_model.py first")
+        return
+
+    print("\n=== Cold start and memory added per worker ===")
+    print(f"{'format':<10} {'load ms':>10} {'1st predict ms':>15} {'RSS MB':>8} {'private MB':>11}")
+    for kind, path in (('joblib', PIPELINE_PATH), ('artifact', ARTIFACT_PATH)):
+        runs = [measure_cold_start(kind, path) for _ in range(3)]
+        best = min(runs, key=lambda r: r['load_ms'])
+        for name, value in best.items():
+            metrics[f"cold_start.{kind}.{name}"] = value
+        print(f"{kind:<10} {best['load_ms']:>10.1f} {best['first_predict_ms']:>15.2f} "
+              f"{best['rss_mb']:>8.1f} {best['private_mb']:>11.1f}")
+    print("The joblib load includes importing sklearn. The artifact's pages are\n"
+          "file-backed: they show as private here only because a single process\n"
+          "maps them, and are shared through the page cache across workers.")
+
+
+def bench_model_formats(pipeline, metrics):
+    """Time predict on the artifact-backed and joblib-backed predictors the server builds."""
+    if not os.path.exists(ARTIFACT_PATH):
+        print("\nNo model artifact found, run export_model.py first")
+        return
+    preprocessor, forest, header = load_artifact(ARTIFACT_PATH)
+    if header["metadata"].get("source_sha256") != file_sha256(PIPELINE_PATH):
+        print("\nModel artifact is out of date, run export_model.py first")
+        return
+    joblib_mode = FastPredictor.from_pipeline(pipeline)
+    artifact_mode = FastPredictor(preprocessor, forest=forest,
+                                  model_loader=source_model_loader(ARTIFACT_PATH, header))
+    raw = sample_features(max(BATCH_SIZES))
+
+    # The first batch above flat_max_rows loads the sklearn model once
+    start = time.perf_counter()
+    artifact_mode.predict(raw[:artifact_mode.flat_max_rows + 1])
+    metrics["formats.first_large_batch_ms"] = (time.perf_counter() - start) * 1000
+
+    print("\n=== Predict by model format (median ms per batch) ===")
+    print(f"First batch above {artifact_mode.flat_max_rows} rows in artifact mode (loads the sklearn model): "
+          f"{metrics['formats.first_large_batch_ms']:.1f} ms")
+    print(f"{'rows':>8} {'joblib':>12} {'artifact':>12} {'ratio':>9}")
+    for n in BATCH_SIZES:
+        R = raw[:n]
+        assert np.array_equal(artifact_mode.predict(R), joblib_mode.predict(R))
+        repeat = 3 if n >= 10000 else 30
+        timings = [float(np.median(time_call(lambda: predictor.predict(R), repeat=repeat, warmup=1)))
+                   for predictor in (joblib_mode, artifact_mode)]
+        metrics[f"formats.{n}.joblib_ms"], metrics[f"formats.{n}.artifact_ms"] = timings
+        print(f"{n:>8}" + ''.join(f" {ms:>12.3f}" for ms in timings) + f" {timings[1] / timings[0]:>8.2f}x")
+
+
+def bench_uncertainty(pipeline, metrics, quantiles=(0.05, 0.5, 0.95)):
+    """Time FastPredictor.predict_distribution against predict and a per-estimator loop."""
+    model = pipeline.named_steps['model']
+    fast = FastPredictor.from_pipeline(pipeline)
+    raw = sample_features(10000)
+
+    def per_estimator(R):
+        # What a client does without the one-pass mode: one call per tree
+        prepared = fast.transform(R)
+        per_tree = np.stack([tree.predict(prepared) for tree in model.estimators_])
+        return per_tree.mean(axis=0), per_tree.std(axis=0), np.quantile(per_tree, quantiles, axis=0)
+
+    print(f"\n=== Prediction intervals ({len(quantiles)} quantiles, median ms per batch) ===")
+    print(f"{'rows':>8} {'predict':>12} {'one pass':>12} {'per tree':>12} {'overhead':>9}")
+    for n in (1, 100, 1000, 10000):
+        R = raw[:n]
+        assert np.array_equal(fast.predict_distribution(R, quantiles)[0], fast.predict(R))
+        repeat = 5 if n >= 10000 else 50
+        timings = [float(np.median(time_call(fn, repeat=repeat, warmup=2))) for fn in (
+            lambda: fast.predict(R),
+            lambda: fast.predict_distribution(R, quantiles),
+            lambda: per_estimator(R),
+        )]
+        for name, ms in zip(('predict', 'distribution', 'per_estimator'), timings):
+            metrics[f"uncertainty.{n}.{name}_ms"] = ms
+        print(f"{n:>8}" + ''.join(f" {ms:>12.3f}" for ms in timings) + f" {timings[1] / timings[0]:>8.2f}x")
+
+
+def bench_explain(pipeline, metrics):
+    """Time FastPredictor.explain against predict, plus the one-off path precomputation."""
+    fast = FastPredictor.from_pipeline(pipeline)
+    raw = sample_features(10000)
+    start = time.perf_counter()
+    fast.forest.path_contributions
+    metrics["explain.precompute_ms"] = (time.perf_counter() - start) * 1000
+
+    print("\n=== Explanations (median ms per batch) ===")
+    print(f"Per-node path sums computed once in {metrics['explain.precompute_ms']:.1f} ms")
+    print(f"{'rows':>8} {'predict':>12} {'explain':>12} {'overhead':>9}")
+    for n in (1, 100, 1000, 10000):
+        R = raw[:n]
+        repeat = 5 if n >= 10000 else 50
+        timings = [float(np.median(time_call(fn, repeat=repeat, warmup=2)))
+                   for fn in (lambda: fast.predict(R), lambda: fast.explain(R))]
+        metrics[f"explain.{n}.predict_ms"], metrics[f"explain.{n}.explain_ms"] = timings
+        print(f"{n:>8}" + ''.join(f" {ms:>12.3f}" for ms in timings) + f" {timings[1] / timings[0]:>8.2f}x")
+
+
+def bench_process_pool(pipeline, metrics, n_rows=100000):
+    raw = sample_features(n_rows)
+    inline = FastPredictor.from_pipeline(pipeline)
+    inline_ms = np.median(time_call(lambda: inline.predict(raw), repeat=3, warmup=1))
+
+    print(f"\n=== Process pool, {n_rows} rows (ms per batch, {os.cpu_count()} CPUs) ===")
+    print(f"{'processes':>10} {'ms':>10} {'speed-up':>10}")
+    print(f"{'inline':>10} {inline_ms:>10.1f} {1.0:>9.2f}x")
+    metrics["process_pool.inline_ms"] = float(inline_ms)
+    for processes in sorted({1, 2, os.cpu_count() or 1}):
+        pool = ProcessPoolPredictor('joblib', PIPELINE_PATH, processes=processes, min_rows=0)
+        try:
+            pool_ms = np.median(time_call(lambda: pool.predict(raw), repeat=3, warmup=1))
+        finally:
+            pool.shutdown()
+        print(f"{processes:>10} {pool_ms:>10.1f} {inline_ms / pool_ms:>9.2f}x")
+        metrics[f"process_pool.{processes}_ms"] = float(pool_ms)
+
+
+def _package_version(name):
+    try:
+        return __import__(name).__version__
+    except (ImportError, AttributeError):
+        return None
+
+
+def collect_environment():
+    """Describe the machine and software the benchmark ran on."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "packages": {name: _package_version(name)
+                     for name in ('numpy', 'pandas', 'sklearn', 'flask', 'joblib')},
+        "pipeline_sha256": file_sha256(PIPELINE_PATH),
+    }
+
+
+def compare_to_baseline(metrics, baseline, threshold=0.15, min_delta=0.01):
+    """Return the metrics that regressed against a baseline run.
+
+    All metrics are times or sizes, so larger is worse. A metric regresses
+    when it exceeds the baseline by more than threshold (relative) and by
+    more than min_delta (absolute, to ignore noise on tiny values).
+
+    Returns:
+        List of (name, baseline value, current value) tuples.
+    """
+    regressions = []
+    for name, value in sorted(metrics.items()):
+        before = baseline.get(name)
+        if before is None or name.endswith(UNCOMPARED_SUFFIXES):
+            continue
+        if value > before * (1 + threshold) and value - before > min_delta:
+            regressions.append((name, before, value))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the prediction hot paths.")
+    parser.add_argument('--sections', nargs='+', choices=SECTIONS, default=SECTIONS)
+    parser.add_argument('--output', help="write the results (with environment info) to this JSON file")
+    parser.add_argument('--baseline', help="JSON results of an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help="relative slowdown that counts as a regression (default 0.15)")
+    args = parser.parse_args()
+
+    pipeline = load(PIPELINE_PATH)
+    metrics = {}
+    if 'single_row' in args.sections:
+        bench_single_row(pipeline, metrics)
+    if 'batch' in args.sections:
+        bench_batch_sizes(pipeline, metrics)
+    if 'flask' in args.sections:
+        bench_flask(metrics)
+    if 'cold_start' in args.sections:
+        bench_cold_start(metrics)
+    if 'formats' in args.sections:
+        bench_model_formats(pipeline, metrics)
+    if 'process_pool' in args.sections:
+        bench_process_pool(pipeline, metrics)
+    if 'uncertainty' in args.sections:
+        bench_uncertainty(pipeline, metrics)
+    if 'explain' in args.sections:
+        bench_explain(pipeline, metrics)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"environment": collect_environment(), "metrics": metrics}, f, indent=2)
+        print(f"\nResults saved to: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(metrics, baseline["metrics"], args.threshold)
+        print(f"\n=== Compared with {args.baseline} ({baseline['environment'].get('git_commit')}) ===")
+        if baseline['environment'].get('cpu_count') != os.cpu_count():
+            print("Warning: the baseline was recorded on a machine with a different CPU count")
+        for name, before, value in regressions:
+            print(f"REGRESSION {name:<48} {before:10.3f} -> {value:10.3f} ({value / before - 1:+.0%})")
+        print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,170 @@
+"""
+Process-pool executor for large prediction batches.
+
+A single Flask worker scores a batch on one core because of the GIL. This
+executor splits large batches into chunks and scores them in a pool of
+worker processes. Each process loads the model once in its initializer
+(mapping the shared artifact when that is the served format), and inputs
+and outputs travel through shared memory, so nothing is pickled per row.
+Batches below min_rows are scored inline. If a worker dies (OOM kill,
+segfault) the broken pool is replaced once, and a batch that fails on the
+replacement too is handed to the caller's in-process fallback.
+"""
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
+
+_worker_predictor = None
+
+
+def _init_worker(model_format, path, flat_max_rows):
+    global _worker_predictor
+    # Imported here so the parent does not need them to create the pool
+    from artifact import load_artifact, source_model_loader
+    from inference import FastPredictor
+
+    if model_format == 'artifact':
+        preprocessor, forest, header = load_artifact(path)
+        _worker_predictor = FastPredictor(preprocessor, forest=forest, flat_max_rows=flat_max_rows,
+                                          model_loader=source_model_loader(path, header))
+    else:
+        from joblib import load
+        _worker_predictor = FastPredictor.from_pipeline(load(path), flat_max_rows=flat_max_rows)
+
+
+def _predict_chunk(shm_name, n_rows, n_features, start, stop):
+    # Inputs occupy the first n_rows * n_features float64s of the block and
+    # the predictions the n_rows float64s after them
+    block = shared_memory.SharedMemory(name=shm_name)
+    try:
+        X = np.ndarray((n_rows, n_features), dtype=np.float64, buffer=block.buf)
+        out = np.ndarray((n_rows,), dtype=np.float64, buffer=block.buf, offset=X.nbytes)
+        out[start:stop] = _worker_predictor.predict(X[start:stop])
+        del X, out
+    finally:
+        block.close()
+
+
+class ProcessPoolPredictor:
+    """Score large batches across worker processes.
+
+    Args:
+        model_format: 'artifact' or 'joblib', the format each worker loads.
+        path: Path of the model file in that format.
+        processes: Number of worker processes.
+        min_rows: Batches smaller than this are left to the caller.
+        chunk_rows: Rows per task; defaults to an even split across
+            processes.
+        flat_max_rows: Passed on to each worker's FastPredictor.
+    """
+
+    def __init__(self, model_format, path, processes, min_rows=20000, chunk_rows=None, flat_max_rows=1024):
+        self.model_format = model_format
+        self.path = path
+        self.processes = processes
+        self.min_rows = min_rows
+        self.chunk_rows = chunk_rows
+        self.flat_max_rows = flat_max_rows
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        # Pools do not survive fork, so create one per serving process
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.processes,
+                        mp_context=multiprocessing.get_context('spawn'),
+                        initializer=_init_worker,
+                        initargs=(self.model_format, self.path, self.flat_max_rows),
+                    )
+                    self._pid = os.getpid()
+        return self._pool
+
+    def reconfigure(self, model_format, path):
+        """Serve a different model: the next batch starts fresh workers that load it.
+
+        Batches already running finish on the old workers.
+        """
+        with self._lock:
+            old_pool = self._pool if self._pid == os.getpid() else None
+            self.model_format = model_format
+            self.path = path
+            self._pool = None
+            self._pid = None
+        if old_pool is not None:
+            old_pool.shutdown(wait=False)
+
+    def _discard(self, pool):
+        """Shut down a broken pool so the next _get_pool() starts a new one."""
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+                self._pid = None
+        pool.shutdown(wait=False)
+
+    def should_use(self, n_rows):
+        return self.processes > 0 and n_rows >= self.min_rows
+
+    def predict(self, X, fallback=None):
+        """Predict an (n, n_features) float64 array across the pool.
+
+        Args:
+            X: Raw feature rows.
+            fallback: Optional callable predicting X in-process, used when
+                the pool is still broken after being rebuilt.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        n_rows, n_features = X.shape
+        chunk_rows = self.chunk_rows or math.ceil(n_rows / self.processes)
+
+        block = shared_memory.SharedMemory(create=True, size=X.nbytes + n_rows * 8)
+        try:
+            shared_X = np.ndarray(X.shape, dtype=np.float64, buffer=block.buf)
+            shared_X[:] = X
+            # Chunks are idempotent, so a retry resubmits all of them
+            for attempt in range(2):
+                pool = self._get_pool()
+                try:
+                    futures = [
+                        pool.submit(_predict_chunk, block.name, n_rows, n_features, start,
+                                    min(start + chunk_rows, n_rows))
+                        for start in range(0, n_rows, chunk_rows)
+                    ]
+                    for future in futures:
+                        future.result()
+                    break
+                except BrokenProcessPool as e:
+                    # A worker died; replace the pool once, then give up on it
+                    self._discard(pool)
+                    if attempt:
+                        if fallback is None:
+                            raise
+                        print(f"Process pool failed again ({e}), predicting in-process")
+                        del shared_X
+                        return fallback(X)
+                    print(f"Process pool broken ({e}), restarting it")
+                except RuntimeError:
+                    # reconfigure() shut this pool down between get and submit
+                    if attempt:
+                        raise
+            out = np.ndarray((n_rows,), dtype=np.float64, buffer=block.buf, offset=X.nbytes).copy()
+            del shared_X
+            return out
+        finally:
+            block.close()
+            block.unlink()
+
+    def shutdown(self):
+        if self._pool is not None and self._pid == os.getpid():
+            self._pool.shutdown()
+        self._pool = None
+        self._pid = None
@@ -0,0 +1,40 @@
+"""
+Export the combined pipeline to the memory-mappable model artifact
+(Model/pipeline_combined.bin) served by the backend.
+
+Run after save_combined_pipeline.py, from the Backend directory:
+    python export_model.py
+"""
+import os
+
+import sklearn
+from joblib import load
+
+from artifact import file_sha256, read_header, write_artifact
+from forest_engine import FlatForest
+from inference import FusedPreprocessor
+
+MODEL_DIR = os.path.join(os.path.dirname(__file__), '..', 'Model')
+PIPELINE_PATH = os.path.join(MODEL_DIR, 'pipeline_combined.joblib')
+ARTIFACT_PATH = os.path.join(MODEL_DIR, 'pipeline_combined.bin')
+
+
+def export_pipeline(pipeline_path=PIPELINE_PATH, artifact_path=ARTIFACT_PATH):
+    """Compile the joblib pipeline at pipeline_path into artifact_path."""
+    pipeline = load(pipeline_path)
+    preprocessor = FusedPreprocessor.from_pipeline(pipeline.named_steps['preprocessing'])
+    forest = FlatForest.from_sklearn(pipeline.named_steps['model'])
+    write_artifact(artifact_path, preprocessor, forest, metadata={
+        "source": os.path.basename(pipeline_path),
+        "source_sha256": file_sha256(pipeline_path),
+        "model_type": type(pipeline.named_steps['model']).__name__,
+        "sklearn_version": sklearn.__version__,
+    })
+    return read_header(artifact_path)
+
+
+if __name__ == '__main__':
+    header = export_pipeline()
+    size_mb = os.path.getsize(ARTIFACT_PATH) / 1e6
+    print(f"Model artifact saved to: {ARTIFACT_PATH} ({size_mb:.2f} MB, "
+          f"{header['n_trees']} trees, {header['n_nodes']} nodes)")
@@ -0,0 +1,254 @@
+"""
+Flat-array evaluation engine for fitted sklearn random forests.
+
+All trees of a RandomForestRegressor are flattened into shared contiguous
+arrays (feature, threshold, left, right, value) with child indices that are
+global across the forest. A batch is then scored level by level for every
+tree at once with vectorized NumPy gathers, instead of dispatching one
+Cython predict call per estimator through joblib.
+
+The same traversal yields every tree's prediction for a batch at once, from
+which predict_distribution summarises the spread of the ensemble (mean,
+standard deviation and quantiles across trees) per row.
+
+explain attributes each prediction to the features by path attribution
+(as in treeinterpreter): every split on a row's path moves the prediction
+from the parent's value to the child's, and that change is credited to the
+split feature. The sums along the path to every node are precomputed once,
+so explaining a batch is one traversal plus one gather per tree.
+"""
+import numpy as np
+
+# Rows scored per traversal pass; bounds the (n_trees * rows) working set
+DEFAULT_CHUNK_SIZE = 8192
+
+# Tree levels descended between compactions of the unfinished paths
+LEVELS_PER_PASS = 4
+
+
+class FlatForest:
+    """A forest of regression trees stored as flat node arrays.
+
+    Args:
+        feature: Split feature per node (0 for leaves).
+        threshold: Split threshold per node; a row goes left when
+            ``x[feature] <= threshold``.
+        children: Interleaved (left, right) global child indices, i.e.
+            ``children[2 * node + go_right]``. Leaves point to themselves.
+        value: Mean target value of each node.
+        roots: Global index of the root node of each tree.
+        n_features: Number of input features the trees were fitted on.
+        is_leaf: Optional precomputed leaf mask; derived from children when
+            not given.
+    """
+
+    def __init__(self, feature, threshold, children, value, roots, n_features, is_leaf=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.n_features = int(n_features)
+        if is_leaf is None:
+            is_leaf = self.left == np.arange(len(feature))
+        self.is_leaf = is_leaf
+        self._paths = None
+
+    @property
+    def left(self):
+        return self.children[0::2]
+
+    @property
+    def right(self):
+        return self.children[1::2]
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Flatten the estimators_ of a fitted sklearn forest regressor."""
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        if any(tree.n_outputs != 1 for tree in trees):
+            raise ValueError("only single-output regression forests are supported")
+
+        sizes = np.array([tree.node_count for tree in trees])
+        roots = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+        n_nodes = int(sizes.sum())
+
+        feature = np.empty(n_nodes, dtype=np.int32)
+        threshold = np.empty(n_nodes, dtype=np.float64)
+        children = np.empty((n_nodes, 2), dtype=np.int64)
+        value = np.empty(n_nodes, dtype=np.float64)
+
+        for offset, tree in zip(roots, trees):
+            nodes = slice(offset, offset + tree.node_count)
+            local = np.arange(tree.node_count)
+            leaf = tree.children_left == -1
+            feature[nodes] = np.where(leaf, 0, tree.feature)
+            threshold[nodes] = tree.threshold
+            children[nodes, 0] = offset + np.where(leaf, local, tree.children_left)
+            children[nodes, 1] = offset + np.where(leaf, local, tree.children_right)
+            value[nodes] = tree.value[:, 0, 0]
+
+        return cls(feature, threshold, children.ravel(), value, roots, model.n_features_in_)
+
+    def _prepare(self, X):
+        # sklearn evaluates splits on float32 inputs; do the same so that
+        # rows sitting exactly on a threshold follow the same branch
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"expected an array of shape (n, {self.n_features}), got {X.shape}")
+        return np.ascontiguousarray(X, dtype=np.float32)
+
+    def apply(self, X):
+        """Return the global leaf index reached by every row in every tree.
+
+        Args:
+            X: C-contiguous (n, n_features) float32 array.
+
+        Returns:
+            (n_trees, n) int64 array of leaf indices.
+        """
+        n_rows = X.shape[0]
+        flat_X = X.ravel()
+        node = np.repeat(self.roots, n_rows)
+        # Offset of each (tree, row) pair's row in the flattened X
+        row_offset = np.tile(np.arange(n_rows, dtype=np.int64) * self.n_features, self.n_trees)
+
+        active = np.arange(node.size)
+        current = node
+        while active.size:
+            # Advance every unfinished (tree, row) pair a few levels per pass;
+            # leaves point to themselves so finished pairs just stay put
+            for _ in range(LEVELS_PER_PASS):
+                go_right = flat_X[row_offset + self.feature[current]] > self.threshold[current]
+                current = self.children[2 * current + go_right]
+            node[active] = current
+            unfinished = ~self.is_leaf[current]
+            active = active[unfinished]
+            current = current[unfinished]
+            row_offset = row_offset[unfinished]
+
+        return node.reshape(self.n_trees, n_rows)
+
+    def _chunks(self, X, chunk_size):
+        for start in range(0, X.shape[0], chunk_size):
+            yield slice(start, start + chunk_size), X[start:start + chunk_size]
+
+    def predict_per_tree(self, X, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Return the (n_trees, n) matrix of individual tree predictions."""
+        X = self._prepare(X)
+        out = np.empty((self.n_trees, X.shape[0]), dtype=np.float64)
+        for rows, chunk in self._chunks(X, chunk_size):
+            out[:, rows] = self.value[self.apply(chunk)]
+        return out
+
+    def predict(self, X, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Average the tree predictions, matching RandomForestRegressor.predict."""
+        X = self._prepare(X)
+        out = np.empty(X.shape[0], dtype=np.float64)
+        for rows, chunk in self._chunks(X, chunk_size):
+            out[rows] = tree_mean(self.value[self.apply(chunk)])
+        return out
+
+    def predict_distribution(self, X, quantiles=(), chunk_size=DEFAULT_CHUNK_SIZE):
+        """Summarise the tree predictions of every row in one traversal.
+
+        Returns:
+            (mean, std, quantile_values) as described in summarize_trees.
+        """
+        X = self._prepare(X)
+        mean = np.empty(X.shape[0], dtype=np.float64)
+        std = np.empty(X.shape[0], dtype=np.float64)
+        quantile_values = np.empty((len(quantiles), X.shape[0]), dtype=np.float64)
+        for rows, chunk in self._chunks(X, chunk_size):
+            mean[rows], std[rows], quantile_values[:, rows] = summarize_trees(
+                self.value[self.apply(chunk)], quantiles)
+        return mean, std, quantile_values
+
+    @property
+    def path_contributions(self):
+        """(n_nodes, n_features) value changes along the root-to-node path, by split feature.
+
+        Computed on first use, one tree level at a time.
+        """
+        if self._paths is None:
+            paths = np.zeros((self.n_nodes, self.n_features))
+            frontier = np.asarray(self.roots)
+            while frontier.size:
+                frontier = frontier[~self.is_leaf[frontier]]
+                feature = self.feature[frontier]
+                children = (self.left[frontier], self.right[frontier])
+                for child in children:
+                    paths[child] = paths[frontier]
+                    paths[child, feature] += self.value[child] - self.value[frontier]
+                frontier = np.concatenate(children)
+            self._paths = paths
+        return self._paths
+
+    @property
+    def base_value(self):
+        """Prediction before any split: the mean of the root values."""
+        return float(np.mean(self.value[self.roots]))
+
+    def explain(self, X, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Split every prediction into the base value plus one contribution per feature.
+
+        Returns:
+            (predictions, contributions): predictions match predict exactly
+            and equal base_value + contributions.sum(axis=1) up to rounding;
+            contributions is an (n, n_features) array.
+        """
+        X = self._prepare(X)
+        paths = self.path_contributions
+        predictions = np.empty(X.shape[0], dtype=np.float64)
+        contributions = np.empty((X.shape[0], self.n_features), dtype=np.float64)
+        for rows, chunk in self._chunks(X, chunk_size):
+            leaves = self.apply(chunk)
+            predictions[rows] = tree_mean(self.value[leaves])
+            total = np.zeros((chunk.shape[0], self.n_features))
+            for tree_leaves in leaves:
+                total += paths[tree_leaves]
+            contributions[rows] = total / self.n_trees
+        return predictions, contributions
+
+
+def tree_mean(per_tree):
+    """Average an (n_trees, n) matrix exactly like RandomForestRegressor.predict."""
+    # Accumulate tree by tree in estimator order, like sklearn does
+    total = np.zeros(per_tree.shape[1])
+    for tree_values in per_tree:
+        total += tree_values
+    return total / len(per_tree)
+
+
+def summarize_trees(per_tree, quantiles=()):
+    """Mean, standard deviation and quantiles of per-tree predictions.
+
+    The spread is that of the trees' estimates of the conditional mean, so
+    it measures how much the ensemble disagrees on a row, not the noise of
+    individual prices.
+
+    Args:
+        per_tree: (n_trees, n) matrix of tree predictions.
+        quantiles: Probabilities in [0, 1].
+
+    Returns:
+        (mean, std, quantile_values): mean matches the forest's predict
+        exactly, std is the population standard deviation across trees and
+        quantile_values is a (len(quantiles), n) array (linear
+        interpolation between trees).
+    """
+    mean = tree_mean(per_tree)
+    std = np.sqrt(np.mean(np.square(per_tree - mean), axis=0))
+    if len(quantiles):
+        quantile_values = np.quantile(per_tree, quantiles, axis=0)
+    else:
+        quantile_values = np.empty((0, per_tree.shape[1]))
+    return mean, std, quantile_values
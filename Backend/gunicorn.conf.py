@@ -0,0 +1,11 @@
+"""
+Gunicorn settings picked up automatically by `gunicorn app:app`.
+
+With preload_app the model is loaded once in the master before forking, so
+workers start instantly and share its memory copy-on-write. Set
+GUNICORN_PRELOAD=0 together with MODEL_LOAD_MODE=lazy to have each worker
+load the model on its first request instead.
+"""
+import os
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
@@ -0,0 +1,235 @@
+"""
+Pandas-free inference path for the combined pipeline.
+
+The combined pipeline (imputer -> scaler -> model) is unpacked once and
+applied directly to float64 NumPy arrays, which skips DataFrame
+construction and sklearn's column validation on every request. Results are
+numerically identical to pipeline.predict on a DataFrame.
+"""
+import os
+import threading
+
+import numpy as np
+
+from forest_engine import DEFAULT_CHUNK_SIZE, FlatForest, summarize_trees
+from schema import FEATURE_ORDER, record_to_row
+
+
+class FusedPreprocessor:
+    """Median imputation and standard scaling compiled into one affine step.
+
+    For every column the fitted transform is ``(x - mean) / scale`` with NaNs
+    replaced by the median first. Since a NaN stays NaN through the affine
+    part, the scaled median is precomputed and written over NaNs afterwards,
+    so one subtract/divide pass over a preallocated buffer does the job of
+    SimpleImputer + StandardScaler.
+
+    Args:
+        fill: Per-column imputation values (SimpleImputer.statistics_).
+        mean: Per-column means (StandardScaler.mean_), or None.
+        scale: Per-column scales (StandardScaler.scale_), or None.
+    """
+
+    def __init__(self, fill, mean=None, scale=None):
+        n_features = len(fill)
+        self.fill = np.asarray(fill, dtype=np.float64)
+        self.mean = np.zeros(n_features) if mean is None else np.asarray(mean, dtype=np.float64)
+        self.scale = np.ones(n_features) if scale is None else np.asarray(scale, dtype=np.float64)
+        self.scaled_fill = (self.fill - self.mean) / self.scale
+
+    @classmethod
+    def from_pipeline(cls, preprocessing):
+        """Compile a fitted Pipeline([("imputer", ...), ("std_scalar", ...)])."""
+        imputer = preprocessing.named_steps['imputer']
+        scaler = preprocessing.named_steps['std_scalar']
+        return cls(imputer.statistics_, scaler.mean_, scaler.scale_)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as params:
+            return cls(params['fill'], params['mean'], params['scale'])
+
+    def save(self, path):
+        """Write the parameters to path atomically, so a watching server never reads half a file."""
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        try:
+            # A file object keeps np.savez from appending .npz to the name
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, fill=self.fill, mean=self.mean, scale=self.scale)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def equals(self, other):
+        return all(
+            np.array_equal(a, b)
+            for a, b in ((self.fill, other.fill), (self.mean, other.mean), (self.scale, other.scale))
+        )
+
+    def transform(self, X, out=None):
+        """Write the preprocessed X into out (allocated if not given) and return it."""
+        if out is None:
+            out = np.empty(np.shape(X), dtype=np.float64)
+        np.subtract(X, self.mean, out=out)
+        np.divide(out, self.scale, out=out)
+        np.copyto(out, self.scaled_fill, where=np.isnan(out))
+        return out
+
+
+class FastPredictor:
+    """Run fitted preprocessing and a forest on NumPy arrays without pandas.
+
+    Args:
+        preprocessor: FusedPreprocessor applied to every batch.
+        forest: Optional FlatForest engine.
+        model: Optional fitted sklearn model. At least one of forest and
+            model is required.
+        flat_max_rows: Batches up to this many rows are scored with the
+            FlatForest engine; larger ones go to the sklearn model when one
+            is available, since its compiled traversal wins once per-call
+            overhead is amortised. Set to 0 to always use sklearn.
+        version: Identifier of the model artifact this predictor serves.
+        source: Optional (format, path) the model was loaded from, for
+            worker processes that need to load the same model.
+        model_loader: Optional zero-argument callable returning the sklearn
+            model (or None), called the first time a batch is larger than
+            flat_max_rows when no model was given (see
+            artifact.source_model_loader).
+    """
+
+    def __init__(self, preprocessor, forest=None, model=None, flat_max_rows=1024, version=None,
+                 source=None, model_loader=None):
+        if forest is None and model is None:
+            raise ValueError("a forest or a model is required")
+        self.version = version
+        self.source = source
+        self.preprocessor = preprocessor
+        self.forest = forest
+        self.model = model
+        self.flat_max_rows = flat_max_rows
+        self._local = threading.local()
+        self._explain_forest = forest
+        self._model_loader = model_loader if model is None else None
+        self._model_lock = threading.Lock()
+
+    @classmethod
+    def from_pipeline(cls, pipeline, preprocessor=None, flat_max_rows=1024, version=None, source=None):
+        """Unpack the Pipeline saved by save_combined_pipeline.py.
+
+        The pipeline is ("preprocessing", Pipeline([("imputer", ...),
+        ("std_scalar", ...)])) followed by ("model", ...). The fused
+        preprocessing is compiled from it unless one is given.
+        """
+        if preprocessor is None:
+            preprocessor = FusedPreprocessor.from_pipeline(pipeline.named_steps['preprocessing'])
+        model = pipeline.named_steps['model']
+        forest = None
+        if flat_max_rows > 0:
+            try:
+                forest = FlatForest.from_sklearn(model)
+            except (AttributeError, ValueError):
+                # Not a single-output tree ensemble; keep using model.predict
+                forest = None
+        return cls(preprocessor, forest=forest, model=model, flat_max_rows=flat_max_rows, version=version,
+                   source=source)
+
+    def _row_buffer(self):
+        # One preallocated (1, n_features) buffer per thread for single rows
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            buffer = self._local.buffer = np.empty((1, len(FEATURE_ORDER)), dtype=np.float64)
+        return buffer
+
+    def transform(self, X):
+        """Apply median imputation and standard scaling to X."""
+        X = np.asarray(X, dtype=np.float64)
+        out = self._row_buffer() if X.shape[0] == 1 else None
+        return self.preprocessor.transform(X, out=out)
+
+    def predict(self, X):
+        """Predict prices (in $1000s) for an (n, 13) float64 array."""
+        return self.predict_transformed(self.transform(X))
+
+    def _use_forest(self, n_rows):
+        """True if a batch of n_rows goes to the FlatForest engine rather than sklearn."""
+        if self.forest is None:
+            return False
+        if n_rows <= self.flat_max_rows:
+            return True
+        if self.model is None and self._model_loader is not None:
+            with self._model_lock:
+                if self._model_loader is not None:
+                    self.model = self._model_loader()
+                    self._model_loader = None
+        return self.model is None
+
+    def predict_transformed(self, X):
+        """Predict from rows that already went through transform()."""
+        if self._use_forest(X.shape[0]):
+            return self.forest.predict(X)
+        return self.model.predict(X)
+
+    def predict_distribution(self, X, quantiles=()):
+        """Mean, standard deviation and quantiles of the per-tree predictions.
+
+        Args:
+            X: (n, 13) float64 array of raw features.
+            quantiles: Probabilities in [0, 1].
+
+        Returns:
+            (mean, std, quantile_values) in $1000s, see
+            forest_engine.summarize_trees. mean equals predict(X).
+
+        Raises:
+            ValueError: If the model is not a forest of regression trees.
+        """
+        X = self.transform(X)
+        if self._use_forest(X.shape[0]):
+            return self.forest.predict_distribution(X, quantiles)
+        trees = list(getattr(self.model, 'estimators_', []))
+        if not trees or not all(hasattr(tree, 'tree_') for tree in trees):
+            raise ValueError(f"prediction intervals need a random forest, not {type(self.model).__name__}")
+        # Large batches: sklearn's compiled per-tree predict, in chunks to
+        # bound the (n_trees, rows) matrix
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        mean = np.empty(X.shape[0])
+        std = np.empty(X.shape[0])
+        quantile_values = np.empty((len(quantiles), X.shape[0]))
+        for start in range(0, X.shape[0], DEFAULT_CHUNK_SIZE):
+            rows = slice(start, start + DEFAULT_CHUNK_SIZE)
+            per_tree = np.stack([tree.predict(X[rows], check_input=False) for tree in trees])
+            mean[rows], std[rows], quantile_values[:, rows] = summarize_trees(per_tree, quantiles)
+        return mean, std, quantile_values
+
+    def explain(self, X):
+        """Attribute the predictions for X to the features (see FlatForest.explain).
+
+        Args:
+            X: (n, 13) float64 array of raw features.
+
+        Returns:
+            (predictions, base_value, contributions) in $1000s, with
+            contributions an (n, 13) array in FEATURE_ORDER.
+
+        Raises:
+            ValueError: If the model is not a forest of regression trees.
+        """
+        forest = self._explain_forest
+        if forest is None:
+            try:
+                forest = FlatForest.from_sklearn(self.model)
+            except (AttributeError, ValueError):
+                raise ValueError(f"explanations need a random forest, not {type(self.model).__name__}") from None
+            self._explain_forest = forest
+        predictions, contributions = forest.explain(self.transform(X))
+        return predictions, forest.base_value, contributions
+
+    def predict_one(self, features):
+        """Predict the price (in $1000s) of a single feature dictionary.
+
+        Raises:
+            ValidationError: If features does not match the schema (see
+                schema.record_to_row).
+        """
+        return float(self.predict(record_to_row(features))[0])
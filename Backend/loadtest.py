@@ -0,0 +1,323 @@
+"""
+HTTP load generator for the prediction API.
+
+Drives POST /predict from a pool of client threads (one keep-alive
+connection each) and reports throughput, p50/p95/p99/max latency and the
+error rate. Payloads are listings sampled from REdata.csv, lightly
+jittered by default so that every request misses the prediction cache.
+
+Clients either send back to back (closed loop, --concurrency) or at a
+fixed total rate (open loop, --rps); in the open-loop mode latency is
+measured from each request's scheduled send time, so a stalled server
+shows up in the percentiles instead of silently lowering the load.
+
+--server starts the backend locally (Flask dev server, gunicorn or
+uvicorn with --workers) for the duration of the run, --sweep runs several
+concurrency levels and reports where throughput stops growing, and
+--compare loads gunicorn and uvicorn with the same settings.
+
+Usage (from the Backend directory):
+    python loadtest.py --url http://127.0.0.1:5000 --concurrency 16
+    python loadtest.py --server gunicorn --workers 2 --rps 200 --duration 20
+    python loadtest.py --server gunicorn --workers 2 --sweep 1 2 4 8 16 32 64
+    python loadtest.py --compare --workers 2 --concurrency 32
+"""
+import argparse
+import csv
+import http.client
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+import urllib.request
+from contextlib import nullcontext
+
+import numpy as np
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'Model', 'REdata.csv')
+TEST_INPUT = {
+    'CRIM': 0.00632, 'ZN': 18.0, 'INDUS': 2.31, 'CHAS': 0,
+    'NOX': 0.538, 'RM': 6.575, 'AGE': 65.2, 'DIS': 4.09,
+    'RAD': 1, 'TAX': 296, 'PTRATIO': 15.3, 'B': 396.9, 'LSTAT': 4.98
+}
+# Integer-coded features are sent unchanged when jittering
+DISCRETE_FEATURES = {'CHAS', 'RAD', 'ZN'}
+
+
+def sample_payloads(n=1000, seed=0, jitter=0.01, path=DATA_PATH):
+    """Draw n /predict payloads from the listings in REdata.csv.
+
+    Args:
+        n: Number of payloads (sampled with replacement).
+        seed: Random seed.
+        jitter: Relative standard deviation of the noise applied to the
+            continuous features; 0 replays the listings exactly (and lets
+            the prediction cache answer most requests).
+        path: CSV with the feature columns.
+    """
+    with open(path, newline='') as f:
+        rows = [{name: float(value) for name, value in row.items() if name in TEST_INPUT and value}
+                for row in csv.DictReader(f)]
+    rng = np.random.default_rng(seed)
+    payloads = []
+    for index in rng.integers(0, len(rows), n):
+        payload = {}
+        for name, value in rows[index].items():
+            if name in DISCRETE_FEATURES:
+                payload[name] = int(value) if value.is_integer() else value
+            else:
+                payload[name] = round(value * (1 + jitter * rng.standard_normal()), 6)
+        payloads.append(payload)
+    return payloads
+
+
+def _client(host, port, path, payloads, stop_at, latencies, statuses, lock, interval=None, offset=0.0):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    headers = {'Content-Type': 'application/json'}
+    local_latencies = []
+    local_statuses = {}
+    i = 0
+    next_at = time.perf_counter() + offset
+    while time.perf_counter() < stop_at:
+        body = payloads[i % len(payloads)]
+        i += 1
+        if interval is None:
+            start = time.perf_counter()
+        else:
+            # Open loop: time from the scheduled send, not the actual one
+            start = next_at
+            next_at += interval
+            delay = start - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            if start >= stop_at:
+                break
+        try:
+            conn.request('POST', path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            status = 'connection error'
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+        local_latencies.append((time.perf_counter() - start) * 1000)
+        local_statuses[status] = local_statuses.get(status, 0) + 1
+    conn.close()
+    with lock:
+        latencies.extend(local_latencies)
+        for status, count in local_statuses.items():
+            statuses[status] = statuses.get(status, 0) + count
+
+
+def run_load(url, concurrency=8, duration=10.0, path='/predict', payloads=None, rps=None):
+    """Send requests from `concurrency` clients for `duration` seconds.
+
+    Args:
+        url: Base URL of the server.
+        concurrency: Number of client threads / connections.
+        duration: Seconds to run.
+        path: Endpoint to POST to.
+        payloads: Request bodies as dictionaries, cycled through by every
+            client (default: the single TEST_INPUT listing).
+        rps: Target total requests per second, spread evenly over the
+            clients; None sends back to back.
+
+    Returns:
+        Dictionary with request count, throughput, error rate, latency
+        percentiles (ms) and a count per HTTP status.
+    """
+    parsed = urllib.parse.urlparse(url)
+    payloads = [json.dumps(p).encode('utf-8') for p in (payloads or [TEST_INPUT])]
+    latencies, statuses, lock = [], {}, threading.Lock()
+    stop_at = time.perf_counter() + duration
+    interval = concurrency / rps if rps else None
+
+    threads = [
+        threading.Thread(target=_client, args=(
+            parsed.hostname, parsed.port or 80, path,
+            # Each client starts on a different part of the payload list
+            payloads[i * len(payloads) // concurrency:] + payloads[:i * len(payloads) // concurrency],
+            stop_at, latencies, statuses, lock,
+            interval, i * interval / concurrency if interval else 0.0))
+        for i in range(concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    total = len(latencies)
+    errors = sum(count for status, count in statuses.items() if status != 200)
+    latencies = np.array(latencies) if latencies else np.zeros(1)
+    return {
+        "concurrency": concurrency,
+        "target_rps": rps,
+        "requests": total,
+        "throughput_rps": total / elapsed,
+        "error_rate": errors / total if total else 0.0,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "max_ms": float(latencies.max()),
+        "statuses": {str(status): count for status, count in statuses.items()},
+    }
+
+
+def wait_until_ready(url, timeout=60.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url + '/ready', timeout=2) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"server at {url} did not become ready")
+
+
+def start_server(kind, port, workers):
+    """Start the Flask app (dev server or gunicorn) or the ASGI app (uvicorn) locally."""
+    if kind == 'flask':
+        # Single process; --workers does not apply to the dev server
+        command = [sys.executable, '-m', 'flask', '--app', 'app', 'run',
+                   '--host', '127.0.0.1', '--port', str(port), '--with-threads']
+    elif kind == 'gunicorn':
+        command = ['gunicorn', 'app:app', '--bind', f'127.0.0.1:{port}', '--workers', str(workers)]
+    else:
+        command = ['uvicorn', 'asgi:app', '--host', '127.0.0.1', '--port', str(port),
+                   '--workers', str(workers), '--log-level', 'warning']
+    return subprocess.Popen(
+        command, cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+
+def print_result(name, result):
+    print(f"{name:<10} {result['concurrency']:>5} {result['throughput_rps']:>10.1f} "
+          f"{result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+          f"{result['max_ms']:>9.2f} {result['error_rate'] * 100:>7.2f}%")
+
+
+def print_header():
+    print(f"{'server':<10} {'conc':>5} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'max ms':>9} {'errors':>8}")
+
+
+class LocalServer:
+    """Context manager that runs start_server() until the block exits."""
+
+    def __init__(self, kind, workers, port=5099):
+        self.kind = kind
+        self.workers = workers
+        self.url = f'http://127.0.0.1:{port}'
+        self.port = port
+        self.process = None
+
+    def __enter__(self):
+        self.process = start_server(self.kind, self.port, self.workers)
+        try:
+            wait_until_ready(self.url)
+        except BaseException:
+            self.__exit__()
+            raise
+        return self
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        self.process.wait()
+
+
+def find_saturation(results, min_gain=0.1, max_error_rate=0.01):
+    """Return the sweep result after which adding clients stops paying off.
+
+    A level saturates the server when its throughput is less than min_gain
+    above the best seen so far or its error rate exceeds max_error_rate;
+    the level before the first such one is the saturation point.
+    """
+    best = None
+    for result in results:
+        if result['error_rate'] > max_error_rate:
+            return best
+        if best is not None and result['throughput_rps'] < best['throughput_rps'] * (1 + min_gain):
+            return best
+        best = result
+    return best
+
+
+def sweep(url, levels, duration, payloads, name='target'):
+    """Run the load at each concurrency level and report the saturation point."""
+    print_header()
+    run_load(url, levels[0], min(duration, 2.0), payloads=payloads)  # warm-up
+    results = []
+    for concurrency in levels:
+        result = run_load(url, concurrency, duration, payloads=payloads)
+        print_result(name, result)
+        results.append(result)
+    knee = find_saturation(results)
+    if knee is not None and knee is not results[-1]:
+        print(f"\nSaturation at concurrency {knee['concurrency']}: {knee['throughput_rps']:.1f} req/s, "
+              f"p99 {knee['p99_ms']:.2f} ms; more clients only add latency")
+    else:
+        print("\nNo saturation within the sweep; try higher concurrency levels")
+    return results, knee
+
+
+def compare(workers, concurrency, duration, payloads=None, port=5099, rps=None):
+    """Load gunicorn and uvicorn in turn and return one result per server."""
+    print_header()
+    results = []
+    for kind in ('gunicorn', 'uvicorn'):
+        with LocalServer(kind, workers, port) as server:
+            run_load(server.url, concurrency, min(duration, 2.0), payloads=payloads)  # warm-up
+            result = run_load(server.url, concurrency, duration, payloads=payloads, rps=rps)
+            print_result(kind, result)
+            results.append({"server": kind, **result})
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--server', choices=['flask', 'gunicorn', 'uvicorn'],
+                        help='start this server locally instead of using --url')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--rps', type=float, help='target requests per second (open loop)')
+    parser.add_argument('--sweep', type=int, nargs='+', metavar='N',
+                        help='concurrency levels to sweep to find the saturation point')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--payloads', type=int, default=1000, help='listings sampled from REdata.csv')
+    parser.add_argument('--jitter', type=float, default=0.01,
+                        help='relative noise on the sampled listings (0 replays them exactly)')
+    parser.add_argument('--compare', action='store_true',
+                        help='start gunicorn and uvicorn locally and load both')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args()
+    if args.sweep and (args.rps or args.compare):
+        parser.error("--sweep varies the concurrency of closed-loop clients; "
+                     "it cannot be combined with --rps or --compare")
+
+    payloads = sample_payloads(args.payloads, jitter=args.jitter)
+    name = 'compare' if args.compare else args.server or 'target'
+    if args.compare:
+        results = compare(args.workers, args.concurrency, args.duration, payloads, rps=args.rps)
+    else:
+        with LocalServer(args.server, args.workers) if args.server else nullcontext() as server:
+            url = server.url if server else args.url
+            if args.sweep:
+                results, _ = sweep(url, sorted(args.sweep), args.duration, payloads, name)
+            else:
+                print_header()
+                results = [run_load(url, args.concurrency, args.duration, payloads=payloads, rps=args.rps)]
+                print_result(name, results[0])
+    if args.output and results:
+        with open(args.output, 'w') as f:
+            json.dump({"server": name, "workers": args.workers, "results": results}, f, indent=2)
+        print(f"Results saved to: {args.output}")
@@ -0,0 +1,228 @@
+"""
+Lightweight in-process metrics for the prediction API.
+
+Counters and histograms are plain Python objects guarded by a lock, cheap
+enough to leave on for every request, and can be rendered in the
+Prometheus text exposition format for the /metrics endpoint. Under gunicorn
+every worker keeps its own values, so each scrape sees one worker.
+
+SlowRequestProfiler runs cProfile on a random sample of requests and keeps
+the profiles of the ones that turned out slow.
+"""
+import cProfile
+import io
+import pstats
+import random
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+
+
+class Histogram:
+    """Fixed-bucket histogram that is safe to update from several threads.
+
+    Args:
+        buckets: Sorted upper bounds of the buckets. Observations larger than
+            the last bound are counted in an implicit +Inf bucket.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = list(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        # First bucket whose upper bound is >= value
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self):
+        """Return the histogram as a JSON-serialisable dictionary."""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+            count = self._count
+        bounds = [str(b) for b in self.buckets] + ['+Inf']
+        return {
+            "buckets": [{"le": b, "count": c} for b, c in zip(bounds, counts)],
+            "count": count,
+            "sum": total,
+            "mean": total / count if count else 0.0,
+        }
+
+
+class HistogramFamily:
+    """Histograms with the same buckets, one per combination of label values.
+
+    Args:
+        label_names: Names of the labels, e.g. ("stage",).
+        buckets: Bucket upper bounds shared by every child histogram.
+    """
+
+    def __init__(self, label_names, buckets):
+        self.label_names = tuple(label_names)
+        self.buckets = list(buckets)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, Histogram(self.buckets))
+        return child
+
+    def items(self):
+        with self._lock:
+            return sorted(self._children.items())
+
+    def time(self, *values):
+        """Context manager observing the elapsed seconds of its block."""
+        return _Timer(self.labels(*values))
+
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class Counter:
+    """Monotonic counters, one per combination of label values."""
+
+    def __init__(self, label_names=()):
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *values, amount=1):
+        with self._lock:
+            self._values[values] = self._values.get(values, 0) + amount
+
+    def items(self):
+        with self._lock:
+            return sorted(self._values.items())
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{escaped}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+class PrometheusText:
+    """Builder for a Prometheus text-format (version 0.0.4) scrape body."""
+
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self, prefix=''):
+        self.prefix = prefix
+        self.lines = []
+
+    def _header(self, name, kind, help_text):
+        self.lines.append(f'# HELP {self.prefix}{name} {help_text}')
+        self.lines.append(f'# TYPE {self.prefix}{name} {kind}')
+
+    def value(self, name, kind, help_text, samples, label_names=()):
+        """Add a counter or gauge.
+
+        Args:
+            samples: A single number, or (label values, number) pairs.
+        """
+        self._header(name, kind, help_text)
+        if not isinstance(samples, (list, tuple)):
+            samples = [((), samples)]
+        for values, number in samples:
+            if number is None:
+                continue
+            self.lines.append(f'{self.prefix}{name}{_format_labels(label_names, values)} {float(number)!r}')
+
+    def counter(self, name, help_text, counter):
+        self.value(name, 'counter', help_text, counter.items(), counter.label_names)
+
+    def histogram(self, name, help_text, histograms, label_names=()):
+        """Add a Histogram, or a HistogramFamily with its labels."""
+        self._header(name, 'histogram', help_text)
+        children = histograms.items() if isinstance(histograms, HistogramFamily) else [((), histograms)]
+        if isinstance(histograms, HistogramFamily):
+            label_names = histograms.label_names
+        for values, histogram in children:
+            snapshot = histogram.snapshot()
+            cumulative = 0
+            for bucket in snapshot["buckets"]:
+                cumulative += bucket["count"]
+                labels = _format_labels(label_names + ('le',), values + (bucket["le"],))
+                self.lines.append(f'{self.prefix}{name}_bucket{labels} {cumulative}')
+            labels = _format_labels(label_names, values)
+            self.lines.append(f'{self.prefix}{name}_sum{labels} {snapshot["sum"]!r}')
+            self.lines.append(f'{self.prefix}{name}_count{labels} {snapshot["count"]}')
+
+    def render(self):
+        return '\n'.join(self.lines) + '\n'
+
+
+class SlowRequestProfiler:
+    """Profile a random sample of requests and keep the slow ones.
+
+    Args:
+        sample_rate: Fraction of requests to run under cProfile (0 disables).
+        slow_ms: Profiles of sampled requests faster than this are dropped.
+        keep: Number of slow profiles to keep (oldest are discarded).
+        top: Number of functions listed in each kept profile.
+    """
+
+    def __init__(self, sample_rate=0.0, slow_ms=100.0, keep=20, top=25):
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.top = top
+        self.sampled = 0
+        self.profiles = deque(maxlen=keep)
+
+    @property
+    def enabled(self):
+        return self.sample_rate > 0
+
+    def start(self):
+        """Return a running cProfile.Profile if this request is sampled, else None."""
+        if not self.enabled or random.random() >= self.sample_rate:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is already active on this thread
+            return None
+        self.sampled += 1
+        return profile
+
+    def finish(self, profile, seconds, description):
+        """Stop profile and keep its report if the request was slow."""
+        profile.disable()
+        if seconds * 1000 < self.slow_ms:
+            return
+        out = io.StringIO()
+        pstats.Stats(profile, stream=out).sort_stats('cumulative').print_stats(self.top)
+        self.profiles.append({
+            "request": description,
+            "duration_ms": seconds * 1000,
+            "at": time.time(),
+            "profile": out.getvalue(),
+        })
@@ -0,0 +1,188 @@
+"""
+Model registry for the backend.
+
+Owns the loaded predictor and records how long loading took. The model can
+be loaded eagerly at import time (so that `gunicorn --preload` loads it once
+in the master and forked workers share it copy-on-write) or lazily, on the
+first request or readiness probe, so that imports and health checks stay
+fast.
+
+With watch() the registry also polls for a new model and hot-swaps it: the
+replacement is loaded and warmed up on a background thread while requests
+keep using the current predictor, then swapped in with a single reference
+assignment. Requests that already called get() finish on the old version.
+"""
+import os
+import threading
+import time
+
+
+class ModelRegistry:
+    """Load a predictor once, on demand, report readiness and hot-swap it.
+
+    Args:
+        loader: Zero-argument callable returning the predictor.
+        warmup: Optional callable run on every freshly loaded predictor
+            before it serves requests (e.g. a few predictions to fault in
+            memory-mapped pages and allocate buffers).
+    """
+
+    def __init__(self, loader, warmup=None):
+        self._loader = loader
+        self._warmup = warmup
+        self._predictor = None
+        self._lock = threading.Lock()
+        self._swap_lock = threading.Lock()
+        self._loading = False
+        self._swap_callbacks = []
+        self._watch = None
+        self._watcher_pid = None
+        self._signature = None
+        self.load_seconds = None
+        self.loaded_at = None
+        self.error = None
+        self.swaps = 0
+        self.previous_version = None
+
+    @property
+    def ready(self):
+        return self._predictor is not None
+
+    def _load_and_warm(self):
+        signature = self._watch[0]() if self._watch else None
+        start = time.perf_counter()
+        predictor = self._loader()
+        if self._warmup is not None:
+            self._warmup(predictor)
+        return predictor, signature, time.perf_counter() - start
+
+    def load(self):
+        """Load the predictor if it is not loaded yet and return it."""
+        if self._predictor is not None:
+            return self._predictor
+        with self._lock:
+            if self._predictor is None:
+                self._loading = True
+                try:
+                    predictor, signature, seconds = self._load_and_warm()
+                except Exception as e:
+                    self.error = str(e)
+                    raise
+                finally:
+                    self._loading = False
+                self.load_seconds = seconds
+                self.loaded_at = time.time()
+                self.error = None
+                self._signature = signature
+                self._predictor = predictor
+                print(f"Model loaded in {self.load_seconds * 1000:.1f}ms")
+        return self._predictor
+
+    def load_in_background(self):
+        """Start loading on a daemon thread unless a load is done or running."""
+        if self._predictor is not None or self._loading:
+            return
+        self._loading = True
+        threading.Thread(target=self._load_quietly, name="model-loader", daemon=True).start()
+
+    def _load_quietly(self):
+        try:
+            self.load()
+        except Exception as e:
+            print(f"Error loading model: {e}")
+
+    def on_swap(self, callback):
+        """Call callback(predictor) with each new predictor right after it is swapped in.
+
+        Callbacks only run once the swap has succeeded, so they never move to
+        a model the registry does not serve. A failing callback is reported in
+        status() and does not stop the others.
+        """
+        self._swap_callbacks.append(callback)
+
+    def reload(self):
+        """Load, warm and swap in the model now; keep the old one on failure.
+
+        Returns:
+            The predictor serving requests afterwards.
+        """
+        with self._swap_lock:
+            try:
+                predictor, signature, seconds = self._load_and_warm()
+            except Exception as e:
+                self.error = str(e)
+                print(f"Error reloading model, keeping the current one: {e}")
+                return self._predictor
+            old = self._predictor
+            # A single reference assignment: get() sees either model, never a mix
+            self._predictor = predictor
+            self._signature = signature
+            self.load_seconds = seconds
+            self.loaded_at = time.time()
+            self.error = None
+            if old is not None:
+                self.swaps += 1
+                self.previous_version = getattr(old, 'version', None)
+            print(f"Model {getattr(predictor, 'version', '')} swapped in after {seconds * 1000:.1f}ms "
+                  f"(was {self.previous_version})")
+            for callback in self._swap_callbacks:
+                try:
+                    callback(predictor)
+                except Exception as e:
+                    self.error = f"swap callback failed: {e}"
+                    print(f"Error in a model swap callback: {e}")
+            return predictor
+
+    def watch(self, signature, interval=10.0):
+        """Poll signature() every interval seconds and reload when it changes.
+
+        signature should be cheap (file stats, a pointer file). A change is
+        acted on once it has been stable for two polls, so a model that is
+        still being written is not picked up half-way.
+        """
+        if interval > 0:
+            self._watch = (signature, interval)
+
+    def _ensure_watcher(self):
+        # Threads do not survive fork, so start the watcher in each process
+        if self._watch is None or self._watcher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._watcher_pid != os.getpid():
+                self._watcher_pid = os.getpid()
+                threading.Thread(target=self._watch_loop, name="model-watcher", daemon=True).start()
+
+    def _watch_loop(self):
+        signature, interval = self._watch
+        pending = None
+        while True:
+            time.sleep(interval)
+            try:
+                current = signature()
+            except Exception as e:
+                print(f"Error checking for a new model: {e}")
+                continue
+            if current == self._signature:
+                pending = None
+            elif current == pending:
+                self.reload()
+                pending = None
+            else:
+                pending = current
+
+    def get(self):
+        """Return the predictor, loading it first if needed."""
+        self._ensure_watcher()
+        return self.load()
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "loading": self._loading,
+            "version": getattr(self._predictor, 'version', None),
+            "load_seconds": self.load_seconds,
+            "loaded_at": self.loaded_at,
+            "swaps": self.swaps,
+            "previous_version": self.previous_version,
+            "error": self.error,
+        }
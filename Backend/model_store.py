@@ -0,0 +1,132 @@
+"""
+Versioned model store served by the backend (MODEL_STORE_DIR).
+
+Layout:
+    <root>/CURRENT                          name of the active version
+    <root>/<version>/pipeline_combined.joblib
+    <root>/<version>/pipeline_combined.bin      (optional, forests only)
+    <root>/<version>/preprocessing_fused.npz    (optional)
+    <root>/<version>/training_manifest.json     (optional)
+
+Versions are never modified once published. Publishing copies the files
+into a new version directory and then atomically replaces CURRENT, so a
+server polling the store never sees a half-written model; rolling back is
+activating an older version.
+
+Usage (from the Backend directory):
+    python model_store.py --root ../Model/store publish ../Model
+    python model_store.py --root ../Model/store list
+    python model_store.py --root ../Model/store activate 20260101-120000-c2770da2
+"""
+import argparse
+import os
+import shutil
+import time
+
+from artifact import file_sha256
+
+MODEL_FILES = {
+    "pipeline": 'pipeline_combined.joblib',
+    "artifact": 'pipeline_combined.bin',
+    "preprocessing": 'preprocessing_fused.npz',
+    "manifest": 'training_manifest.json',
+}
+
+
+class ModelStore:
+    """Immutable model versions in subdirectories of root, plus a CURRENT pointer."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def versions(self):
+        """Names of the published versions, oldest first."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if os.path.isfile(os.path.join(self.root, name, MODEL_FILES["pipeline"])))
+
+    def current(self):
+        """Name of the active version, or None if nothing was published."""
+        try:
+            with open(os.path.join(self.root, 'CURRENT')) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def files(self, version=None):
+        """Paths of the model files of version (default: the active one)."""
+        version = version or self.current()
+        if version is None:
+            raise FileNotFoundError(f"no model version published in {self.root}")
+        return {name: os.path.join(self.root, version, filename) for name, filename in MODEL_FILES.items()}
+
+    def activate(self, version):
+        """Point CURRENT at an existing version."""
+        if version not in self.versions():
+            raise ValueError(f"unknown model version {version!r}")
+        tmp_path = os.path.join(self.root, f'CURRENT.tmp-{os.getpid()}')
+        with open(tmp_path, 'w') as f:
+            f.write(version + '\n')
+        os.replace(tmp_path, os.path.join(self.root, 'CURRENT'))
+
+    def publish(self, source_dir, version=None, activate=True):
+        """Copy the model files in source_dir into a new version.
+
+        Args:
+            source_dir: Directory holding pipeline_combined.joblib and,
+                optionally, the other MODEL_FILES.
+            version: Version name; defaults to a timestamp plus the first
+                characters of the pipeline's SHA-256.
+            activate: Make the new version the active one.
+
+        Returns:
+            The version name.
+        """
+        pipeline_path = os.path.join(source_dir, MODEL_FILES["pipeline"])
+        if version is None:
+            version = f"{time.strftime('%Y%m%d-%H%M%S')}-{file_sha256(pipeline_path)[:8]}"
+        target = os.path.join(self.root, version)
+        if os.path.exists(target):
+            raise ValueError(f"model version {version!r} already exists")
+
+        tmp_dir = os.path.join(self.root, f'.{version}.tmp-{os.getpid()}')
+        os.makedirs(tmp_dir)
+        try:
+            for filename in MODEL_FILES.values():
+                source = os.path.join(source_dir, filename)
+                if os.path.exists(source):
+                    shutil.copy2(source, os.path.join(tmp_dir, filename))
+            os.replace(tmp_dir, target)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        if activate:
+            self.activate(version)
+        return version
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Manage the versioned model store.")
+    parser.add_argument('--root', default=os.environ.get('MODEL_STORE_DIR'), required='MODEL_STORE_DIR' not in os.environ)
+    commands = parser.add_subparsers(dest='command', required=True)
+    publish = commands.add_parser('publish', help='copy a trained model into a new version')
+    publish.add_argument('source_dir', nargs='?', default=os.path.join(os.path.dirname(__file__), '..', 'Model'))
+    publish.add_argument('--version')
+    publish.add_argument('--no-activate', action='store_true')
+    activate = commands.add_parser('activate', help='make an existing version the active one')
+    activate.add_argument('version')
+    commands.add_parser('list', help='list the published versions')
+    args = parser.parse_args()
+
+    store = ModelStore(args.root)
+    if args.command == 'publish':
+        version = store.publish(args.source_dir, args.version, activate=not args.no_activate)
+        print(f"Published model version {version}" + ("" if args.no_activate else " (active)"))
+    elif args.command == 'activate':
+        store.activate(args.version)
+        print(f"Active model version: {args.version}")
+    else:
+        current = store.current()
+        for version in store.versions():
+            print(f"{'*' if version == current else ' '} {version}")
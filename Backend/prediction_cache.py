@@ -0,0 +1,223 @@
+"""
+Prediction cache keyed on canonicalized feature vectors.
+
+Rows are rounded to a configurable precision and hashed together with the
+model version, so a new model artifact never serves stale predictions.
+Entries of a replaced version are not cleared (requests for the old and
+new model overlap during a hot-swap); they age out through the TTL and LRU.
+Lookups go to a bounded per-process LRU with TTL first and then, if
+configured, to a shared backend (Redis) used by every worker and instance.
+The shared tier is optional: when it fails, the error is counted and the
+request is served with the local LRU alone.
+Large batches skip the cache: hashing every row costs more than the rare
+repeated rows in them save.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class LocalCacheBackend:
+    """In-memory stand-in for a shared backend, with per-entry TTL.
+
+    Implements the same get_many / set_many interface as RedisCacheBackend
+    so it can be used in tests and single-process deployments.
+    """
+
+    # Exceptions that mean the backend is unavailable rather than a bug
+    errors = ()
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        with self._lock:
+            values = []
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is None or entry[1] < now:
+                    values.append(None)
+                else:
+                    values.append(entry[0])
+            return values
+
+    def set_many(self, mapping, ttl):
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            for key, value in mapping.items():
+                self._data[key] = (value, expires_at)
+
+
+class RedisCacheBackend:
+    """Shared backend storing predictions in Redis (needs the redis package).
+
+    Args:
+        url: Redis connection URL, e.g. redis://localhost:6379/0.
+        prefix: Namespace prepended to every key.
+    """
+
+    def __init__(self, url, prefix='predict:'):
+        import redis  # optional dependency, only needed for a shared cache
+        self._client = redis.Redis.from_url(url)
+        self.errors = (redis.RedisError,)
+        self._prefix = prefix
+
+    def get_many(self, keys):
+        values = self._client.mget([self._prefix + key for key in keys])
+        return [None if value is None else float(value) for value in values]
+
+    def set_many(self, mapping, ttl):
+        pipe = self._client.pipeline(transaction=False)
+        for key, value in mapping.items():
+            pipe.setex(self._prefix + key, int(ttl), repr(float(value)))
+        pipe.execute()
+
+
+class PredictionCache:
+    """Bounded LRU/TTL cache in front of a batch predict function.
+
+    Args:
+        max_entries: Maximum number of entries kept in the local LRU.
+        ttl_seconds: Time an entry stays valid, locally and in the shared
+            backend.
+        precision: Number of decimals feature values are rounded to before
+            hashing.
+        shared: Optional shared backend (LocalCacheBackend or
+            RedisCacheBackend) consulted on local misses.
+        max_rows: Batches with more rows than this are passed straight to
+            predict_fn (None caches every batch).
+    """
+
+    def __init__(self, max_entries=10000, ttl_seconds=3600, precision=6, shared=None, max_rows=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.precision = precision
+        self.shared = shared
+        self.max_rows = max_rows
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bypassed = 0
+        self.shared_errors = 0
+
+    def keys(self, X, version):
+        """Return one cache key per row of X for the given model version."""
+        X = np.round(np.asarray(X, dtype=np.float64), self.precision)
+        # Canonicalize -0.0 and NaN payloads so equal rows hash equally
+        X[X == 0] = 0.0
+        X[np.isnan(X)] = np.nan
+        prefix = str(version).encode('utf-8') + b'\0'
+        return [
+            hashlib.blake2b(prefix + row.tobytes(), digest_size=16).hexdigest()
+            for row in X
+        ]
+
+    def _get_local(self, keys):
+        now = time.monotonic()
+        values = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] >= now:
+                    self._entries.move_to_end(key)
+                    values.append(entry[0])
+                else:
+                    if entry is not None:
+                        del self._entries[key]
+                    values.append(None)
+        return values
+
+    def _set_local(self, mapping):
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            for key, value in mapping.items():
+                self._entries[key] = (value, expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _shared_call(self, method, *args):
+        # An unreachable shared tier must not fail the request
+        try:
+            return method(*args)
+        except self.shared.errors as exc:
+            with self._lock:
+                self.shared_errors += 1
+                first = self.shared_errors == 1
+            if first:
+                print(f"Shared prediction cache unavailable, using the local cache only: {exc}")
+            return None
+
+    def predict(self, predict_fn, X, version):
+        """Return predictions for X, only calling predict_fn for cache misses.
+
+        Args:
+            predict_fn: Callable scoring an (n, n_features) array.
+            X: (n, n_features) float64 array.
+            version: Identifier of the model that predict_fn evaluates.
+        """
+        if self.max_rows is not None and len(X) > self.max_rows:
+            with self._lock:
+                self.bypassed += len(X)
+            return predict_fn(X)
+        keys = self.keys(X, version)
+        values = self._get_local(keys)
+
+        missing = [i for i, value in enumerate(values) if value is None]
+        if missing and self.shared is not None:
+            shared_values = self._shared_call(self.shared.get_many, [keys[i] for i in missing])
+            if shared_values is None:
+                shared_values = [None] * len(missing)
+            found = {keys[i]: value for i, value in zip(missing, shared_values) if value is not None}
+            if found:
+                self._set_local(found)
+                for i, value in zip(missing, shared_values):
+                    values[i] = value
+            missing = [i for i in missing if values[i] is None]
+        else:
+            found = ()
+
+        with self._lock:
+            # Disjoint counters: rows served locally, rows found in the shared tier
+            self.local_hits += len(keys) - len(missing) - len(found)
+            self.shared_hits += len(found)
+            self.misses += len(missing)
+
+        if missing:
+            predictions = predict_fn(np.asarray(X)[missing])
+            computed = {}
+            for i, prediction in zip(missing, predictions):
+                values[i] = float(prediction)
+                computed[keys[i]] = values[i]
+            self._set_local(computed)
+            if self.shared is not None:
+                self._shared_call(self.shared.set_many, computed, self.ttl_seconds)
+
+        return np.array(values, dtype=np.float64)
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "precision": self.precision,
+            "max_rows": self.max_rows,
+            "shared_backend": type(self.shared).__name__ if self.shared is not None else None,
+            "local_hits": self.local_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "bypassed": self.bypassed,
+            "shared_errors": self.shared_errors,
+        }
@@ -0,0 +1,230 @@
+"""
+Request schema and wire formats for the prediction API.
+
+The 13 features are compiled once, at import, into a name -> column lookup
+and per-column bound arrays, so validating a JSON record is one pass over
+its keys and the range checks are a few vectorized comparisons. Problems
+are reported as structured details ({"field", "code", "error"}) instead of
+surfacing as exceptions from deep inside the model.
+
+The bounds are the typical ranges the interactive predictor in
+Model/real_estate_prediction.py prompts with. Values outside them are
+still valid numbers, so the API decides per request whether they are
+rejected, reported as warnings or ignored.
+
+Besides JSON, /predict/batch accepts packed rows: the body is n * 13
+little-endian float64 (or float32) values in FEATURE_ORDER, with NaN for a
+missing value, and the predictions are returned packed the same way.
+MessagePack bodies carry the same payloads as JSON and need the optional
+msgpack package.
+"""
+import math
+
+import numpy as np
+
+# Define the correct feature order (as used during training)
+FEATURE_ORDER = ['CRIM', 'ZN', 'INDUS', 'CHAS', 'NOX', 'RM', 'AGE', 'DIS', 'RAD', 'TAX', 'PTRATIO', 'B', 'LSTAT']
+
+# name: (typical min, typical max), from the `parameters` table of
+# Model/real_estate_prediction.py
+FEATURE_RANGES = {
+    'CRIM': (0.00632, 88.9762),
+    'ZN': (0.0, 100.0),
+    'INDUS': (0.46, 27.74),
+    'CHAS': (0, 1),
+    'NOX': (0.385, 0.871),
+    'RM': (3.561, 8.78),
+    'AGE': (2.9, 100.0),
+    'DIS': (1.1296, 12.1265),
+    'RAD': (1, 24),
+    'TAX': (187, 711),
+    'PTRATIO': (12.6, 22.0),
+    'B': (0.32, 396.9),
+    'LSTAT': (1.73, 37.97),
+}
+
+# Categorical / index features that only take whole values
+INTEGER_FEATURES = ('CHAS', 'RAD')
+
+# Packed-row content types and the NumPy dtype of their values
+BINARY_CONTENT_TYPES = {
+    'application/vnd.realestate.rows+float64': '<f8',
+    'application/vnd.realestate.rows+float32': '<f4',
+}
+MSGPACK_CONTENT_TYPES = ('application/msgpack', 'application/x-msgpack')
+
+# Upper bound on the quantiles requested with ?quantiles=
+MAX_QUANTILES = 20
+
+N_FEATURES = len(FEATURE_ORDER)
+_COLUMN = {name: i for i, name in enumerate(FEATURE_ORDER)}
+LOWER = np.array([FEATURE_RANGES[name][0] for name in FEATURE_ORDER], dtype=np.float64)
+UPPER = np.array([FEATURE_RANGES[name][1] for name in FEATURE_ORDER], dtype=np.float64)
+WHOLE = np.array([name in INTEGER_FEATURES for name in FEATURE_ORDER])
+
+
+class ValidationError(ValueError):
+    """Invalid request data; details lists one {"field", "code", "error"} per problem."""
+
+    def __init__(self, details):
+        self.details = details
+        super().__init__('; '.join(
+            f"{d['field']}: {d['error']}" if d.get('field') else d['error'] for d in details))
+
+
+def _detail(field, code, error, **extra):
+    return {"field": field, "code": code, "error": error, **extra}
+
+
+def record_to_row(record, out=None):
+    """Validate one feature dictionary and write it into a float64 row.
+
+    Absent keys and nulls become NaN so the imputer fills them. Unknown
+    keys, non-numbers (including booleans) and non-finite numbers are
+    errors. Ranges are not checked here; see check_ranges.
+
+    Args:
+        record: The decoded JSON object.
+        out: Optional float64 array of N_FEATURES values to fill.
+
+    Returns:
+        out, or a new (1, N_FEATURES) float64 array.
+
+    Raises:
+        ValidationError: With every problem found in the record.
+    """
+    if not isinstance(record, dict):
+        raise ValidationError([_detail(None, "type", "record must be a JSON object of feature values")])
+    row = np.full((1, N_FEATURES), np.nan) if out is None else out
+    flat = row.reshape(-1)
+    if out is not None:
+        flat.fill(np.nan)
+    details = []
+    for name, value in record.items():
+        column = _COLUMN.get(name)
+        if column is None:
+            details.append(_detail(name, "unknown_field", "unknown feature"))
+            continue
+        kind = type(value)
+        if kind is float or kind is int:
+            try:
+                value = float(value)
+            except OverflowError:
+                value = math.inf
+            if math.isfinite(value):
+                flat[column] = value
+            else:
+                details.append(_detail(name, "not_finite", "value must be finite"))
+        elif value is not None:
+            details.append(_detail(name, "type", f"expected a number, got {kind.__name__}"))
+    if details:
+        raise ValidationError(details)
+    return row
+
+
+def check_ranges(X):
+    """Find values outside their typical range, or fractional integer features.
+
+    Args:
+        X: Float64 array of shape (n, N_FEATURES); NaN (missing) is ignored.
+
+    Returns:
+        List of (row index, detail) pairs, in row order.
+    """
+    with np.errstate(invalid='ignore'):
+        outside = (X < LOWER) | (X > UPPER)
+        fractional = WHOLE & (X != np.floor(X)) & ~np.isnan(X)
+    problems = []
+    # Rows are almost always clean; only the flagged cells are visited
+    for i, j in zip(*np.nonzero(outside | fractional)):
+        name = FEATURE_ORDER[j]
+        value = float(X[i, j])
+        if outside[i, j]:
+            detail = _detail(name, "out_of_range",
+                             f"{value:g} is outside the typical range {LOWER[j]:g} to {UPPER[j]:g}",
+                             min=FEATURE_RANGES[name][0], max=FEATURE_RANGES[name][1])
+        else:
+            detail = _detail(name, "not_integer", f"{value:g} must be a whole number")
+        problems.append((int(i), detail))
+    return problems
+
+
+def infinite_values(X):
+    """Find infinite values in a packed-row matrix (NaN marks a missing value).
+
+    Returns:
+        List of (row index, detail) pairs, in row order.
+    """
+    return [(int(i), _detail(FEATURE_ORDER[j], "not_finite", "value must be finite (NaN marks a missing value)"))
+            for i, j in np.argwhere(np.isinf(X))]
+
+
+def parse_quantiles(text):
+    """Parse the ?quantiles= query parameter, e.g. "0.05,0.5,0.95".
+
+    Returns:
+        Tuple of floats in [0, 1], in the order given.
+
+    Raises:
+        ValidationError: For anything else.
+    """
+    try:
+        quantiles = tuple(float(part) for part in text.split(',') if part.strip())
+    except ValueError:
+        raise ValidationError([_detail("quantiles", "type", f"expected comma-separated numbers, got {text!r}")])
+    if not quantiles or len(quantiles) > MAX_QUANTILES:
+        raise ValidationError([_detail("quantiles", "length", f"expected 1 to {MAX_QUANTILES} quantiles")])
+    if not all(0 <= q <= 1 for q in quantiles):
+        raise ValidationError([_detail("quantiles", "out_of_range", "quantiles must be between 0 and 1")])
+    return quantiles
+
+
+def quantile_label(q):
+    """Key of a quantile in responses, e.g. 0.05 -> "0.05"."""
+    return f"{q:g}"
+
+
+def binary_dtype(content_type):
+    """Return the dtype of a packed-row content type, or None for other types."""
+    return BINARY_CONTENT_TYPES.get((content_type or '').split(';')[0].strip().lower())
+
+
+def is_msgpack(content_type):
+    return (content_type or '').split(';')[0].strip().lower() in MSGPACK_CONTENT_TYPES
+
+
+def decode_rows(body, dtype):
+    """Unpack a packed-row body into a (n, N_FEATURES) float64 array.
+
+    NaN marks a missing value. Infinite values are left in place for the
+    caller to report against their rows.
+
+    Raises:
+        ValidationError: If the body is not a whole number of rows.
+    """
+    row_bytes = N_FEATURES * np.dtype(dtype).itemsize
+    if len(body) % row_bytes:
+        raise ValidationError([_detail(None, "length",
+                                       f"body of {len(body)} bytes is not a whole number of "
+                                       f"{N_FEATURES}-value rows ({row_bytes} bytes each)")])
+    return np.frombuffer(body, dtype=dtype).reshape(-1, N_FEATURES).astype(np.float64)
+
+
+def unknown_fields(names):
+    """Details for the names that are not features (e.g. columns of a columnar payload)."""
+    return [_detail(name, "unknown_field", "unknown feature") for name in names if name not in _COLUMN]
+
+
+def encode_predictions(values, dtype):
+    """Pack predictions as little-endian values of dtype (NaN for failed rows)."""
+    return np.ascontiguousarray(values, dtype=dtype).tobytes()
+
+
+def decode_msgpack(body):
+    import msgpack  # optional dependency, only needed for MessagePack clients
+    return msgpack.unpackb(body)
+
+
+def encode_msgpack(payload):
+    import msgpack
+    return msgpack.packb(payload)
@@ -1,8 +1,39 @@
 """
 Test script for the Flask prediction API
+
+The first checks run the app in-process with Flask's test client. The rest
+need the server running on http://127.0.0.1:5000 and the requests package.
 """
-import requests
+import atexit
 import json
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+from joblib import load
+
+from artifact import atomic_dump, file_sha256
+from export_model import export_pipeline
+from inference import FastPredictor
+from model_store import ModelStore
+
+# Coalesce concurrent /predict calls in the in-process app
+os.environ.setdefault('PREDICT_COALESCE', '1')
+os.environ.setdefault('PREDICT_BATCH_MAX_WAIT_MS', '20')
+
+# Serve the current model from a temporary store, watched for new versions
+MODEL_DIR = os.path.join(os.path.dirname(__file__), '..', 'Model')
+store = ModelStore(tempfile.mkdtemp(prefix='model-store-'))
+atexit.register(shutil.rmtree, store.root, True)
+store.publish(MODEL_DIR, version='v1')
+os.environ['MODEL_STORE_DIR'] = store.root
+os.environ['MODEL_WATCH_INTERVAL'] = '0.2'
+
+import app as flask_app  # noqa: E402
 
 # Test data
 test_input = {
@@ -21,6 +52,103 @@ test_input = {
     'LSTAT': 4.98
 }
 
+# In-process checks with Flask's test client
+client = flask_app.app.test_client()
+
+# Rows of a batch are validated one by one: bad rows get structured
+# details, the good ones are still scored
+response = client.post('/predict/batch', json=[test_input, {**test_input, 'CRIM': 'high'}, {'ROOMS': 3}])
+body = response.get_json()
+details = {error['index']: error['details'][0] for error in body.get('errors', [])}
+if (response.status_code == 200 and body['predictions'][0] is not None and body['predictions'][1:] == [None, None]
+        and details[1]['field'] == 'CRIM' and details[1]['code'] == 'type'
+        and details[2]['field'] == 'ROOMS' and details[2]['code'] == 'unknown_field'):
+    print("✓ Invalid batch rows get per-row details, valid rows are scored")
+else:
+    print(f"✗ Batch with invalid rows returned {response.status_code}: {body}")
+
+# A payload that is invalid as a whole is a structured 400
+response = client.post('/predict/batch', json={'columns': {'CRIM': [0.1], 'ROOMS': [3]}})
+body = response.get_json()
+if response.status_code == 400 and body['details'][0]['code'] == 'unknown_field':
+    print("✓ Invalid batch payload rejected with a structured 400")
+else:
+    print(f"✗ Invalid batch payload returned {response.status_code}")
+
+# Batches over MAX_BATCH_SIZE are refused before any row is validated
+response = client.post('/predict/batch', json=[{}] * (flask_app.MAX_BATCH_SIZE + 1))
+if response.status_code == 413:
+    print(f"✓ Batches over {flask_app.MAX_BATCH_SIZE} rows rejected with 413")
+else:
+    print(f"✗ Oversized batch returned {response.status_code}")
+
+# Bodies over MAX_REQUEST_BYTES are refused before they are parsed
+response = client.post('/predict/batch', data=b' ' * (flask_app.MAX_REQUEST_BYTES + 1),
+                       content_type='application/json')
+if response.status_code == 413 and response.get_json()['status'] == 'error':
+    print(f"✓ Bodies over {flask_app.MAX_REQUEST_BYTES} bytes rejected with 413")
+else:
+    print(f"✗ Oversized body returned {response.status_code}")
+
+# Concurrent single predictions are coalesced by the micro-batcher and score
+# exactly like direct predictions
+rows = [{**test_input, 'RM': 5 + i / 10} for i in range(16)]
+predictor = flask_app.registry.get()
+expected = [round(predictor.predict_one(row) * 1000, 3) for row in rows]
+results = [None] * len(rows)
+barrier = threading.Barrier(len(rows))
+
+
+def post_single(i):
+    thread_client = flask_app.app.test_client()
+    barrier.wait()
+    results[i] = thread_client.post('/predict', json=rows[i]).get_json().get('prediction')
+
+
+threads = [threading.Thread(target=post_single, args=(i,)) for i in range(len(rows))]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+batches = flask_app.batcher.batch_size.snapshot()['count']
+if results == expected and batches < len(rows):
+    print(f"✓ {len(rows)} concurrent /predict calls scored in {batches} batches, matching direct predictions")
+else:
+    print(f"✗ Micro-batching: {batches} batches for {len(rows)} calls, results {results} != {expected}")
+
+# Publishing a new version to the store swaps it in without a restart
+old_version = client.post('/predict', json=test_input).get_json()['model_version']
+source_dir = tempfile.mkdtemp(prefix='model-v2-')
+atexit.register(shutil.rmtree, source_dir, True)
+pipeline = load(store.files('v1')['pipeline'])
+forest = pipeline.named_steps['model']
+forest.estimators_ = forest.estimators_[:50]
+forest.n_estimators = 50
+pipeline_path = os.path.join(source_dir, 'pipeline_combined.joblib')
+atomic_dump(pipeline, pipeline_path)
+export_pipeline(pipeline_path, os.path.join(source_dir, 'pipeline_combined.bin'))
+store.publish(source_dir, version='v2')
+deadline = time.time() + 10
+body = {}
+while time.time() < deadline:
+    body = client.post('/predict', json=test_input).get_json()
+    if body.get('model_version') != old_version:
+        break
+    time.sleep(0.1)
+new_prediction = round(FastPredictor.from_pipeline(pipeline).predict_one(test_input) * 1000, 3)
+if (body.get('model_version') == file_sha256(pipeline_path)[:12] and body['prediction'] == new_prediction
+        and flask_app.registry.status()['swaps'] == 1):
+    print(f"✓ Published model hot-swapped in: {old_version} -> {body['model_version']}")
+else:
+    print(f"✗ Hot-swap: still serving {body.get('model_version')} after publishing a new version")
+
+# Everything below talks to a running server
+try:
+    import requests
+except ImportError:
+    print("! requests is not installed, skipping the live-server checks")
+    sys.exit(0)
+
 try:
     # Test the /predict endpoint
     response = requests.post(
@@ -37,6 +165,50 @@ try:
         print(f"\n✓ Test passed! Predicted price: ${prediction}k")
     else:
         print(f"\n✗ Test failed with status {response.status_code}")
+
+    # Prediction intervals from the spread of the forest's trees
+    response = requests.post('http://127.0.0.1:5000/predict?quantiles=0.05,0.95', json=test_input)
+    interval = response.json().get('quantiles', {})
+    if response.status_code == 200 and interval.get('0.05', 1e9) <= interval.get('0.95', 0):
+        print(f"✓ 90% tree interval: ${interval['0.05']} - ${interval['0.95']}")
+    else:
+        print(f"✗ Quantile request failed with status {response.status_code}")
+
+    # Explanations split the prediction into per-feature contributions
+    response = requests.post('http://127.0.0.1:5000/explain', json=test_input)
+    explanation = response.json()
+    if response.status_code == 200:
+        total = explanation['base_value'] + sum(explanation['contributions'].values())
+        print(f"✓ /explain: base ${explanation['base_value']} + contributions = ${total:.0f}")
+    else:
+        print(f"✗ /explain failed with status {response.status_code}")
+
+    # Invalid input is a structured 400, not a server error
+    response = requests.post('http://127.0.0.1:5000/predict', json={**test_input, 'CRIM': True})
+    if response.status_code == 400 and response.json()['details'][0]['field'] == 'CRIM':
+        print("✓ Invalid input rejected with a structured 400")
+    else:
+        print(f"✗ Invalid input returned {response.status_code}")
+
+    # Packed float64 rows in FEATURE_ORDER get packed float64 predictions back
+    row = struct.pack('<13d', *test_input.values())
+    response = requests.post(
+        'http://127.0.0.1:5000/predict/batch',
+        data=row * 2,
+        headers={'Content-Type': 'application/vnd.realestate.rows+float64'}
+    )
+    packed = struct.unpack('<2d', response.content) if response.status_code == 200 else None
+    if packed and packed[0] == packed[1] == prediction:
+        print("✓ Packed-row batch matches /predict")
+    else:
+        print(f"✗ Packed-row batch failed with status {response.status_code}")
+
+    # The request above must show up in the Prometheus metrics
+    metrics = requests.get('http://127.0.0.1:5000/metrics').text
+    if 'realestate_requests_total{endpoint="/predict",method="POST"' in metrics:
+        print("✓ /metrics counts /predict requests")
+    else:
+        print("✗ /metrics does not list /predict requests")
         
 except requests.exceptions.ConnectionError:
     print("✗ Cannot connect to Flask server. Make sure it's running on http://127.0.0.1:5000")
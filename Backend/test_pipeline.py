@@ -2,9 +2,24 @@
 Simple test: load the pipeline and make a prediction directly
 without running the Flask server.
 """
+import numpy as np
 import pandas as pd
 from joblib import load
+import contextlib
+import io
 import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from artifact import file_sha256, load_artifact, source_model_loader
+from batching import MicroBatcher
+from forest_engine import FlatForest
+from inference import FEATURE_ORDER, FastPredictor
+from model_registry import ModelRegistry
+from prediction_cache import LocalCacheBackend, PredictionCache
+from schema import ValidationError
 
 # Load the combined pipeline
 MODEL_DIR = os.path.join(os.path.dirname(__file__), '..', 'Model')
@@ -28,4 +43,207 @@ print(f"\nInput data:\n{input_df}")
 # Make prediction
 prediction = pipeline.predict(input_df)[0]
 print(f"\n✓ Prediction successful: ${prediction:.3f}k")
+
+# The pandas-free fast path must reproduce the pipeline exactly
+fast_predictor = FastPredictor.from_pipeline(pipeline)
+assert fast_predictor.predict_one(test_input) == prediction
+try:
+    fast_predictor.predict_one({**test_input, 'ROOMS': 6})
+    raise AssertionError("unknown features must be rejected")
+except ValidationError as e:
+    assert e.details[0]["code"] == "unknown_field"
+housing = pd.read_csv(os.path.join(MODEL_DIR, 'REdata.csv'))
+features = housing[FEATURE_ORDER].to_numpy(dtype=np.float64)
+features[::7, 5] = np.nan  # exercise the imputer
+expected = pipeline.predict(pd.DataFrame(features, columns=FEATURE_ORDER))
+assert np.array_equal(fast_predictor.predict(features), expected)
+print("✓ Fast path matches the pipeline on all rows")
+
+# The flat-array forest engine must reproduce model.predict exactly
+model = pipeline.named_steps['model']
+forest = FlatForest.from_sklearn(model)
+prepared = fast_predictor.transform(features)
+rng = np.random.default_rng(42)
+perturbed = prepared[rng.integers(0, len(prepared), 5000)] + rng.normal(0, 0.25, (5000, prepared.shape[1]))
+for X in (prepared, perturbed, prepared[:1]):
+    assert np.array_equal(forest.predict(X), model.predict(X))
+print(f"✓ FlatForest matches model.predict ({forest.n_trees} trees, {forest.n_nodes} nodes)")
+
+# Prediction intervals summarise the individual trees, gathered in one pass
+quantiles = (0.05, 0.5, 0.95)
+mean, std, quantile_values = fast_predictor.predict_distribution(features, quantiles)
+per_tree = np.stack([tree.predict(prepared.astype(np.float32)) for tree in model.estimators_])
+assert np.array_equal(mean, expected)
+assert np.allclose(std, per_tree.std(axis=0))
+assert np.allclose(quantile_values, np.quantile(per_tree, quantiles, axis=0))
+print("✓ Per-tree std and quantiles match the individual estimators")
+
+# Explanations add up to the prediction and follow each tree's decision path
+predictions, base_value, contributions = fast_predictor.explain(features)
+assert np.array_equal(predictions, expected)
+assert np.allclose(base_value + contributions.sum(axis=1), expected)
+reference = np.zeros((5, len(FEATURE_ORDER)))
+for estimator in model.estimators_:
+    tree = estimator.tree_
+    paths = estimator.decision_path(prepared[:5].astype(np.float32))
+    for i in range(5):
+        nodes = paths.indices[paths.indptr[i]:paths.indptr[i + 1]]
+        for parent, child in zip(nodes[:-1], nodes[1:]):
+            reference[i, tree.feature[parent]] += tree.value[child, 0, 0] - tree.value[parent, 0, 0]
+assert np.allclose(contributions[:5], reference / len(model.estimators_))
+print("✓ Feature contributions sum to the predictions and match the decision paths")
+
+# The prediction cache answers repeats from the local LRU or the shared tier,
+# expires entries after the TTL, keys them by model version and
+# leaves large batches alone
+calls = []
+
+
+def counting_predict(rows):
+    calls.append(len(rows))
+    return fast_predictor.predict(rows)
+
+
+shared = LocalCacheBackend()
+cache = PredictionCache(ttl_seconds=0.5, shared=shared, max_rows=100)
+rows = features[:50]
+for _ in range(2):
+    assert np.array_equal(cache.predict(counting_predict, rows, 'v1'), expected[:50])
+assert calls == [50] and cache.local_hits == 50
+other_worker = PredictionCache(ttl_seconds=0.5, shared=shared)
+assert np.array_equal(other_worker.predict(counting_predict, rows, 'v1'), expected[:50])
+assert calls == [50] and other_worker.shared_hits == 50 and other_worker.local_hits == 0
+assert shared.get_many(cache.keys(rows[:1], 'v2')) == [None]
+assert np.array_equal(cache.predict(counting_predict, rows, 'v2'), expected[:50])
+assert calls == [50, 50] and cache.stats()["entries"] == 100
+time.sleep(0.6)
+assert shared.get_many(cache.keys(rows[:1], 'v2')) == [None]
+cache.predict(counting_predict, rows, 'v2')
+assert calls == [50, 50, 50]
+assert np.array_equal(cache.predict(counting_predict, features, 'v2'), expected)
+assert calls[-1] == len(features) and cache.bypassed == len(features)
+
+
+class UnreachableBackend(LocalCacheBackend):
+    errors = (ConnectionError,)
+
+    def get_many(self, keys):
+        raise ConnectionError("connection refused")
+
+    def set_many(self, mapping, ttl):
+        raise ConnectionError("connection refused")
+
+
+offline = PredictionCache(shared=UnreachableBackend())
+assert np.array_equal(offline.predict(counting_predict, rows, 'v1'), expected[:50])
+assert np.array_equal(offline.predict(counting_predict, rows, 'v1'), expected[:50])
+assert offline.shared_errors == 2 and offline.local_hits == 50
+print("✓ Prediction cache: shared tier, TTL expiry, per-version keys, bypass and outages")
+
+# Callers of the micro-batcher never wait forever: a stuck batch times out
+# and rows queued when the worker dies are failed
+stuck = MicroBatcher(lambda rows: time.sleep(1) or [0.0] * len(rows), timeout=0.1)
+try:
+    stuck.predict(features[0])
+    raise AssertionError("stuck batch did not time out")
+except TimeoutError:
+    pass
+
+
+def exit_worker(rows):
+    raise SystemExit
+
+
+dying = MicroBatcher(exit_worker, max_wait_ms=50)
+futures = [dying.submit(row) for row in features[:3]]
+for future in futures:
+    assert isinstance(future.exception(timeout=1), RuntimeError)
+print("✓ Micro-batcher times out and fails queued rows when its worker exits")
+
+# Swap callbacks run only once the registry serves the new predictor, and a
+# failed reload leaves both the registry and the callbacks on the old one
+loads = [fast_predictor, pipeline]
+
+
+def next_model():
+    if not loads:
+        raise FileNotFoundError("no model published")
+    return loads.pop(0)
+
+
+swapped = []
+swap_registry = ModelRegistry(next_model)
+swap_registry.on_swap(lambda predictor: swapped.append(swap_registry.get() is predictor))
+swap_registry.load()
+with contextlib.redirect_stdout(io.StringIO()):
+    swap_registry.reload()
+    swap_registry.reload()
+assert swapped == [True] and swap_registry.get() is pipeline and swap_registry.error
+print("✓ Model registry runs swap callbacks after a successful swap only")
+
+# The memory-mapped artifact, when exported, must serve the same predictions
+ARTIFACT_PATH = os.path.join(MODEL_DIR, 'pipeline_combined.bin')
+if os.path.exists(ARTIFACT_PATH):
+    preprocessor, mapped_forest, header = load_artifact(ARTIFACT_PATH)
+    if header["metadata"].get("source_sha256") == file_sha256(PIPELINE_PATH):
+        mapped = FastPredictor(preprocessor, forest=mapped_forest)
+        assert np.array_equal(mapped.predict(features), expected)
+        # Batches above flat_max_rows load the source model and match too
+        mapped = FastPredictor(preprocessor, forest=mapped_forest, flat_max_rows=100,
+                               model_loader=source_model_loader(ARTIFACT_PATH, header))
+        assert np.array_equal(mapped.predict(features), expected) and mapped.model is not None
+        print("✓ Memory-mapped artifact matches the pipeline")
+    else:
+        print("! Model artifact is out of date, run export_model.py")
+
+# A process pool whose workers were killed is rebuilt, and one that keeps
+# failing falls back to in-process prediction. Run in a fresh interpreter:
+# the spawned workers would otherwise re-run this script
+POOL_RECOVERY_SCRIPT = """
+import os, signal, sys
+import numpy as np
+import pandas as pd
+from joblib import load
+from executor import ProcessPoolPredictor
+from inference import FEATURE_ORDER, FastPredictor
+
+X = pd.read_csv(sys.argv[2])[FEATURE_ORDER].to_numpy(dtype=np.float64)
+fast = FastPredictor.from_pipeline(load(sys.argv[1]))
+expected = fast.predict(X)
+pool = ProcessPoolPredictor('joblib', sys.argv[1], processes=2, min_rows=0)
+assert np.array_equal(pool.predict(X), expected)
+for pid in list(pool._pool._processes):
+    os.kill(pid, signal.SIGKILL)
+assert np.array_equal(pool.predict(X), expected)
+pool.shutdown()
+missing = ProcessPoolPredictor('joblib', sys.argv[1] + '.missing', processes=1, min_rows=0)
+assert np.array_equal(missing.predict(X, fallback=fast.predict), expected)
+"""
+subprocess.run([sys.executable, '-c', POOL_RECOVERY_SCRIPT, PIPELINE_PATH, os.path.join(MODEL_DIR, 'REdata.csv')],
+               cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, check=True)
+print("✓ Process pool recovers from killed workers")
+
+# Out-of-core training draws every tree's sample from all chunks, even with
+# many more chunks than trees
+sys.path.insert(0, MODEL_DIR)
+from stream_train import stream_train
+
+with tempfile.TemporaryDirectory() as output_dir, contextlib.redirect_stdout(io.StringIO()):
+    manifest = stream_train(os.path.join(MODEL_DIR, 'REdata.csv'), output_dir, chunksize=10, n_estimators=10,
+                            max_samples=50)
+assert manifest["data"]["chunks"] > manifest["model"]["params"]["n_estimators"]
+assert manifest["fit"]["chunks_sampled"] == manifest["data"]["chunks"]
+assert manifest["fit"]["min_rows_drawn_per_chunk"] > 0
+print(f"✓ Streaming training samples all {manifest['data']['chunks']} chunks")
+
+# Cached training data is served as views of the memory-mapped columns,
+# not copies of them
+from data_cache import frame_from_columns, load_columns
+
+with tempfile.TemporaryDirectory() as cache_dir:
+    mapped = load_columns(os.path.join(MODEL_DIR, 'REdata.csv'), cache_dir=cache_dir)
+    table = frame_from_columns(mapped)
+    assert all(np.shares_memory(table[name].to_numpy(), column) for name, column in mapped.items())
+    del table, mapped
+print("✓ Cached training columns are shared with their memory maps")
 print("\nBackend is ready for deployment!")
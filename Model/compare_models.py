@@ -0,0 +1,103 @@
+"""
+Speed / accuracy report for the model backends of train.py.
+
+Each backend is trained with train.train() on the same stratified split
+into its own temporary directory, then measured on:
+
+    train time      the "fit" stage of the training run
+    predict latency FastPredictor.predict (the backend's serving path) at
+                    1, 1k and 100k rows, median over repeats
+    artifact size   pipeline_combined.joblib and, for forests, the
+                    memory-mapped pipeline_combined.bin
+    test RMSE       on the stratified hold-out
+
+Usage:
+    python Model/compare_models.py
+    python Model/compare_models.py --backends forest hgb --output comparison.json
+"""
+import argparse
+import json
+import os
+import tempfile
+
+import numpy as np
+from joblib import load
+
+from train import DATA_PATH, MODEL_BACKENDS, build_model, train
+
+# train.py puts the Backend directory on sys.path
+from benchmark import sample_features, time_call  # noqa: E402
+from inference import FastPredictor  # noqa: E402
+
+LATENCY_ROWS = [1, 1000, 100000]
+
+# The deployed forest and a boosting setup of similar accuracy
+DEFAULT_PARAMS = {
+    "forest": {},
+    "hgb": {"max_iter": 300, "learning_rate": 0.05, "max_leaf_nodes": 31, "max_bins": 255},
+}
+
+
+def predict_latency(pipeline, rows=LATENCY_ROWS, seed=0):
+    """Median FastPredictor.predict latency in ms for each batch size."""
+    predictor = FastPredictor.from_pipeline(pipeline)
+    features = sample_features(max(rows), seed)
+    latency = {}
+    for n in rows:
+        batch = features[:n]
+        repeat = 200 if n <= 1000 else 5
+        latency[n] = float(np.median(time_call(lambda: predictor.predict(batch),
+                                               repeat=repeat, warmup=min(repeat, 10))))
+    return latency
+
+
+def compare(backends, data_path=DATA_PATH, seed=42):
+    """Train and measure every backend; return one result dict per backend."""
+    results = []
+    for backend in backends:
+        with tempfile.TemporaryDirectory() as output_dir:
+            print(f"\n=== {backend} ===")
+            model = build_model(backend, seed, **DEFAULT_PARAMS.get(backend, {}))
+            manifest = train(data_path, output_dir, model, seed)
+            pipeline = load(os.path.join(output_dir, 'pipeline_combined.joblib'))
+            sizes = {name: os.path.getsize(os.path.join(output_dir, entry["file"]))
+                     for name, entry in manifest["artifacts"].items()}
+            results.append({
+                "backend": backend,
+                "model_type": manifest["model"]["type"],
+                "train_seconds": manifest["timings_seconds"]["fit"],
+                "test_rmse": manifest["metrics"]["test_rmse"],
+                "pipeline_bytes": sizes["pipeline"],
+                "artifact_bytes": sizes.get("artifact"),
+                "predict_ms": predict_latency(pipeline),
+            })
+    return results
+
+
+def print_report(results):
+    header = f"{'backend':<8} {'train s':>8} {'RMSE':>7} {'joblib MB':>10} {'mmap MB':>8}"
+    header += ''.join(f" {f'{n} rows ms':>14}" for n in LATENCY_ROWS)
+    print("\n=== Model backend comparison ===")
+    print(header)
+    for r in results:
+        mmap_mb = f"{r['artifact_bytes'] / 1e6:8.2f}" if r["artifact_bytes"] else f"{'-':>8}"
+        line = (f"{r['backend']:<8} {r['train_seconds']:8.3f} {r['test_rmse']:7.3f} "
+                f"{r['pipeline_bytes'] / 1e6:10.2f} {mmap_mb}")
+        line += ''.join(f" {r['predict_ms'][n]:14.3f}" for n in LATENCY_ROWS)
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the model backends on speed and accuracy.")
+    parser.add_argument("--backends", nargs="+", choices=sorted(MODEL_BACKENDS), default=["forest", "hgb"])
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = compare(args.backends, args.data, args.seed)
+    print_report(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to: {args.output}")
@@ -0,0 +1,173 @@
+"""
+Columnar cache for the training data files.
+
+The first load of a source file (REdata.csv, data.csv or the
+whitespace-delimited housing.data.txt) parses it once and writes one typed
+.npy file per column plus a schema.json. Later loads skip parsing entirely:
+the columns are memory-mapped copy-on-write, so pandas and sklearn see
+ordinary writable arrays. The DataFrame from load_table holds one block per
+column that is a view of its map (test_pipeline.py checks this), so
+untouched pages stay shared with the page cache. Operations that return a
+new frame, such as drop, copy their columns as usual.
+
+The cache is invalidated when the source file's SHA-256 changes. The file
+size and mtime are checked first so an unchanged file is not re-hashed on
+every load.
+
+Usage:
+    from data_cache import load_table
+    housing = load_table("REdata.csv")
+
+    python Model/data_cache.py Model/REdata.csv Model/housing.data.txt
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(MODEL_DIR, '..', 'Backend')
+CACHE_DIR = os.environ.get('DATA_CACHE_DIR', os.path.join(MODEL_DIR, '.data_cache'))
+SCHEMA_VERSION = 1
+
+# housing.data.txt is the original UCI file: no header, whitespace separated
+COLUMNS = ["CRIM", "ZN", "INDUS", "CHAS", "NOX", "RM", "AGE",
+           "DIS", "RAD", "TAX", "PTRATIO", "B", "LSTAT", "MEDV"]
+WHITESPACE_SUFFIXES = ('.txt', '.data')
+
+sys.path.insert(0, BACKEND_DIR)
+from artifact import file_sha256  # noqa: E402
+
+
+def read_source(path):
+    """Parse a source file with pandas, picking the format from its suffix."""
+    if path.endswith(WHITESPACE_SUFFIXES):
+        return pd.read_csv(path, sep=r'\s+', header=None, names=COLUMNS)
+    return pd.read_csv(path)
+
+
+def cache_path(path, cache_dir=None):
+    source = os.path.abspath(path)
+    # Same-named files in different directories get separate caches
+    tag = hashlib.sha256(source.encode()).hexdigest()[:8]
+    return os.path.join(cache_dir or CACHE_DIR, f"{os.path.basename(source)}-{tag}")
+
+
+def _stat(path):
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _read_schema(directory):
+    try:
+        with open(os.path.join(directory, 'schema.json')) as f:
+            schema = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return schema if schema.get("schema_version") == SCHEMA_VERSION else None
+
+
+def _write_schema(directory, schema):
+    tmp_path = os.path.join(directory, f'schema.json.tmp-{os.getpid()}')
+    with open(tmp_path, 'w') as f:
+        json.dump(schema, f, indent=2)
+    os.replace(tmp_path, os.path.join(directory, 'schema.json'))
+
+
+def build_cache(path, cache_dir=None):
+    """Parse the source file and (re)write its columnar cache."""
+    directory = cache_path(path, cache_dir)
+    tmp_dir = f"{directory}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    try:
+        stat = _stat(path)
+        sha256 = file_sha256(path)
+        frame = read_source(path)
+        columns = []
+        for i, name in enumerate(frame.columns):
+            values = np.ascontiguousarray(frame[name].to_numpy())
+            filename = f'{i:03d}.npy'
+            np.save(os.path.join(tmp_dir, filename), values, allow_pickle=False)
+            columns.append({"name": str(name), "dtype": values.dtype.str, "file": filename})
+        _write_schema(tmp_dir, {
+            "schema_version": SCHEMA_VERSION,
+            "source": os.path.abspath(path),
+            "source_sha256": sha256,
+            "source_stat": stat,
+            "rows": len(frame),
+            "columns": columns,
+        })
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(tmp_dir, directory)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return _read_schema(directory)
+
+
+def ensure_cache(path, cache_dir=None):
+    """Return the schema of an up-to-date cache for path, building it if needed."""
+    directory = cache_path(path, cache_dir)
+    schema = _read_schema(directory)
+    if schema is not None and schema["source"] == os.path.abspath(path):
+        stat = _stat(path)
+        if schema["source_stat"] == stat:
+            return schema
+        # Touched but possibly unchanged: only a content change invalidates
+        if schema["source_sha256"] == file_sha256(path):
+            schema["source_stat"] = stat
+            _write_schema(directory, schema)
+            return schema
+    return build_cache(path, cache_dir)
+
+
+def load_columns(path, columns=None, cache_dir=None):
+    """Memory-map cached columns of path.
+
+    Args:
+        path: Source CSV / whitespace text file.
+        columns: Optional list of column names to load (default: all).
+        cache_dir: Override for the cache root directory.
+
+    Returns:
+        dict mapping column name -> ndarray view of a copy-on-write memory
+        map, in file order.
+    """
+    schema = ensure_cache(path, cache_dir)
+    directory = cache_path(path, cache_dir)
+    wanted = schema["columns"] if columns is None else [
+        c for c in schema["columns"] if c["name"] in set(columns)]
+    missing = set(columns or ()) - {c["name"] for c in wanted}
+    if missing:
+        raise KeyError(f"columns not in {os.path.basename(path)}: {sorted(missing)}")
+    # Plain ndarray views so the memmap subclass does not leak into pandas
+    return {c["name"]: np.load(os.path.join(directory, c["file"]), mmap_mode='c').view(np.ndarray)
+            for c in wanted}
+
+
+def frame_from_columns(columns):
+    """Wrap a dict of column arrays in a DataFrame without copying them."""
+    # Unconsolidated blocks: each column stays a view of its own array
+    return pd.DataFrame(columns, copy=False)
+
+
+def load_table(path, columns=None, cache_dir=None):
+    """Drop-in replacement for pd.read_csv(path) backed by the columnar cache."""
+    return frame_from_columns(load_columns(path, columns, cache_dir))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or refresh the columnar data cache.")
+    parser.add_argument("sources", nargs="+", help="CSV or whitespace-delimited data files")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild even if the cache is current")
+    args = parser.parse_args()
+
+    for source in args.sources:
+        schema = build_cache(source) if args.rebuild else ensure_cache(source)
+        print(f"{source}: {schema['rows']} rows, {len(schema['columns'])} columns "
+              f"-> {cache_path(source)}")
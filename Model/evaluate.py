@@ -0,0 +1,324 @@
+"""
+Cross-validated accuracy and speed report for the model backends of train.py.
+
+Every (seed, fold) pair fits the whole pipeline (imputer + scaler + model,
+so preprocessing never sees the held-out rows) in its own worker process,
+one per core, and records its metrics, fit time and predict time. Folds are
+stratified on CHAS like the train/test split and shuffled with each seed,
+so a rerun on the same data gives the same folds and, for a given model
+configuration, the same numbers.
+
+The report pools the out-of-fold predictions of each seed and breaks the
+errors down by:
+
+    overall          RMSE, MAE and R^2 (pooled, and mean/std over folds)
+    CHAS             per stratum (tract on / off the Charles river)
+    target decile    per decile of the true MEDV, showing where the model
+                     over- or under-predicts
+
+It is written as JSON (and, with matplotlib installed, a PNG of plots) so
+that successive retrains can be compared with --baseline.
+
+Usage:
+    python Model/evaluate.py
+    python Model/evaluate.py --backend hgb --folds 10 --seeds 0 1 2
+    python Model/evaluate.py --output-dir /tmp/eval --baseline Model/evaluation_report.json
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import sklearn
+from joblib import Parallel, delayed
+from sklearn.metrics import mean_absolute_error, r2_score
+from sklearn.model_selection import StratifiedKFold
+
+from train import (DATA_PATH, MODEL_BACKENDS, MODEL_DIR, build_model, build_pipeline, file_sha256, load_table,
+                   rmse)
+
+TARGET = 'MEDV'
+
+# Metrics where a larger value is better, for the baseline comparison
+HIGHER_IS_BETTER = ('r2',)
+
+
+def regression_metrics(y_true, y_pred):
+    residuals = y_pred - y_true
+    return {
+        "rows": int(len(y_true)),
+        "rmse": rmse(y_true, y_pred),
+        "mae": float(mean_absolute_error(y_true, y_pred)),
+        "r2": float(r2_score(y_true, y_pred)) if len(y_true) > 1 else None,
+        "mean_residual": float(np.mean(residuals)),
+    }
+
+
+def evaluate_fold(backend, params, X, y, train_index, test_index, seed, fold):
+    """Fit the pipeline on one fold and score its held-out rows.
+
+    Returns:
+        Dictionary with the fold's metrics, timings and out-of-fold
+        predictions (aligned with test_index).
+    """
+    pipeline = build_pipeline(build_model(backend, seed, **params))
+    start = time.perf_counter()
+    pipeline.fit(X.iloc[train_index], y[train_index])
+    fit_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    predictions = pipeline.predict(X.iloc[test_index])
+    predict_seconds = time.perf_counter() - start
+    return {
+        "seed": seed,
+        "fold": fold,
+        "train_rows": len(train_index),
+        "metrics": regression_metrics(y[test_index], predictions),
+        "fit_seconds": fit_seconds,
+        "predict_seconds": predict_seconds,
+        "predict_us_per_row": predict_seconds / len(test_index) * 1e6,
+        "test_index": test_index,
+        "predictions": predictions,
+    }
+
+
+def grouped_metrics(y_true, y_pred, groups):
+    """regression_metrics for every value of groups, in sorted order."""
+    return {str(value): regression_metrics(y_true[groups == value], y_pred[groups == value])
+            for value in np.unique(groups)}
+
+
+def decile_metrics(y_true, y_pred, n_bins=10):
+    """regression_metrics per quantile bin of the true target."""
+    edges = np.unique(np.quantile(y_true, np.linspace(0, 1, n_bins + 1)))
+    bins = np.clip(np.searchsorted(edges, y_true, side='right') - 1, 0, len(edges) - 2)
+    return [{"low": float(edges[b]), "high": float(edges[b + 1]),
+             **regression_metrics(y_true[bins == b], y_pred[bins == b])}
+            for b in range(len(edges) - 1) if np.any(bins == b)]
+
+
+def summarize(values):
+    values = [v for v in values if v is not None]
+    return {"mean": float(np.mean(values)), "std": float(np.std(values))} if values else None
+
+
+def evaluate(data_path=DATA_PATH, backend="forest", params=None, folds=5, seeds=(42,), n_jobs=-1):
+    """Cross-validate one model configuration and build the report.
+
+    Returns:
+        (report, out_of_fold) where report is the JSON-serialisable
+        dictionary and out_of_fold maps each seed to its (n,) array of
+        out-of-fold predictions, for plotting.
+    """
+    params = dict(params or {})
+    housing = load_table(data_path)
+    X = housing.drop(TARGET, axis=1)
+    y = housing[TARGET].to_numpy(dtype=np.float64)
+    chas = housing['CHAS'].to_numpy()
+
+    tasks = []
+    for seed in seeds:
+        splitter = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed)
+        for fold, (train_index, test_index) in enumerate(splitter.split(X, chas)):
+            tasks.append((seed, fold, train_index, test_index))
+
+    # Each fold fits single-threaded; the folds themselves run in parallel
+    if backend == "forest":
+        params.setdefault("n_jobs", 1)
+    start = time.perf_counter()
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(evaluate_fold)(backend, params, X, y, train_index, test_index, seed, fold)
+        for seed, fold, train_index, test_index in tasks
+    )
+    wall_seconds = time.perf_counter() - start
+
+    out_of_fold = {seed: np.empty(len(y)) for seed in seeds}
+    for result in results:
+        out_of_fold[result["seed"]][result.pop("test_index")] = result.pop("predictions")
+
+    # Pool the seeds: every row appears once per seed
+    y_all = np.tile(y, len(seeds))
+    predictions_all = np.concatenate([out_of_fold[seed] for seed in seeds])
+    fold_metrics = [result["metrics"] for result in results]
+    fit_seconds = [result["fit_seconds"] for result in results]
+    model = build_model(backend, seeds[0], **params)
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "data": {
+            "path": os.path.relpath(data_path, MODEL_DIR),
+            "sha256": file_sha256(data_path),
+            "rows": len(housing),
+        },
+        "model": {
+            "backend": backend,
+            "type": type(model).__name__,
+            "params": {name: value for name, value in model.get_params().items() if name != "random_state"},
+        },
+        "cv": {
+            "strategy": "StratifiedKFold on CHAS, shuffled per seed",
+            "folds": folds,
+            "seeds": list(seeds),
+            "n_jobs": n_jobs,
+            "cpu_count": os.cpu_count(),
+        },
+        "metrics": {
+            "pooled": regression_metrics(y_all, predictions_all),
+            "per_seed": {str(seed): regression_metrics(y, out_of_fold[seed]) for seed in seeds},
+            "fold_mean_std": {name: summarize([m[name] for m in fold_metrics])
+                              for name in ("rmse", "mae", "r2")},
+        },
+        "residuals": {
+            "by_chas": grouped_metrics(y_all, predictions_all, np.tile(chas, len(seeds))),
+            "by_target_decile": decile_metrics(y_all, predictions_all),
+        },
+        "timings": {
+            "wall_seconds": wall_seconds,
+            "fit_seconds_total": float(np.sum(fit_seconds)),
+            "fit_seconds": summarize(fit_seconds),
+            "predict_us_per_row": summarize([result["predict_us_per_row"] for result in results]),
+            # How much the parallel folds saved over running them one by one
+            "parallel_speedup": float(np.sum(fit_seconds) + sum(r["predict_seconds"] for r in results))
+            / wall_seconds,
+        },
+        "folds": results,
+        "sklearn_version": sklearn.__version__,
+    }
+    return report, out_of_fold
+
+
+def write_plots(report, out_of_fold, data_path, path):
+    """Save predicted-vs-actual, residual breakdown and per-fold timing plots to path.
+
+    Returns:
+        path, or None when matplotlib is not installed.
+    """
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("matplotlib is not installed; skipping the plots")
+        return None
+
+    y = load_table(data_path)[TARGET].to_numpy(dtype=np.float64)
+    fig, axes = plt.subplots(2, 2, figsize=(12, 9))
+
+    ax = axes[0, 0]
+    for seed, predictions in out_of_fold.items():
+        ax.scatter(y, predictions, s=8, alpha=0.5, label=f"seed {seed}")
+    limits = [min(y.min(), 0), y.max()]
+    ax.plot(limits, limits, color='gray', linewidth=1)
+    ax.set(title="Out-of-fold predictions", xlabel="Actual MEDV ($1000s)", ylabel="Predicted MEDV ($1000s)")
+    ax.legend(fontsize='small')
+
+    ax = axes[0, 1]
+    deciles = report["residuals"]["by_target_decile"]
+    labels = [f"{d['low']:.0f}-{d['high']:.0f}" for d in deciles]
+    positions = np.arange(len(deciles))
+    ax.bar(positions - 0.2, [d["rmse"] for d in deciles], width=0.4, label="RMSE")
+    ax.bar(positions + 0.2, [d["mean_residual"] for d in deciles], width=0.4, label="mean residual")
+    ax.axhline(0, color='gray', linewidth=1)
+    ax.set_xticks(positions, labels, rotation=45, fontsize='small')
+    ax.set(title="Error by target decile", xlabel="Actual MEDV range ($1000s)")
+    ax.legend(fontsize='small')
+
+    ax = axes[1, 0]
+    chas = np.tile(load_table(data_path)['CHAS'].to_numpy(), len(out_of_fold))
+    residuals = np.concatenate(list(out_of_fold.values())) - np.tile(y, len(out_of_fold))
+    for value in np.unique(chas):
+        ax.hist(residuals[chas == value], bins=40, alpha=0.6, density=True, label=f"CHAS = {value:g}")
+    ax.set(title="Residuals by CHAS", xlabel="Predicted - actual ($1000s)")
+    ax.legend(fontsize='small')
+
+    ax = axes[1, 1]
+    folds = report["folds"]
+    names = [f"{f['seed']}/{f['fold']}" for f in folds]
+    ax.bar(names, [f["fit_seconds"] for f in folds], label="fit")
+    ax.bar(names, [f["predict_seconds"] for f in folds], bottom=[f["fit_seconds"] for f in folds], label="predict")
+    ax.set(title="Time per fold (seed/fold)", ylabel="seconds")
+    ax.tick_params(axis='x', labelrotation=90, labelsize='small')
+    ax.legend(fontsize='small')
+
+    pooled = report["metrics"]["pooled"]
+    fig.suptitle(f"{report['model']['type']}: RMSE {pooled['rmse']:.3f}, MAE {pooled['mae']:.3f}, "
+                 f"R² {pooled['r2']:.3f} ({report['cv']['folds']}-fold x {len(report['cv']['seeds'])} seeds)")
+    fig.tight_layout()
+    fig.savefig(path, dpi=120)
+    plt.close(fig)
+    return path
+
+
+def compare_reports(report, baseline):
+    """Return (name, baseline value, current value, got worse) rows for the headline numbers."""
+    rows = []
+    for name in ("rmse", "mae", "r2"):
+        before = baseline["metrics"]["pooled"][name]
+        value = report["metrics"]["pooled"][name]
+        worse = value < before if name in HIGHER_IS_BETTER else value > before
+        rows.append((name, before, value, worse))
+    for name in ("fit_seconds", "predict_us_per_row"):
+        before = baseline["timings"][name]["mean"]
+        value = report["timings"][name]["mean"]
+        rows.append((name, before, value, value > before))
+    return rows
+
+
+def write_report(report, out_of_fold, data_path, output_dir, plots=True):
+    """Write evaluation_report.json (and evaluation_report.png) to output_dir."""
+    report_path = os.path.join(output_dir, 'evaluation_report.json')
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"\nReport saved to: {report_path}")
+    if plots:
+        plot_path = write_plots(report, out_of_fold, data_path, os.path.join(output_dir, 'evaluation_report.png'))
+        if plot_path:
+            print(f"Plots saved to: {plot_path}")
+
+
+def print_report(report):
+    pooled = report["metrics"]["pooled"]
+    spread = report["metrics"]["fold_mean_std"]
+    timings = report["timings"]
+    print(f"\n=== {report['model']['type']}: {report['cv']['folds']}-fold CV, seeds {report['cv']['seeds']} ===")
+    print(f"RMSE {pooled['rmse']:.3f}  MAE {pooled['mae']:.3f}  R² {pooled['r2']:.3f}  "
+          f"(per fold RMSE {spread['rmse']['mean']:.3f} ± {spread['rmse']['std']:.3f})")
+    print("\nBy CHAS:")
+    for value, m in report["residuals"]["by_chas"].items():
+        print(f"  CHAS={value}: {m['rows']:>5} rows  RMSE {m['rmse']:.3f}  MAE {m['mae']:.3f}  "
+              f"mean residual {m['mean_residual']:+.3f}")
+    print("\nBy target decile:")
+    for d in report["residuals"]["by_target_decile"]:
+        print(f"  {d['low']:5.1f}-{d['high']:5.1f}: {d['rows']:>5} rows  RMSE {d['rmse']:.3f}  "
+              f"mean residual {d['mean_residual']:+.3f}")
+    print(f"\nFit {timings['fit_seconds']['mean']:.3f}s ± {timings['fit_seconds']['std']:.3f}s per fold, "
+          f"predict {timings['predict_us_per_row']['mean']:.1f} µs/row")
+    print(f"Wall time {timings['wall_seconds']:.2f}s for {len(report['folds'])} folds "
+          f"({timings['parallel_speedup']:.1f}x over serial)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cross-validate a model and write an evaluation report.")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--output-dir", default=MODEL_DIR)
+    parser.add_argument("--backend", choices=sorted(MODEL_BACKENDS), default="forest")
+    parser.add_argument("--folds", type=int, default=10)
+    parser.add_argument("--seeds", type=int, nargs='+', default=[42], help="fold shuffling and model seeds")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="parallel folds (-1: one per core)")
+    parser.add_argument("--baseline", help="earlier evaluation_report.json to compare against")
+    parser.add_argument("--no-plots", action="store_true")
+    args = parser.parse_args()
+
+    report, out_of_fold = evaluate(args.data, args.backend, folds=args.folds, seeds=args.seeds,
+                                   n_jobs=args.n_jobs)
+    print_report(report)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"\n=== Compared with {args.baseline} ({baseline['created_at']}) ===")
+        for name, before, value, worse in compare_reports(report, baseline):
+            print(f"{name:<20} {before:10.4f} -> {value:10.4f} {'(worse)' if worse else ''}")
+
+    write_report(report, out_of_fold, args.data, args.output_dir, plots=not args.no_plots)
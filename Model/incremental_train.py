@@ -0,0 +1,129 @@
+"""
+Incremental refresh of the deployed forest.
+
+Instead of retraining from scratch, the existing model is warm-started:
+new trees are fitted on the new (or most recent) sales only and appended to
+the ensemble, optionally retiring the oldest trees so the ensemble size
+stays fixed. The fitted preprocessing is reused unchanged, since the
+existing trees depend on its scaling. The refresh cost therefore scales
+with the data delta, not the full history.
+
+The model, the combined pipeline and the backend's memory-mapped artifact
+are all replaced atomically.
+
+Usage:
+    python Model/incremental_train.py --new-data new_sales.csv --add-trees 20
+    python Model/incremental_train.py --since-row 480 --add-trees 20 --retire-oldest
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from joblib import load
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_squared_error
+from sklearn.pipeline import Pipeline
+from sklearn.utils import check_random_state
+
+from data_cache import load_table
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(MODEL_DIR, '..', 'Backend')
+DATA_PATH = os.path.join(MODEL_DIR, 'REdata.csv')
+MODEL_PATH = os.path.join(MODEL_DIR, 'ESTATE_PRICE_CALCULATOR.joblib')
+PIPELINE_PATH = os.path.join(MODEL_DIR, 'pipeline_combined.joblib')
+
+sys.path.insert(0, BACKEND_DIR)
+from artifact import atomic_dump  # noqa: E402
+
+
+def rmse(model, X, y):
+    return float(np.sqrt(mean_squared_error(y, model.predict(X))))
+
+
+def grow_forest(model, X, y, add_trees, retire_oldest=False):
+    """Fit add_trees new trees on (X, y) and append them to a fitted forest.
+
+    Args:
+        model: Fitted RandomForestRegressor; modified in place.
+        X: Preprocessed features of the new data.
+        y: Targets of the new data.
+        add_trees: Number of trees to add.
+        retire_oldest: Drop the same number of the oldest trees afterwards
+            so the ensemble size is unchanged. The forest then moves to a
+            new random_state, because warm start skips one seed per
+            existing tree and the next run would otherwise redraw the
+            seeds of the trees added here.
+    """
+    n_before = len(model.estimators_)
+    model.set_params(warm_start=True, n_estimators=n_before + add_trees)
+    model.fit(X, y)
+    model.set_params(warm_start=False)
+
+    if retire_oldest:
+        model.estimators_ = model.estimators_[add_trees:]
+        model.set_params(n_estimators=len(model.estimators_))
+        if model.random_state is not None:
+            next_seed = check_random_state(model.random_state).randint(np.iinfo(np.int32).max)
+            model.set_params(random_state=int(next_seed))
+    return model
+
+
+def load_new_data(new_data=None, since_row=None):
+    if new_data is not None:
+        return load_table(new_data)
+    housing = load_table(DATA_PATH)
+    return housing.iloc[since_row:]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add trees fitted on new data to the deployed forest.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--new-data", help="CSV of new sales, shaped like REdata.csv (with MEDV)")
+    source.add_argument("--since-row", type=int, help="use REdata.csv rows from this index on")
+    parser.add_argument("--add-trees", type=int, default=20)
+    parser.add_argument("--retire-oldest", action="store_true",
+                        help="drop as many of the oldest trees as were added")
+    parser.add_argument("--no-artifact", action="store_true",
+                        help="do not re-export the backend's memory-mapped artifact")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    # The forest comes from the combined pipeline, so the new trees are always
+    # fitted against the preprocessing the existing ones were trained with
+    pipeline = load(PIPELINE_PATH)
+    preprocessing = pipeline.named_steps["preprocessing"]
+    model = pipeline.named_steps["model"]
+    if not isinstance(model, RandomForestRegressor):
+        raise SystemExit(f"{PIPELINE_PATH} holds a {type(model).__name__}; incremental training needs a "
+                         "random forest (retrain with train.py --backend forest)")
+    print(f"Loaded model with {len(model.estimators_)} trees")
+
+    new_data = load_new_data(args.new_data, args.since_row)
+    if new_data.empty:
+        raise SystemExit("No new rows to train on")
+    X_new = preprocessing.transform(new_data.drop("MEDV", axis=1))
+    y_new = new_data["MEDV"].to_numpy(dtype=np.float64)
+    print(f"New data: {len(y_new)} rows")
+
+    before = rmse(model, X_new, y_new)
+    fit_start = time.perf_counter()
+    grow_forest(model, X_new, y_new, args.add_trees, args.retire_oldest)
+    fit_seconds = time.perf_counter() - fit_start
+    after = rmse(model, X_new, y_new)
+    print(f"Model now has {len(model.estimators_)} trees (fit took {fit_seconds:.2f}s)")
+    print(f"RMSE on the new data: {before:.3f} -> {after:.3f}")
+
+    atomic_dump(model, MODEL_PATH)
+    print(f"Model saved to: {MODEL_PATH}")
+    atomic_dump(Pipeline([("preprocessing", preprocessing), ("model", model)]), PIPELINE_PATH)
+    print(f"Combined pipeline saved to: {PIPELINE_PATH}")
+
+    if not args.no_artifact:
+        from export_model import ARTIFACT_PATH, export_pipeline
+        export_pipeline(PIPELINE_PATH, ARTIFACT_PATH)
+        print(f"Model artifact saved to: {os.path.normpath(ARTIFACT_PATH)}")
+
+    print(f"Refresh completed in {time.perf_counter() - start:.2f}s")
@@ -1,17 +1,19 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, StratifiedShuffleSplit, cross_val_score
+from sklearn.model_selection import train_test_split, StratifiedShuffleSplit
 from sklearn.impute import SimpleImputer
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler
 from sklearn.ensemble import RandomForestRegressor
-from sklearn.model_selection import GridSearchCV
 from sklearn.metrics import mean_squared_error
 from joblib import dump, load
 import matplotlib.pyplot as plt
 
+from data_cache import load_table
+from tune import FoldCache, cached_cross_val_rmse, grid_search
 
-housing = pd.read_csv("REdata.csv")
+
+housing = load_table("REdata.csv")
 print("Data loaded successfully.")
 print(f"Dataset shape: {housing.shape}")
 
@@ -25,6 +27,8 @@ print(f"Training set size: {len(strat_train_set)}, Test set size: {len(strat_tes
 
 housing = strat_train_set.drop("MEDV", axis=1)
 housing_labels = strat_train_set["MEDV"].copy()
+# Positional labels for the fold indices used by tune.py
+housing_labels_array = housing_labels.to_numpy(dtype=np.float64)
 
 
 my_pipeline = Pipeline([
@@ -43,32 +47,20 @@ print("Data preprocessing completed.")
 
 # --- After fine tuning ---
 print("Model training completed.")
-param_grid = {
-    'n_estimators': [50, 100, 300],  
-    'max_depth': [None, 10, 20],  # Maximum depth of the trees
-    'min_samples_split': [2, 5]   # Minimum samples required to split a node
-}
-
-rf = RandomForestRegressor(random_state=42)
-
-# Creating the grid search with cross-validation
-print("Starting hyperparameter tuning with GridSearchCV...")
-grid_search = GridSearchCV(
-    estimator=rf,
-    param_grid=param_grid,
-    cv=5,                      # 5-fold cross-validation
-    scoring='neg_mean_squared_error',
-    verbose=1,                 
-    n_jobs=-1                  
-)
-
-grid_search.fit(housing_num_tr, housing_labels)
-
-best_params = grid_search.best_params_
+
+# 5-fold grid search over tune.PARAM_GRID (n_estimators, max_depth,
+# min_samples_split). Fold results are cached on disk, so re-runs only fit
+# grid points that have not been seen before
+print("Starting hyperparameter tuning with the cached grid search...")
+results, stats = grid_search(housing_num_tr, housing_labels_array, FoldCache(), cv=5, seed=42)
+print(f"Folds computed: {stats['computed_folds']}, reused from cache: {stats['cached_folds']}")
+
+best_params = results[0]["params"]
 print(f"Best parameters found: {best_params}")
 
-# Using the best model found
-model = grid_search.best_estimator_
+# Refit the best configuration on the whole training set
+model = RandomForestRegressor(random_state=42, **best_params)
+model.fit(housing_num_tr, housing_labels)
 print("Model training completed with hyperparameter tuning.")
 
 #--- this was before tuning it to finest ---
@@ -108,11 +100,8 @@ tuned_mse = mean_squared_error(housing_labels, tuned_housing_prediction)
 tuned_rmse = np.sqrt(tuned_mse)
 print(f"Tuned model training RMSE: {tuned_rmse}")
 
-tuned_scores = cross_val_score(model, housing_num_tr, housing_labels, 
-                        scoring="neg_mean_squared_error", cv=10)
-tuned_rmse_scores = np.sqrt(-tuned_scores)
-tuned_mean_rmse = tuned_rmse_scores.mean()
-tuned_std_rmse = tuned_rmse_scores.std()
+# Fold results are cached on disk (see tune.py), so re-runs skip the refits
+tuned_mean_rmse, tuned_std_rmse = cached_cross_val_rmse(model, housing_num_tr, housing_labels_array, cv=10)
 print(f"Tuned model cross-validation RMSE: {tuned_mean_rmse:.2f} (±{tuned_std_rmse:.2f})")
 
 
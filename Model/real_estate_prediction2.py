@@ -9,8 +9,10 @@ from sklearn.metrics import mean_squared_error
 from joblib import dump, load
 import matplotlib.pyplot as plt
 
+from data_cache import load_table
 
-housing = pd.read_csv("REdata.csv")
+
+housing = load_table("REdata.csv")
 print("Data loaded successfully.")
 print(f"Dataset shape: {housing.shape}")
 
@@ -3,12 +3,21 @@ Script to create and save a combined pipeline (preprocessing + model)
 for deployment. This ensures the backend can load a single artifact
 that handles both preprocessing and prediction.
 """
+import os
+import sys
+
 import pandas as pd
-import numpy as np
 from sklearn.pipeline import Pipeline
 from sklearn.impute import SimpleImputer
 from sklearn.preprocessing import StandardScaler
-from joblib import load, dump
+from joblib import load
+
+from data_cache import load_table
+
+# The backend owns the fused preprocessing format and the atomic writers
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Backend'))
+from artifact import atomic_dump  # noqa: E402
+from inference import FusedPreprocessor  # noqa: E402
 
 # Load the trained model
 model = load("Model/ESTATE_PRICE_CALCULATOR.joblib")
@@ -22,7 +31,7 @@ preprocessing_pipeline = Pipeline([
 
 # Load training data to fit the preprocessing pipeline
 # (must match the exact data used during model training)
-housing = pd.read_csv("Model/REdata.csv")
+housing = load_table("Model/REdata.csv")
 
 # Split data the same way as in training
 from sklearn.model_selection import StratifiedShuffleSplit
@@ -45,9 +54,15 @@ combined_pipeline = Pipeline([
 
 # Save the combined pipeline
 output_path = "Model/pipeline_combined.joblib"
-dump(combined_pipeline, output_path)
+atomic_dump(combined_pipeline, output_path)
 print(f"Combined pipeline saved to: {output_path}")
 
+# Save the preprocessing compiled into a single fused affine step
+# (median fill + (x - mean) / scale), used by the backend's fast path
+fused_path = "Model/preprocessing_fused.npz"
+FusedPreprocessor.from_pipeline(preprocessing_pipeline).save(fused_path)
+print(f"Fused preprocessing saved to: {fused_path}")
+
 # Test the combined pipeline
 test_input = {
     'CRIM': 0.00632,
@@ -0,0 +1,187 @@
+"""
+Batch scorer for listing files shaped like REdata.csv.
+
+The input is read in fixed-size chunks, each chunk is scored with one
+vectorized call of the combined pipeline, and predictions are streamed to a
+CSV or Parquet file. Memory use is bounded by the chunk size, not by the
+size of the input file. The MEDV column is optional; when present it is
+kept and the RMSE of the predictions is reported.
+
+With --quantiles the forest's trees are evaluated in one pass per chunk and
+the standard deviation and the requested quantiles of their predictions are
+written next to each prediction (PREDICTION_STD, PREDICTION_Q0.05, ...).
+With --explain each prediction is split into BASE_VALUE plus one
+CONTRIBUTION_<feature> column per feature (path attribution over the
+trees; the columns sum to PREDICTION).
+
+Usage:
+    python Model/score_csv.py listings.csv predictions.csv --chunksize 100000
+    python Model/score_csv.py listings.csv predictions.parquet
+    python Model/score_csv.py listings.csv ranges.csv --quantiles 0.05 0.5 0.95
+    python Model/score_csv.py listings.csv explained.csv --explain
+"""
+import argparse
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import load
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(MODEL_DIR, '..', 'Backend')
+PIPELINE_PATH = os.path.join(MODEL_DIR, 'pipeline_combined.joblib')
+
+# The serving engine evaluates every tree of the forest in one pass, and
+# owns the feature order used during training
+sys.path.insert(0, BACKEND_DIR)
+from inference import FEATURE_ORDER, FastPredictor  # noqa: E402
+
+
+class CsvSink:
+    """Append DataFrame chunks to a CSV file, writing the header once."""
+
+    def __init__(self, path):
+        self.path = path
+        self.header = True
+
+    def write(self, frame):
+        frame.to_csv(self.path, mode='w' if self.header else 'a', header=self.header, index=False)
+        self.header = False
+
+    def close(self):
+        pass
+
+
+class ParquetSink:
+    """Write DataFrame chunks as row groups of one Parquet file (needs pyarrow)."""
+
+    def __init__(self, path):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise SystemExit("Parquet output requires pyarrow: pip install pyarrow")
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.path = path
+        self.writer = None
+
+    def write(self, frame):
+        table = self._pa.Table.from_pandas(frame, preserve_index=False)
+        if self.writer is None:
+            self.writer = self._pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def open_sink(path):
+    if path.endswith('.parquet'):
+        return ParquetSink(path)
+    return CsvSink(path)
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def score_file(input_path, output_path, pipeline, chunksize=100000, predictions_only=False, quantiles=None,
+               explain=False):
+    """Score input_path chunk by chunk and stream the results to output_path.
+
+    quantiles, if given, adds the standard deviation and these quantiles of
+    the per-tree predictions as extra columns, and explain adds the base
+    value and per-feature contributions (both need a random forest model).
+
+    Returns:
+        Dictionary with the number of rows, elapsed seconds, rows per second,
+        peak RSS in MB and, if the input has MEDV, the RMSE.
+    """
+    sink = open_sink(output_path)
+    predictor = FastPredictor.from_pipeline(pipeline) if quantiles or explain else None
+    n_rows = 0
+    squared_error = 0.0
+    labelled_rows = 0
+    start = time.perf_counter()
+
+    try:
+        for chunk in pd.read_csv(input_path, chunksize=chunksize):
+            missing = [name for name in FEATURE_ORDER if name not in chunk.columns]
+            if missing:
+                raise ValueError(f"input is missing columns: {missing}")
+
+            extra = {}
+            if predictor is None:
+                predictions = pipeline.predict(chunk[FEATURE_ORDER])
+            else:
+                X = chunk[FEATURE_ORDER].to_numpy(dtype=np.float64)
+                if quantiles:
+                    predictions, std, quantile_values = predictor.predict_distribution(X, quantiles)
+                    extra['PREDICTION_STD'] = std
+                    for q, values in zip(quantiles, quantile_values):
+                        extra[f'PREDICTION_Q{q:g}'] = values
+                if explain:
+                    predictions, base_value, contributions = predictor.explain(X)
+                    extra['BASE_VALUE'] = base_value
+                    for name, values in zip(FEATURE_ORDER, contributions.T):
+                        extra[f'CONTRIBUTION_{name}'] = values
+
+            if 'MEDV' in chunk.columns:
+                labels = chunk['MEDV'].to_numpy(dtype=np.float64)
+                known = ~np.isnan(labels)
+                squared_error += float(np.sum((predictions[known] - labels[known]) ** 2))
+                labelled_rows += int(known.sum())
+
+            if predictions_only:
+                output = pd.DataFrame({'PREDICTION': predictions, **extra})
+            else:
+                output = chunk.assign(PREDICTION=predictions, **extra)
+            sink.write(output)
+            n_rows += len(chunk)
+    finally:
+        sink.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        "rows": n_rows,
+        "seconds": elapsed,
+        "rows_per_second": n_rows / elapsed if elapsed > 0 else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "rmse": float(np.sqrt(squared_error / labelled_rows)) if labelled_rows else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a listings CSV with the combined pipeline.")
+    parser.add_argument("input", help="CSV with the 13 feature columns (MEDV optional)")
+    parser.add_argument("output", help="output .csv or .parquet file")
+    parser.add_argument("--pipeline", default=PIPELINE_PATH, help="combined pipeline (.joblib)")
+    parser.add_argument("--chunksize", type=int, default=100000, help="rows per chunk")
+    parser.add_argument("--predictions-only", action="store_true",
+                        help="write only the PREDICTION column instead of the input plus predictions")
+    parser.add_argument("--quantiles", type=float, nargs='+', metavar='Q',
+                        help="also write the std and these quantiles (0-1) of the per-tree predictions")
+    parser.add_argument("--explain", action="store_true",
+                        help="also write the base value and the contribution of every feature")
+    args = parser.parse_args()
+    if args.quantiles and not all(0 <= q <= 1 for q in args.quantiles):
+        parser.error("--quantiles must be between 0 and 1")
+
+    pipeline = load(args.pipeline)
+    print(f"Loaded pipeline: {args.pipeline}")
+
+    report = score_file(args.input, args.output, pipeline, args.chunksize, args.predictions_only,
+                        args.quantiles, args.explain)
+
+    print(f"\nScored {report['rows']} rows in {report['seconds']:.2f}s "
+          f"({report['rows_per_second']:.0f} rows/s)")
+    print(f"Peak RSS: {report['peak_rss_mb']:.1f} MB")
+    if report['rmse'] is not None:
+        print(f"RMSE against MEDV: {report['rmse']:.3f}")
+    print(f"Predictions saved to: {args.output}")
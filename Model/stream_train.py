@@ -0,0 +1,334 @@
+"""
+Out-of-core training for datasets larger than RAM.
+
+The CSV is streamed in fixed-size chunks and never loaded whole:
+
+    pass 1  per-feature reservoir samples (approximate imputer medians) and
+            Welford/Chan moments (exact scaler mean/variance, adjusted for
+            the imputed values), row count and hold-out assignment
+    pass 2  every training chunk is imputed and scaled, and each tree
+            draws its share of the chunk's rows (with replacement), so each
+            tree's bootstrap sample spans all chunks; the trees are then
+            fitted on their samples
+    pass 3  streaming RMSE on the hold-out rows
+
+Hold-out rows are drawn at random per row with a fixed seed, because a
+stratified split would need the whole CHAS column in memory. Each tree
+samples about max_samples rows (default: the chunk size), which keeps the
+trees the size of ones fitted on a single chunk. Peak memory is bounded by
+the chunk size, the reservoir size and n_estimators * max_samples sampled
+rows (float32, less than the fitted forest itself), not by the number of
+rows. The resulting pipeline is an ordinary sklearn Pipeline and is
+written with the same artifacts as train.py, but never over the deployed
+model in Model/ unless --replace-deployed is given.
+
+Usage:
+    python Model/stream_train.py big_listings.csv --chunksize 200000 --output-dir /tmp/model
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import sklearn
+from sklearn.ensemble import RandomForestRegressor
+
+from score_csv import FEATURE_ORDER, peak_rss_mb
+from train import (DATA_PATH, MODEL_DIR, StageTimer, build_pipeline, build_preprocessing,
+                   file_sha256, write_artifacts)
+
+TARGET = 'MEDV'
+
+
+class ReservoirSketch:
+    """Fixed-size uniform sample of the non-missing values of one column.
+
+    Small inputs are kept whole, so the median is exact until more than
+    `size` values have been seen.
+    """
+
+    def __init__(self, size, rng):
+        self.size = size
+        self.rng = rng
+        self.sample = np.empty(size, dtype=np.float64)
+        self.seen = 0
+
+    def update(self, values):
+        values = values[~np.isnan(values)]
+        fill = min(len(values), self.size - min(self.seen, self.size))
+        if fill:
+            self.sample[self.seen:self.seen + fill] = values[:fill]
+        rest = values[fill:]
+        if len(rest):
+            # Algorithm R: item number t replaces a random slot with probability size / t
+            t = self.seen + fill + np.arange(1, len(rest) + 1)
+            slots = (self.rng.random(len(rest)) * t).astype(np.int64)
+            keep = slots < self.size
+            self.sample[slots[keep]] = rest[keep]
+        self.seen += len(values)
+
+    def median(self):
+        n = min(self.seen, self.size)
+        return float(np.median(self.sample[:n])) if n else np.nan
+
+
+class RunningMoments:
+    """Per-column count, mean and M2 of the non-missing values (Chan et al.)."""
+
+    def __init__(self, n_features):
+        self.count = np.zeros(n_features)
+        self.mean = np.zeros(n_features)
+        self.m2 = np.zeros(n_features)
+        self.rows = 0
+
+    def update(self, X):
+        self.rows += len(X)
+        count = np.sum(~np.isnan(X), axis=0).astype(np.float64)
+        if not count.any():
+            return
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, np.nansum(X, axis=0) / count, 0.0)
+        m2 = np.nansum((X - mean) ** 2, axis=0)
+        self.count, self.mean, self.m2 = combine_moments(
+            self.count, self.mean, self.m2, count, mean, m2)
+
+    def imputed(self, fill):
+        """Moments after the missing entries have been replaced by fill."""
+        missing = self.rows - self.count
+        return combine_moments(self.count, self.mean, self.m2,
+                               missing, np.asarray(fill, dtype=np.float64), np.zeros_like(self.m2))
+
+
+def combine_moments(n_a, mean_a, m2_a, n_b, mean_b, m2_b):
+    n = n_a + n_b
+    with np.errstate(invalid='ignore', divide='ignore'):
+        delta = mean_b - mean_a
+        mean = np.where(n > 0, mean_a + delta * n_b / n, 0.0)
+        m2 = np.where(n > 0, m2_a + m2_b + delta ** 2 * n_a * n_b / n, 0.0)
+    return n, mean, m2
+
+
+def iter_chunks(path, chunksize):
+    """Yield (features, labels) float64 arrays for each chunk of path."""
+    for chunk in pd.read_csv(path, chunksize=chunksize, usecols=FEATURE_ORDER + [TARGET]):
+        yield (chunk[FEATURE_ORDER].to_numpy(dtype=np.float64),
+               chunk[TARGET].to_numpy(dtype=np.float64))
+
+
+def iter_split(path, chunksize, test_size, seed):
+    """Like iter_chunks, plus a per-row hold-out mask that is the same on every pass."""
+    rng = np.random.default_rng(seed)
+    for X, y in iter_chunks(path, chunksize):
+        yield X, y, rng.random(len(X)) < test_size
+
+
+def fitted_preprocessing(fill, mean, var, n_samples):
+    """Build a fitted imputer + scaler Pipeline from streamed statistics."""
+    # Fit on one row to set up the sklearn bookkeeping, then install the stats
+    preprocessing = build_preprocessing()
+    preprocessing.fit(pd.DataFrame([np.zeros(len(FEATURE_ORDER))], columns=FEATURE_ORDER))
+    imputer = preprocessing.named_steps["imputer"]
+    scaler = preprocessing.named_steps["std_scalar"]
+    imputer.statistics_ = np.asarray(fill, dtype=np.float64)
+    scaler.mean_ = mean
+    scaler.var_ = var
+    scaler.scale_ = np.where(var > 10 * np.finfo(np.float64).eps, np.sqrt(var), 1.0)
+    scaler.n_samples_seen_ = int(n_samples)
+    return preprocessing
+
+
+def pooled_forest(trees, params):
+    """Wrap independently fitted trees as one fitted RandomForestRegressor."""
+    forest = RandomForestRegressor(**params)
+    forest.set_params(n_estimators=len(trees))
+    forest.estimator_ = forest.estimator
+    forest.estimators_ = trees
+    forest.n_features_in_ = len(FEATURE_ORDER)
+    forest.n_outputs_ = 1
+    return forest
+
+
+def sample_counts(rate, seen, rows, offsets):
+    """Rows each tree draws from a chunk of rows that follows seen earlier rows.
+
+    A tree with offset u has drawn floor(rate * rows_so_far + u) rows after
+    every chunk, i.e. rate * rows per chunk on average whatever the chunk
+    sizes. With offsets evenly spaced over [0, 1), the draws of all trees
+    from one chunk add up to n_trees * rate * rows rounded up or down, so
+    every chunk of at least 1 / (n_trees * rate) rows is sampled.
+    """
+    return (np.floor(rate * (seen + rows) + offsets) - np.floor(rate * seen + offsets)).astype(np.int64)
+
+
+def fit_tree(params, seed, samples):
+    """Fit one tree on the (rows, labels, copies) samples drawn from every chunk."""
+    X = np.concatenate([rows for rows, _, _ in samples])
+    y = np.concatenate([labels for _, labels, _ in samples])
+    weight = np.concatenate([copies for _, _, copies in samples]).astype(np.float64)
+    # Rows drawn more than once are passed as sample weights, the way
+    # RandomForestRegressor applies its own bootstrap counts
+    forest = RandomForestRegressor(**dict(params, n_estimators=1, bootstrap=False, random_state=seed))
+    forest.fit(X, y, sample_weight=weight)
+    return forest.estimators_[0]
+
+
+def stream_train(data_path, output_dir, chunksize=100000, n_estimators=100, params=None,
+                 sketch_size=100000, test_size=0.2, seed=42, max_samples=None):
+    """Train in three streaming passes and write the usual artifacts.
+
+    max_samples is the expected number of rows in each tree's bootstrap
+    sample (default: chunksize, capped at the number of training rows).
+
+    Returns:
+        The manifest dictionary that was written next to the artifacts.
+    """
+    params = dict(params or {}, random_state=seed)
+    timer = StageTimer()
+
+    with timer.stage("statistics"):
+        rng = np.random.default_rng(seed + 1)
+        sketches = [ReservoirSketch(sketch_size, rng) for _ in FEATURE_ORDER]
+        moments = RunningMoments(len(FEATURE_ORDER))
+        chunk_rows = []
+        for X, y, test in iter_split(data_path, chunksize, test_size, seed):
+            train = X[~test]
+            for column, sketch in enumerate(sketches):
+                sketch.update(train[:, column])
+            moments.update(train)
+            chunk_rows.append(len(train))
+        n_chunks = len(chunk_rows)
+        fill = np.array([sketch.median() for sketch in sketches])
+        _, mean, m2 = moments.imputed(fill)
+        preprocessing = fitted_preprocessing(fill, mean, m2 / moments.rows, moments.rows)
+
+    with timer.stage("fit"):
+        max_samples = max_samples or chunksize
+        rate = min(1.0, max_samples / max(moments.rows, 1))
+        smallest = min((rows for rows in chunk_rows if rows), default=0)
+        if smallest and n_estimators * rate * smallest < 1:
+            print(f"Warning: {n_estimators} trees of {max_samples} rows may leave chunks of {smallest} "
+                  f"training rows unsampled; raise --max-samples or --n-estimators")
+        rng = np.random.default_rng(seed + 2)
+        offsets = (np.arange(n_estimators) + rng.random()) / n_estimators
+        samples = [[] for _ in range(n_estimators)]
+        chunk_samples = []
+        seen = 0
+        for index, (X, y, test) in enumerate(iter_split(data_path, chunksize, test_size, seed)):
+            # Trees split on float32 thresholds, so float32 samples lose nothing
+            rows = preprocessing.transform(_frame(X[~test])).astype(np.float32)
+            labels = y[~test]
+            counts = sample_counts(rate, seen, len(rows), offsets)
+            seen += len(rows)
+            for tree_samples, count in zip(samples, counts):
+                if count:
+                    picked, copies = np.unique(rng.integers(0, len(rows), count), return_counts=True)
+                    tree_samples.append((rows[picked], labels[picked], copies))
+            chunk_samples.append(int(counts.sum()))
+            print(f"  chunk {index + 1}/{n_chunks}: {len(rows)} rows, {chunk_samples[-1]} drawn by "
+                  f"{np.count_nonzero(counts)} trees, peak RSS {peak_rss_mb():.0f} MB")
+        unused = [index for index, sampled in enumerate(chunk_samples) if chunk_rows[index] and not sampled]
+        if unused:
+            print(f"Warning: {len(unused)} of {n_chunks} chunks ({sum(chunk_rows[i] for i in unused)} "
+                  f"training rows) were not sampled by any tree")
+
+        trees = []
+        for index in range(n_estimators):
+            trees.append(fit_tree(params, seed + index, samples[index]))
+            samples[index] = None  # release the sample once its tree is fitted
+        pipeline = build_pipeline(pooled_forest(trees, params), preprocessing)
+
+    with timer.stage("evaluate"):
+        squared_error, test_rows = 0.0, 0
+        for X, y, test in iter_split(data_path, chunksize, test_size, seed):
+            if test.any():
+                squared_error += float(np.sum((pipeline.predict(_frame(X[test])) - y[test]) ** 2))
+                test_rows += int(test.sum())
+
+    with timer.stage("save"):
+        paths = write_artifacts(pipeline, output_dir)
+
+    manifest = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "mode": "streaming",
+        "data": {
+            "path": os.path.abspath(data_path),
+            "sha256": file_sha256(data_path),
+            "rows": moments.rows + test_rows,
+            "chunks": n_chunks,
+            "chunksize": chunksize,
+        },
+        "split": {
+            "strategy": "random per-row hold-out",
+            "seed": seed,
+            "test_size": test_size,
+            "train_rows": moments.rows,
+            "test_rows": test_rows,
+        },
+        "model": {
+            "type": "RandomForestRegressor",
+            "params": pipeline.named_steps["model"].get_params(),
+            "sketch_size": sketch_size,
+            "max_samples": max_samples,
+            "sampling_rate": rate,
+        },
+        "fit": {
+            "sampled_rows": sum(chunk_samples),
+            "chunks_sampled": n_chunks - len(unused),
+            "min_rows_drawn_per_chunk": min((drawn for drawn, rows in zip(chunk_samples, chunk_rows) if rows),
+                                            default=0),
+        },
+        "metrics": {
+            "test_rmse": float(np.sqrt(squared_error / test_rows)) if test_rows else None,
+        },
+        "timings_seconds": timer.timings,
+        "peak_rss_mb": peak_rss_mb(),
+        "artifacts": {name: {"file": os.path.basename(path), "sha256": file_sha256(path)}
+                      for name, path in paths.items()},
+        "sklearn_version": sklearn.__version__,
+    }
+    with open(os.path.join(output_dir, 'training_manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, default=str)
+    return manifest
+
+
+def _frame(X):
+    # The pipeline is fitted with feature names; keep them to avoid warnings
+    return pd.DataFrame(X, columns=FEATURE_ORDER)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the forest on a CSV larger than memory.")
+    parser.add_argument("data", nargs="?", default=DATA_PATH, help="CSV shaped like REdata.csv")
+    parser.add_argument("--output-dir", default=MODEL_DIR)
+    parser.add_argument("--chunksize", type=int, default=100000, help="rows per chunk")
+    parser.add_argument("--sketch-size", type=int, default=100000,
+                        help="reservoir size per feature for the approximate medians")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--max-depth", type=int, default=None)
+    parser.add_argument("--min-samples-split", type=int, default=2)
+    parser.add_argument("--max-samples", type=int, default=None,
+                        help="expected rows in each tree's bootstrap sample (default: --chunksize)")
+    parser.add_argument("--replace-deployed", action="store_true",
+                        help="allow writing over the deployed model in Model/")
+    args = parser.parse_args()
+
+    if not args.replace_deployed and os.path.realpath(args.output_dir) == os.path.realpath(MODEL_DIR):
+        parser.error(f"this would replace the deployed pipeline, artifact and fused preprocessing in "
+                     f"{MODEL_DIR}; pass --output-dir, or --replace-deployed to replace them anyway")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    manifest = stream_train(
+        args.data, args.output_dir, args.chunksize, args.n_estimators,
+        params={"max_depth": args.max_depth, "min_samples_split": args.min_samples_split},
+        sketch_size=args.sketch_size, test_size=args.test_size, seed=args.seed,
+        max_samples=args.max_samples,
+    )
+    print(f"\nRows: {manifest['data']['rows']} in {manifest['data']['chunks']} chunks "
+          f"({manifest['fit']['chunks_sampled']} sampled)")
+    print(f"Test RMSE: {manifest['metrics']['test_rmse']:.3f}")
+    print(f"Peak RSS: {manifest['peak_rss_mb']:.0f} MB")
+    print(f"Artifacts and manifest saved to: {os.path.normpath(args.output_dir)}")
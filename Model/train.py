@@ -0,0 +1,242 @@
+"""
+Single-pass training entry point.
+
+Reads the data once, splits it with the same stratified split as the other
+scripts, fits preprocessing and model together as one Pipeline and writes
+every serving artifact from that single fit:
+
+    ESTATE_PRICE_CALCULATOR.joblib   the fitted model
+    pipeline_combined.joblib         preprocessing + model (served by Flask)
+    preprocessing_fused.npz          fused imputer + scaler parameters
+    pipeline_combined.bin            memory-mapped artifact for the backend
+    training_manifest.json           data hash, split seed, parameters,
+                                     metrics and stage timings
+
+Only forests support incremental_train.py, prediction intervals and /explain,
+so a non-forest backend is not written over the deployed model in Model/
+unless --replace-forest is given.
+
+Usage:
+    python Model/train.py
+    python Model/train.py --n-estimators 300 --max-depth 10 --output-dir /tmp/model
+    python Model/train.py --backend hgb --output-dir /tmp/hgb
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import sklearn
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.impute import SimpleImputer
+from sklearn.metrics import mean_squared_error
+from sklearn.model_selection import StratifiedShuffleSplit
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(MODEL_DIR, '..', 'Backend')
+DATA_PATH = os.path.join(MODEL_DIR, 'REdata.csv')
+
+sys.path.insert(0, BACKEND_DIR)
+from artifact import atomic_dump, file_sha256  # noqa: E402
+from export_model import export_pipeline  # noqa: E402
+from inference import FusedPreprocessor  # noqa: E402
+
+from data_cache import load_table  # noqa: E402
+
+MODEL_BACKENDS = {
+    "forest": RandomForestRegressor,
+    # max_bins <= 255 keeps the binned features in uint8
+    "hgb": HistGradientBoostingRegressor,
+}
+
+
+class StageTimer:
+    """Record the wall time of named training stages."""
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = time.perf_counter() - start
+            print(f"[{name}] {self.timings[name]:.3f}s")
+
+
+def build_model(backend="forest", seed=42, **params):
+    """Return an unfitted regressor for one of MODEL_BACKENDS.
+
+    Args:
+        backend: 'forest' (RandomForestRegressor, the deployed model) or
+            'hgb' (HistGradientBoostingRegressor on uint8-binned features).
+        seed: random_state of the model.
+        **params: Estimator parameters; None values keep the sklearn default.
+    """
+    if backend not in MODEL_BACKENDS:
+        raise ValueError(f"unknown model backend {backend!r}, expected one of {MODEL_BACKENDS}")
+    params = {name: value for name, value in params.items() if value is not None}
+    return MODEL_BACKENDS[backend](random_state=seed, **params)
+
+
+def build_preprocessing():
+    return Pipeline([
+        ("imputer", SimpleImputer(strategy="median")),
+        ("std_scalar", StandardScaler()),
+    ])
+
+
+def build_pipeline(model, preprocessing=None):
+    return Pipeline([
+        ("preprocessing", preprocessing or build_preprocessing()),
+        ("model", model),
+    ])
+
+
+def stratified_split(housing, seed=42, test_size=0.2):
+    """Split on CHAS exactly like real_estate_prediction.py."""
+    split = StratifiedShuffleSplit(n_splits=1, test_size=test_size, random_state=seed)
+    train_index, test_index = next(split.split(housing, housing['CHAS']))
+    return housing.iloc[train_index], housing.iloc[test_index]
+
+
+def rmse(y_true, y_pred):
+    return float(np.sqrt(mean_squared_error(y_true, y_pred)))
+
+
+def write_artifacts(pipeline, output_dir):
+    """Write the model, combined pipeline, fused preprocessing and mmap artifact."""
+    paths = {
+        "model": os.path.join(output_dir, 'ESTATE_PRICE_CALCULATOR.joblib'),
+        "pipeline": os.path.join(output_dir, 'pipeline_combined.joblib'),
+        "preprocessing": os.path.join(output_dir, 'preprocessing_fused.npz'),
+        "artifact": os.path.join(output_dir, 'pipeline_combined.bin'),
+    }
+    model = pipeline.named_steps["model"]
+    atomic_dump(model, paths["model"])
+    atomic_dump(pipeline, paths["pipeline"])
+    FusedPreprocessor.from_pipeline(pipeline.named_steps["preprocessing"]).save(paths["preprocessing"])
+    if isinstance(model, RandomForestRegressor):
+        export_pipeline(paths["pipeline"], paths["artifact"])
+    else:
+        # Only forests have a memory-mapped format; other models are served
+        # from the joblib pipeline, so drop any older artifact
+        print(f"Skipping the memory-mapped artifact for {type(model).__name__}")
+        if os.path.exists(paths["artifact"]):
+            os.remove(paths["artifact"])
+        del paths["artifact"]
+    return paths
+
+
+def train(data_path, output_dir, model, seed=42, test_size=0.2):
+    """Run the whole training pass and return the manifest it wrote."""
+    timer = StageTimer()
+
+    with timer.stage("load"):
+        housing = load_table(data_path)
+        data_sha256 = file_sha256(data_path)
+
+    with timer.stage("split"):
+        train_set, test_set = stratified_split(housing, seed, test_size)
+        X_train, y_train = train_set.drop("MEDV", axis=1), train_set["MEDV"]
+        X_test, y_test = test_set.drop("MEDV", axis=1), test_set["MEDV"]
+
+    with timer.stage("fit"):
+        pipeline = build_pipeline(model)
+        pipeline.fit(X_train, y_train)
+
+    with timer.stage("evaluate"):
+        metrics = {
+            "train_rmse": rmse(y_train, pipeline.predict(X_train)),
+            "test_rmse": rmse(y_test, pipeline.predict(X_test)),
+        }
+
+    with timer.stage("save"):
+        paths = write_artifacts(pipeline, output_dir)
+
+    manifest = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "data": {
+            "path": os.path.relpath(data_path, MODEL_DIR),
+            "sha256": data_sha256,
+            "rows": len(housing),
+        },
+        "split": {
+            "strategy": "StratifiedShuffleSplit on CHAS",
+            "seed": seed,
+            "test_size": test_size,
+            "train_rows": len(train_set),
+            "test_rows": len(test_set),
+        },
+        "model": {
+            "type": type(model).__name__,
+            "params": model.get_params(),
+        },
+        "metrics": metrics,
+        "timings_seconds": timer.timings,
+        "artifacts": {name: {"file": os.path.basename(path), "sha256": file_sha256(path)}
+                      for name, path in paths.items()},
+        "sklearn_version": sklearn.__version__,
+    }
+    manifest_path = os.path.join(output_dir, 'training_manifest.json')
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2, default=str)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the model and write all serving artifacts.")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--output-dir", default=MODEL_DIR)
+    parser.add_argument("--seed", type=int, default=42, help="split and model random seed")
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--backend", choices=sorted(MODEL_BACKENDS), default="forest")
+    parser.add_argument("--max-depth", type=int, default=None)
+    parser.add_argument("--evaluate", type=int, default=0, metavar="FOLDS",
+                        help="also cross-validate this configuration (see evaluate.py) and write "
+                             "evaluation_report.json next to the artifacts")
+    forest_args = parser.add_argument_group("forest backend")
+    forest_args.add_argument("--n-estimators", type=int, default=100)
+    forest_args.add_argument("--min-samples-split", type=int, default=2)
+    hgb_args = parser.add_argument_group("hgb backend")
+    hgb_args.add_argument("--max-iter", type=int, default=300)
+    hgb_args.add_argument("--learning-rate", type=float, default=0.05)
+    hgb_args.add_argument("--max-leaf-nodes", type=int, default=31)
+    hgb_args.add_argument("--max-bins", type=int, default=255, help="at most 255 (uint8 bins)")
+    hgb_args.add_argument("--replace-forest", action="store_true",
+                          help="allow writing a non-forest model over the deployed one in Model/")
+    args = parser.parse_args()
+
+    if (args.backend != "forest" and not args.replace_forest
+            and os.path.realpath(args.output_dir) == os.path.realpath(MODEL_DIR)):
+        parser.error(f"--backend {args.backend} would replace the deployed forest in {MODEL_DIR}, which "
+                     "incremental_train.py, prediction intervals and /explain need; pass --output-dir, "
+                     "or --replace-forest to replace it anyway")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    if args.backend == "forest":
+        params = {"n_estimators": args.n_estimators, "min_samples_split": args.min_samples_split}
+    else:
+        params = {"max_iter": args.max_iter, "learning_rate": args.learning_rate,
+                  "max_leaf_nodes": args.max_leaf_nodes, "max_bins": args.max_bins}
+    model = build_model(args.backend, args.seed, max_depth=args.max_depth, **params)
+    manifest = train(args.data, args.output_dir, model, args.seed, args.test_size)
+
+    print(f"\nTraining RMSE: {manifest['metrics']['train_rmse']:.3f}")
+    print(f"Test RMSE: {manifest['metrics']['test_rmse']:.3f}")
+    print(f"Total time: {sum(manifest['timings_seconds'].values()):.3f}s")
+    print(f"Artifacts and manifest saved to: {os.path.normpath(args.output_dir)}")
+
+    if args.evaluate:
+        from evaluate import evaluate, print_report, write_report
+        report, out_of_fold = evaluate(args.data, args.backend, dict(params, max_depth=args.max_depth),
+                                       folds=args.evaluate, seeds=[args.seed])
+        print_report(report)
+        write_report(report, out_of_fold, args.data, args.output_dir)
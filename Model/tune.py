@@ -0,0 +1,257 @@
+"""
+Cached, parallel hyperparameter search for the RandomForestRegressor.
+
+Every (configuration, fold) evaluation is stored on disk under a key built
+from the training data hash, the parameters, the seed and the fold, so
+repeated runs only fit grid points that have not been seen before. Besides
+the exhaustive grid (which real_estate_prediction.py runs through
+grid_search) a successive-halving search evaluates all configurations on a fraction of
+the rows and only keeps the best third for the next, larger round.
+
+Usage:
+    python Model/tune.py                     # exhaustive grid, 5 folds
+    python Model/tune.py --search halving    # successive halving
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+import sklearn
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.impute import SimpleImputer
+from sklearn.metrics import mean_squared_error
+from sklearn.model_selection import KFold, StratifiedShuffleSplit
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from data_cache import load_table
+
+MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = os.path.join(MODEL_DIR, 'REdata.csv')
+CACHE_DIR = os.path.join(MODEL_DIR, '.tune_cache')
+
+# The grid real_estate_prediction.py searches
+PARAM_GRID = {
+    'n_estimators': [50, 100, 300],
+    'max_depth': [None, 10, 20],
+    'min_samples_split': [2, 5]
+}
+
+
+def data_hash(X, y):
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(X, dtype=np.float64).tobytes())
+    digest.update(np.ascontiguousarray(y, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+class FoldCache:
+    """One small JSON file per evaluated (data, params, seed, fold, rows) key."""
+
+    def __init__(self, directory=CACHE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(**fields):
+        fields['sklearn_version'] = sklearn.__version__
+        blob = json.dumps(fields, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.sha256(blob).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, record):
+        tmp_path = f"{self._path(key)}.tmp-{os.getpid()}"
+        with open(tmp_path, 'w') as f:
+            json.dump(record, f)
+        os.replace(tmp_path, self._path(key))
+
+
+def evaluate_fold(params, X, y, train_index, test_index, seed, row_fraction=1.0):
+    """Fit one configuration on one fold and return its test MSE and fit time."""
+    if row_fraction < 1.0:
+        rng = np.random.default_rng(seed)
+        n_rows = max(2, int(len(train_index) * row_fraction))
+        train_index = rng.choice(train_index, size=n_rows, replace=False)
+    model = RandomForestRegressor(random_state=seed, n_jobs=1, **params)
+    start = time.perf_counter()
+    model.fit(X[train_index], y[train_index])
+    fit_seconds = time.perf_counter() - start
+    mse = mean_squared_error(y[test_index], model.predict(X[test_index]))
+    return {"mse": float(mse), "fit_seconds": fit_seconds}
+
+
+def evaluate(configs, X, y, cache, cv=5, seed=42, row_fraction=1.0, n_jobs=-1):
+    """Cross-validate every configuration, reusing cached folds.
+
+    Returns:
+        (results, stats) where results holds one dictionary per
+        configuration (params, mean/std RMSE, total fit seconds) and stats
+        counts computed and cached folds and the fit seconds each took.
+    """
+    folds = list(KFold(n_splits=cv).split(X))
+    dataset = data_hash(X, y)
+
+    tasks = []
+    records = {}
+    for c, params in enumerate(configs):
+        for f, (train_index, test_index) in enumerate(folds):
+            key = cache.key(data=dataset, params=params, seed=seed, fold=f,
+                            n_folds=cv, row_fraction=row_fraction)
+            record = cache.get(key)
+            if record is None:
+                tasks.append((c, f, key, params, train_index, test_index))
+            else:
+                records[c, f] = record
+
+    cached_seconds = sum(record["fit_seconds"] for record in records.values())
+    computed = Parallel(n_jobs=n_jobs)(
+        delayed(evaluate_fold)(params, X, y, train_index, test_index, seed, row_fraction)
+        for _, _, _, params, train_index, test_index in tasks
+    )
+    for (c, f, key, _, _, _), record in zip(tasks, computed):
+        cache.put(key, record)
+        records[c, f] = record
+
+    results = []
+    for c, params in enumerate(configs):
+        rmse = np.sqrt([records[c, f]["mse"] for f in range(cv)])
+        results.append({
+            "params": params,
+            "rmse_mean": float(rmse.mean()),
+            "rmse_std": float(rmse.std()),
+            "fit_seconds": sum(records[c, f]["fit_seconds"] for f in range(cv)),
+        })
+    stats = {
+        "computed_folds": len(tasks),
+        "cached_folds": len(records) - len(tasks),
+        "computed_seconds": sum(record["fit_seconds"] for record in computed),
+        "cached_seconds": cached_seconds,
+    }
+    return results, stats
+
+
+def grid_configs(param_grid=PARAM_GRID):
+    names = sorted(param_grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(param_grid[n] for n in names))]
+
+
+def grid_search(X, y, cache, cv=5, seed=42, n_jobs=-1):
+    results, stats = evaluate(grid_configs(), X, y, cache, cv, seed, n_jobs=n_jobs)
+    stats["exhaustive_seconds"] = sum(r["fit_seconds"] for r in results)
+    return sorted(results, key=lambda r: r["rmse_mean"]), stats
+
+
+def halving_search(X, y, cache, cv=5, seed=42, eta=3, min_fraction=1 / 9, n_jobs=-1):
+    """Successive halving over the fraction of training rows used per fold."""
+    configs = grid_configs()
+    fraction = min_fraction
+    totals = {"computed_folds": 0, "cached_folds": 0, "computed_seconds": 0.0, "cached_seconds": 0.0}
+    # Fit seconds per configuration at each row fraction, used to estimate
+    # what the exhaustive grid would have cost
+    history = {}
+
+    while True:
+        fraction = min(fraction, 1.0)
+        results, stats = evaluate(configs, X, y, cache, cv, seed, fraction, n_jobs)
+        for name in totals:
+            totals[name] += stats[name]
+        history[fraction] = {json.dumps(r["params"], sort_keys=True): r["fit_seconds"] for r in results}
+        results.sort(key=lambda r: r["rmse_mean"])
+        print(f"  rows {fraction:6.1%}: {len(configs):2d} configurations, "
+              f"best RMSE {results[0]['rmse_mean']:.3f}")
+        if fraction >= 1.0 or len(configs) == 1:
+            break
+        configs = [r["params"] for r in results[:max(1, len(results) // eta)]]
+        fraction *= eta
+
+    totals["exhaustive_seconds"] = estimate_full_cost(history)
+    return results, totals
+
+
+def estimate_full_cost(history):
+    """Estimate the all-rows fit time of every configuration seen in history.
+
+    A configuration pruned at some fraction is scaled by how much the
+    survivors' fit time grew from that fraction to the largest one.
+    """
+    largest = max(history)
+    full = history[largest]
+    estimate = dict(full)
+    for fraction in sorted(history, reverse=True):
+        seconds = history[fraction]
+        survivors = [key for key in full if key in seconds]
+        growth = sum(full[k] for k in survivors) / max(sum(seconds[k] for k in survivors), 1e-9)
+        for key, value in seconds.items():
+            estimate.setdefault(key, value * growth)
+    return sum(estimate.values())
+
+
+def load_training_data(path=DATA_PATH):
+    """Split and preprocess REdata.csv exactly like real_estate_prediction.py."""
+    housing = load_table(path)
+    split = StratifiedShuffleSplit(n_splits=1, test_size=0.2, random_state=42)
+    for train_index, test_index in split.split(housing, housing['CHAS']):
+        strat_train_set = housing.loc[train_index]
+    features = strat_train_set.drop("MEDV", axis=1)
+    labels = strat_train_set["MEDV"].to_numpy(dtype=np.float64)
+    my_pipeline = Pipeline([
+        ("imputer", SimpleImputer(strategy="median")),
+        ("std_scalar", StandardScaler()),
+    ])
+    return my_pipeline.fit_transform(features), labels
+
+
+def cached_cross_val_rmse(model, X, y, cv=10, cache=None):
+    """Cached equivalent of cross_val_score(model, ..., cv=cv) RMSE scores."""
+    params = model.get_params()
+    seed = params.pop('random_state')
+    params.pop('n_jobs')
+    results, _ = evaluate([params], X, y, cache or FoldCache(), cv=cv, seed=seed)
+    return results[0]["rmse_mean"], results[0]["rmse_std"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cached hyperparameter search for the forest.")
+    parser.add_argument("--search", choices=["grid", "halving"], default="grid")
+    parser.add_argument("--cv", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    args = parser.parse_args()
+
+    X, y = load_training_data()
+    cache = FoldCache(args.cache_dir)
+    print(f"Training rows: {len(y)}, {len(grid_configs())} configurations x {args.cv} folds")
+
+    start = time.perf_counter()
+    if args.search == "grid":
+        results, stats = grid_search(X, y, cache, args.cv, args.seed, args.n_jobs)
+    else:
+        results, stats = halving_search(X, y, cache, args.cv, args.seed, n_jobs=args.n_jobs)
+    wall = time.perf_counter() - start
+
+    best = results[0]
+    print(f"\nBest parameters found: {best['params']}")
+    print(f"Cross-validation RMSE: {best['rmse_mean']:.2f} (±{best['rmse_std']:.2f})")
+    print(f"\nWall time: {wall:.1f}s")
+    # Fit-seconds are summed over folds; with parallel folds they exceed wall time
+    print(f"Folds computed: {stats['computed_folds']} ({stats['computed_seconds']:.1f} fit-seconds), "
+          f"reused from cache: {stats['cached_folds']} ({stats['cached_seconds']:.1f} fit-seconds skipped)")
+    skipped = stats['exhaustive_seconds'] - stats['computed_seconds']
+    label = "exhaustive grid" if args.search == "grid" else "exhaustive grid (estimated)"
+    print(f"Summed fit-seconds of the {label}: {stats['exhaustive_seconds']:.1f}, "
+          f"{skipped:.1f} of them not fitted in this run")